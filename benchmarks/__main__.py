@@ -0,0 +1,102 @@
+"""Run the benchmark suite, optionally saving results or checking a baseline.
+
+    python -m benchmarks                                  # run everything
+    python -m benchmarks --filter parser --quick          # a subset, fewer rounds
+    python -m benchmarks --save benchmarks/baseline.json  # record a baseline
+    python -m benchmarks --compare benchmarks/baseline.json --threshold 0.25
+
+With ``--compare`` the exit status is 1 when any benchmark's median is more
+than ``--threshold`` (relative) slower than in the baseline. Baselines are
+only comparable on the machine that recorded them.
+"""
+
+import argparse
+import sys
+
+from benchmarks.cases import all_benchmarks
+from benchmarks.runner import (
+    DEFAULT_MIN_TIME,
+    DEFAULT_ROUNDS,
+    compare_results,
+    load_results,
+    regressions,
+    run_benchmarks,
+    save_results,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--filter", action="append", default=[], help="substring of names to run"
+    )
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument(
+        "--min-time", type=float, default=DEFAULT_MIN_TIME, help="seconds per round"
+    )
+    parser.add_argument("--quick", action="store_true", help="3 short rounds")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to check")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown of the median (default 0.25)",
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmark names")
+    args = parser.parse_args()
+
+    benchmarks = [
+        benchmark
+        for benchmark in all_benchmarks()
+        if not args.filter or any(f in benchmark.name for f in args.filter)
+    ]
+    if args.list:
+        print("\n".join(benchmark.name for benchmark in benchmarks))
+        return
+    if args.quick:
+        args.rounds, args.min_time = 3, 0.05
+
+    width = max(len(benchmark.name) for benchmark in benchmarks)
+    print(f"{'benchmark':<{width}} {'median µs':>12} {'min µs':>12} {'iter':>8}")
+
+    def report(result):
+        print(
+            f"{result.name:<{width}} {result.median_us:>12.1f} "
+            f"{result.min_us:>12.1f} {result.iterations:>8}"
+        )
+
+    results = run_benchmarks(benchmarks, args.rounds, args.min_time, report)
+
+    if args.save:
+        save_results(args.save, results)
+        print(f"\nSaved {len(results)} results to {args.save}")
+
+    if args.compare:
+        comparisons = compare_results(load_results(args.compare), results)
+        print(
+            f"\n{'benchmark':<{width}} {'baseline µs':>12} {'now µs':>12} {'change':>8}"
+        )
+        for comparison in comparisons:
+            change = comparison.change
+            baseline = comparison.baseline_us
+            print(
+                f"{comparison.name:<{width}} "
+                f"{baseline if baseline is not None else float('nan'):>12.1f} "
+                f"{comparison.current_us:>12.1f} "
+                f"{'new' if change is None else f'{change:+.0%}':>8}"
+            )
+        slower = regressions(comparisons, args.threshold)
+        if slower:
+            print(
+                f"\n{len(slower)} benchmark(s) regressed by more than "
+                f"{args.threshold:.0%}:",
+                file=sys.stderr,
+            )
+            for comparison in slower:
+                print(f"  {comparison.name}: {comparison.change:+.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Microbenchmark: ffprobe output to rows, before and after the fast converter.
+
+"before" is what the create and PUT endpoints used to do with an already
+validated request body: dump it back to a dict, validate it again and copy each
+field by hand (the original ``parse_ffprobe_to_rows``, kept below verbatim).
+"after" is what they do now: map the validated model to column dicts through
+the precomputed field tables, plus the ``model_dump()`` that is still paid to
+store the raw probe.
+
+    python -m benchmarks.bench_ffprobe_convert
+    python -m benchmarks.bench_ffprobe_convert --streams 1 10 100 --number 2000
+"""
+
+import argparse
+import functools
+import timeit
+from pathlib import Path
+from typing import Any
+
+from benchmarks.data import FILEPATH, sample_probe
+from media_api.core.schemas import FFProbeOutput
+from media_api.utils.ffprobe_parser import FFProbeParser, ParsedMediaFile
+
+
+def baseline_parse_ffprobe_to_rows(
+    filepath: str, ffprobe_data: dict[str, Any]
+) -> ParsedMediaFile:
+    """``FFProbeParser.parse_ffprobe_to_rows`` as it was before probe_convert."""
+    # Parse the data using Pydantic schema
+    parsed_data = FFProbeOutput(**ffprobe_data)
+
+    # Extract file info
+    file_path = Path(filepath)
+    filename = file_path.name
+
+    media_file = {
+        "filename": filename,
+        "filepath": filepath,
+        "file_size": None,
+        "format_name": None,
+        "format_long_name": None,
+        "duration": None,
+        "bit_rate": None,
+        "probe_score": None,
+        "start_time": None,
+        "nb_streams": None,
+        "nb_programs": None,
+        "tags": None,
+    }
+
+    # Process format information
+    if parsed_data.format:
+        fmt = parsed_data.format
+        media_file["file_size"] = int(fmt.size) if fmt.size else None
+        media_file["format_name"] = fmt.format_name
+        media_file["format_long_name"] = fmt.format_long_name
+        media_file["duration"] = float(fmt.duration) if fmt.duration else None
+        media_file["bit_rate"] = int(fmt.bit_rate) if fmt.bit_rate else None
+        media_file["probe_score"] = fmt.probe_score
+        media_file["start_time"] = float(fmt.start_time) if fmt.start_time else None
+        media_file["nb_streams"] = fmt.nb_streams
+        media_file["nb_programs"] = fmt.nb_programs
+        media_file["tags"] = fmt.tags
+
+    # Process streams
+    streams = []
+    for stream_data in parsed_data.streams or []:
+        streams.append(
+            {
+                "index": stream_data.index,
+                "codec_name": stream_data.codec_name,
+                "codec_long_name": stream_data.codec_long_name,
+                "codec_type": stream_data.codec_type,
+                "codec_tag_string": stream_data.codec_tag_string,
+                "codec_tag": stream_data.codec_tag,
+                # Video fields
+                "width": stream_data.width,
+                "height": stream_data.height,
+                "coded_width": stream_data.coded_width,
+                "coded_height": stream_data.coded_height,
+                "closed_captions": stream_data.closed_captions,
+                "film_grain": stream_data.film_grain,
+                "has_b_frames": stream_data.has_b_frames,
+                "sample_aspect_ratio": stream_data.sample_aspect_ratio,
+                "display_aspect_ratio": stream_data.display_aspect_ratio,
+                "pix_fmt": stream_data.pix_fmt,
+                "level": stream_data.level,
+                "color_range": stream_data.color_range,
+                "color_space": stream_data.color_space,
+                "color_transfer": stream_data.color_transfer,
+                "color_primaries": stream_data.color_primaries,
+                "chroma_location": stream_data.chroma_location,
+                "field_order": stream_data.field_order,
+                "refs": stream_data.refs,
+                "r_frame_rate": stream_data.r_frame_rate,
+                "avg_frame_rate": stream_data.avg_frame_rate,
+                "time_base": stream_data.time_base,
+                # Audio fields
+                "sample_fmt": stream_data.sample_fmt,
+                "sample_rate": stream_data.sample_rate,
+                "channels": stream_data.channels,
+                "channel_layout": stream_data.channel_layout,
+                "bits_per_sample": stream_data.bits_per_sample,
+                # Common fields
+                "start_pts": stream_data.start_pts,
+                "start_time": float(stream_data.start_time)
+                if stream_data.start_time
+                else None,
+                "duration_ts": stream_data.duration_ts,
+                "duration": float(stream_data.duration)
+                if stream_data.duration
+                else None,
+                "bit_rate": int(stream_data.bit_rate) if stream_data.bit_rate else None,
+                "max_bit_rate": int(stream_data.max_bit_rate)
+                if stream_data.max_bit_rate
+                else None,
+                "bits_per_raw_sample": stream_data.bits_per_raw_sample,
+                "nb_frames": int(stream_data.nb_frames)
+                if stream_data.nb_frames
+                else None,
+                "nb_read_frames": int(stream_data.nb_read_frames)
+                if stream_data.nb_read_frames
+                else None,
+                "nb_read_packets": int(stream_data.nb_read_packets)
+                if stream_data.nb_read_packets
+                else None,
+                "disposition": stream_data.disposition.model_dump()
+                if stream_data.disposition
+                else None,
+                "tags": stream_data.tags,
+            }
+        )
+
+    # Process chapters
+    chapters = []
+    for chapter_data in parsed_data.chapters or []:
+        chapters.append(
+            {
+                "chapter_id": chapter_data.id,
+                "time_base": chapter_data.time_base,
+                "start": chapter_data.start,
+                "start_time": float(chapter_data.start_time)
+                if chapter_data.start_time
+                else None,
+                "end": chapter_data.end,
+                "end_time": float(chapter_data.end_time)
+                if chapter_data.end_time
+                else None,
+                "tags": chapter_data.tags,
+            }
+        )
+
+    return ParsedMediaFile(
+        media_file=media_file,
+        streams=streams,
+        chapters=chapters,
+        raw_ffprobe=ffprobe_data,
+    )
+
+
+def before(probe: FFProbeOutput) -> ParsedMediaFile:
+    return baseline_parse_ffprobe_to_rows(FILEPATH, probe.model_dump())
+
+
+def after(probe: FFProbeOutput) -> ParsedMediaFile:
+    return FFProbeParser.convert_ffprobe_output(FILEPATH, probe, probe.model_dump())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'streams':>8} {'before µs':>12} {'after µs':>12} {'speedup':>8}")
+    for streams in args.streams:
+        probe = FFProbeOutput(**sample_probe(streams))
+        timings = []
+        for func in (before, after):
+            best = min(
+                timeit.repeat(
+                    functools.partial(func, probe),
+                    number=args.number,
+                    repeat=args.repeat,
+                )
+            )
+            timings.append(best / args.number * 1e6)
+        print(
+            f"{streams:>8} {timings[0]:>12.1f} {timings[1]:>12.1f} "
+            f"{timings[0] / timings[1]:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Benchmark cases: parser, schemas and every endpoint through an ASGI client.
+
+Each case is run for several catalog shapes (streams and chapters per file).
+Router cases share one in-memory SQLite database seeded with
+``SEED_FILES`` files per shape, so they run offline and need no server.
+"""
+
+import itertools
+import json
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.data import sample_probe
+from benchmarks.runner import Benchmark
+from media_api.core.database import (
+    Base,
+    get_db,
+    get_read_db,
+    get_read_sessionmaker,
+    get_sessionmaker,
+)
+from media_api.core.schemas import FFProbeOutput, MediaFileCreate, MediaFileResponse
+from media_api.utils.bulk_insert import insert_media_files
+from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.response_cache import response_cache
+
+# (streams, chapters) per media file
+SHAPES: List[Tuple[int, int]] = [(1, 0), (10, 10), (100, 50)]
+SEED_FILES = 200
+PAGE_SIZE = 50
+
+
+def shape_name(streams: int, chapters: int) -> str:
+    return f"s{streams}-c{chapters}"
+
+
+def shape_format(streams: int, chapters: int) -> str:
+    """format_name given to the seeded files of one shape, used to filter."""
+    return f"bench-{shape_name(streams, chapters)}"
+
+
+def shape_probe(streams: int, chapters: int, filepath: str):
+    probe = sample_probe(streams, chapters, filepath)
+    probe["format"]["format_name"] = shape_format(streams, chapters)
+    return probe
+
+
+class BenchApp:
+    """The application wired to a seeded in-memory SQLite database."""
+
+    def __init__(self):
+        self.client = None
+        self.engine = None
+        self.media_file_ids = {}
+
+    async def start(self) -> "BenchApp":
+        if self.client is not None:
+            return self
+
+        from httpx import ASGITransport, AsyncClient
+        from main import app
+
+        self.engine = create_async_engine(
+            "sqlite+aiosqlite:///:memory:",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+        async def session():
+            async with sessionmaker() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = session
+        app.dependency_overrides[get_read_db] = session
+        app.dependency_overrides[get_sessionmaker] = lambda: sessionmaker
+        app.dependency_overrides[get_read_sessionmaker] = lambda: sessionmaker
+
+        async with sessionmaker() as db:
+            for streams, chapters in SHAPES:
+                parsed = [
+                    FFProbeParser.parse_ffprobe_to_rows(
+                        path, shape_probe(streams, chapters, path)
+                    )
+                    for path in (
+                        f"/seed/{shape_name(streams, chapters)}/{i}.mkv"
+                        for i in range(SEED_FILES)
+                    )
+                ]
+                ids = await insert_media_files(db, parsed)
+                self.media_file_ids[(streams, chapters)] = ids[0]
+            await db.commit()
+
+        self.client = AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://bench"
+        )
+        return self
+
+
+bench_app = BenchApp()
+
+
+def _parser_cases(streams: int, chapters: int) -> List[Benchmark]:
+    name = shape_name(streams, chapters)
+    data = sample_probe(streams, chapters)
+
+    def models():
+        return lambda: FFProbeParser.parse_ffprobe_to_models("/m/a.mkv", data)
+
+    def rows():
+        return lambda: FFProbeParser.parse_ffprobe_to_rows("/m/a.mkv", data)
+
+    def convert():
+        probe = FFProbeOutput(**data)
+        return lambda: FFProbeParser.convert_ffprobe_output("/m/a.mkv", probe)
+
+    def output():
+        # The unit of work handed to the parse pool for large output
+        raw = json.dumps(data).encode()
+        return lambda: FFProbeParser.parse_ffprobe_output("/m/a.mkv", raw)
+
+    return [
+        Benchmark(f"parser.parse_ffprobe_to_models[{name}]", models, tags=["parser"]),
+        Benchmark(f"parser.parse_ffprobe_to_rows[{name}]", rows, tags=["parser"]),
+        Benchmark(f"parser.convert_ffprobe_output[{name}]", convert, tags=["parser"]),
+        Benchmark(f"parser.parse_ffprobe_output[{name}]", output, tags=["parser"]),
+    ]
+
+
+def _schema_cases(streams: int, chapters: int) -> List[Benchmark]:
+    name = shape_name(streams, chapters)
+    data = sample_probe(streams, chapters)
+    body = {"filepath": "/m/a.mkv", "ffprobe_data": data}
+
+    def validate_probe():
+        return lambda: FFProbeOutput.model_validate(data)
+
+    def validate_create():
+        return lambda: MediaFileCreate.model_validate(body)
+
+    def serialize_response():
+        media_file = FFProbeParser.parse_ffprobe_to_models("/m/a.mkv", data)
+        media_file.id = 1
+        media_file.created_at = datetime.now(timezone.utc)
+        for i, child in enumerate([*media_file.streams, *media_file.chapters]):
+            child.id = i + 1
+        return lambda: MediaFileResponse.model_validate(media_file).model_dump_json()
+
+    return [
+        Benchmark(f"schemas.FFProbeOutput[{name}]", validate_probe, tags=["schemas"]),
+        Benchmark(
+            f"schemas.MediaFileCreate[{name}]", validate_create, tags=["schemas"]
+        ),
+        Benchmark(
+            f"schemas.MediaFileResponse.dump_json[{name}]",
+            serialize_response,
+            tags=["schemas"],
+        ),
+    ]
+
+
+def _router_cases(streams: int, chapters: int) -> List[Benchmark]:
+    name = shape_name(streams, chapters)
+    fmt = shape_format(streams, chapters)
+
+    def request(method: str, url: str, expected: int = 200, **kwargs):
+        async def setup():
+            app = await bench_app.start()
+            target = url.format(id=app.media_file_ids[(streams, chapters)])
+
+            async def call():
+                response = await app.client.request(method, target, **kwargs)
+                assert response.status_code == expected, response.text
+
+            return call
+
+        return setup
+
+    async def get_detail_uncached():
+        call = await request("GET", "/media-files/{id}")()
+
+        async def uncached():
+            response_cache.clear()
+            await call()
+
+        return uncached
+
+    async def get_detail_not_modified():
+        app = await bench_app.start()
+        url = f"/media-files/{app.media_file_ids[(streams, chapters)]}"
+        etag = (await app.client.get(url)).headers["etag"]
+        return await request(
+            "GET", url, expected=304, headers={"If-None-Match": etag}
+        )()
+
+    async def create():
+        app = await bench_app.start()
+        counter = itertools.count()
+
+        async def call():
+            path = f"/bench/{name}/{next(counter)}.mkv"
+            response = await app.client.post(
+                "/media-files/",
+                json={
+                    "filepath": path,
+                    "ffprobe_data": shape_probe(streams, chapters, path),
+                },
+            )
+            assert response.status_code == 201, response.text
+
+        return call
+
+    async def put_unchanged():
+        app = await bench_app.start()
+        media_file_id = app.media_file_ids[(streams, chapters)]
+        media_file = await app.client.get(f"/media-files/{media_file_id}")
+        path = media_file.json()["filepath"]
+        body = {"filepath": path, "ffprobe_data": shape_probe(streams, chapters, path)}
+        return await request("PUT", "/media-files/{id}", json=body)()
+
+    cases = [
+        ("GET /media-files/{id}", request("GET", "/media-files/{id}")),
+        ("GET /media-files/{id} uncached", get_detail_uncached),
+        ("GET /media-files/{id} 304", get_detail_not_modified),
+        (
+            "GET /media-files/{id}?fields",
+            request("GET", "/media-files/{id}?fields=filename,duration"),
+        ),
+        (
+            "GET /media-files/",
+            request("GET", f"/media-files/?format_name={fmt}&limit={PAGE_SIZE}"),
+        ),
+        (
+            "GET /media-files/search",
+            request(
+                "GET",
+                f"/media-files/search?format_name={fmt}&codec_name=hevc"
+                f"&min_height=2160&limit={PAGE_SIZE}",
+            ),
+        ),
+        (
+            "GET /media-files/{id}/streams",
+            request("GET", "/media-files/{id}/streams"),
+        ),
+        (
+            "GET /media-streams/?media_file_id",
+            request("GET", "/media-streams/?media_file_id={id}"),
+        ),
+        (
+            "GET /media-files/{id}/raw-probe",
+            request("GET", "/media-files/{id}/raw-probe"),
+        ),
+        ("PUT /media-files/{id} unchanged", put_unchanged),
+        ("POST /media-files/", create),
+    ]
+    return [
+        Benchmark(f"routers.{label}[{name}]", setup, is_async=True, tags=["routers"])
+        for label, setup in cases
+    ]
+
+
+def _catalog_cases() -> List[Benchmark]:
+    def request(url: str):
+        async def setup():
+            app = await bench_app.start()
+
+            async def call():
+                response = await app.client.get(url)
+                assert response.status_code == 200, response.text
+
+            return call
+
+        return setup
+
+    return [
+        Benchmark(
+            "routers.GET /stats", request("/stats"), is_async=True, tags=["routers"]
+        ),
+        Benchmark(
+            "routers.GET /media-files/export",
+            request(f"/media-files/export?format_name={shape_format(10, 10)}"),
+            is_async=True,
+            tags=["routers"],
+        ),
+    ]
+
+
+def all_benchmarks() -> List[Benchmark]:
+    benchmarks = []
+    for streams, chapters in SHAPES:
+        benchmarks += _parser_cases(streams, chapters)
+        benchmarks += _schema_cases(streams, chapters)
+    for streams, chapters in SHAPES:
+        benchmarks += _router_cases(streams, chapters)
+    return benchmarks + _catalog_cases()
@@ -0,0 +1,65 @@
+"""Synthetic ffprobe documents for benchmarks."""
+
+from typing import Any, Dict
+
+FILEPATH = "/media/bench/sample.mkv"
+
+
+def sample_probe(
+    streams: int, chapters: int = 10, filepath: str = FILEPATH
+) -> Dict[str, Any]:
+    """A realistic ffprobe document: one HEVC video stream, the rest audio."""
+    return {
+        "format": {
+            "filename": filepath,
+            "nb_streams": streams,
+            "nb_programs": 0,
+            "format_name": "matroska,webm",
+            "format_long_name": "Matroska / WebM",
+            "start_time": "0.000000",
+            "duration": "5423.104000",
+            "size": "8123456789",
+            "bit_rate": "11983512",
+            "probe_score": 100,
+            "tags": {"title": "Sample", "encoder": "libebml v1.4.2"},
+        },
+        "streams": [
+            {
+                "index": i,
+                "codec_name": "hevc" if i == 0 else "aac",
+                "codec_long_name": "H.265 / HEVC" if i == 0 else "AAC",
+                "codec_type": "video" if i == 0 else "audio",
+                "codec_tag_string": "[0][0][0][0]",
+                "codec_tag": "0x0000",
+                "width": 3840 if i == 0 else None,
+                "height": 2160 if i == 0 else None,
+                "pix_fmt": "yuv420p10le" if i == 0 else None,
+                "sample_rate": None if i == 0 else 48000,
+                "channels": None if i == 0 else 6,
+                "channel_layout": None if i == 0 else "5.1",
+                "r_frame_rate": "24000/1001",
+                "avg_frame_rate": "24000/1001",
+                "time_base": "1/1000",
+                "start_pts": 0,
+                "start_time": "0.000000",
+                "duration": "5423.104000",
+                "bit_rate": "640000",
+                "nb_frames": "130024",
+                "disposition": {"default": 1 if i < 2 else 0, "forced": 0},
+                "tags": {"language": "eng", "title": f"Track {i}"},
+            }
+            for i in range(streams)
+        ],
+        "chapters": [
+            {
+                "id": n,
+                "time_base": "1/1000000000",
+                "start": n * 600_000_000_000,
+                "start_time": f"{n * 600}.000000",
+                "end": (n + 1) * 600_000_000_000,
+                "end_time": f"{(n + 1) * 600}.000000",
+                "tags": {"title": f"Chapter {n + 1}"},
+            }
+            for n in range(chapters)
+        ],
+    }
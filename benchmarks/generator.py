@@ -0,0 +1,292 @@
+"""Synthetic catalogs: realistic ffprobe documents drawn from distributions.
+
+Every choice (container, codecs, resolution, how many audio and subtitle
+tracks, chapters, tag sizes) is a weighted distribution on
+``CatalogProfile``, so a profile can describe anything from a tidy movie
+library to a messy archive. The defaults average about 10 streams per file,
+so one million files is roughly ten million streams.
+
+Generation is deterministic for a given seed and file index, which lets
+several loaders split a catalog between them and lets the load-test driver
+regenerate the probe of any file it did not create itself.
+"""
+
+import json
+import random
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+CODEC_LONG_NAMES = {
+    "h264": "H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10",
+    "hevc": "H.265 / HEVC (High Efficiency Video Coding)",
+    "av1": "Alliance for Open Media AV1",
+    "mpeg2video": "MPEG-2 video",
+    "aac": "AAC (Advanced Audio Coding)",
+    "ac3": "ATSC A/52A (AC-3)",
+    "eac3": "ATSC A/52B (AC-3, E-AC-3)",
+    "dts": "DCA (DTS Coherent Acoustics)",
+    "truehd": "TrueHD",
+    "opus": "Opus (Opus Interactive Audio Codec)",
+    "subrip": "SubRip subtitle",
+    "ass": "ASS (Advanced SSA) subtitle",
+    "hdmv_pgs_subtitle": "HDMV Presentation Graphic Stream subtitles",
+    "mov_text": "3GPP Timed Text subtitle",
+}
+CONTAINERS = {
+    "matroska,webm": ("Matroska / WebM", ".mkv"),
+    "mov,mp4,m4a,3gp,3g2,mj2": ("QuickTime / MOV", ".mp4"),
+    "mpegts": ("MPEG-TS (MPEG-2 Transport Stream)", ".ts"),
+}
+CHANNEL_LAYOUTS = {1: "mono", 2: "stereo", 6: "5.1(side)", 8: "7.1"}
+LANGUAGES = ["eng", "fra", "deu", "spa", "ita", "jpn", "por", "rus", "kor", "zho"]
+_WORDS = "the of and a in to is was for on with as by at from his her it an".split()
+
+
+def _weighted(rng: random.Random, weights: Dict[Any, float]) -> Any:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+@dataclass
+class CatalogProfile:
+    """Weighted distributions a synthetic catalog is drawn from."""
+
+    containers: Dict[str, float] = field(
+        default_factory=lambda: {
+            "matroska,webm": 0.55,
+            "mov,mp4,m4a,3gp,3g2,mj2": 0.35,
+            "mpegts": 0.10,
+        }
+    )
+    video_codecs: Dict[str, float] = field(
+        default_factory=lambda: {
+            "h264": 0.55,
+            "hevc": 0.33,
+            "av1": 0.07,
+            "mpeg2video": 0.05,
+        }
+    )
+    # "WIDTHxHEIGHT"
+    resolutions: Dict[str, float] = field(
+        default_factory=lambda: {
+            "3840x2160": 0.15,
+            "1920x1080": 0.50,
+            "1280x720": 0.22,
+            "720x480": 0.13,
+        }
+    )
+    audio_codecs: Dict[str, float] = field(
+        default_factory=lambda: {
+            "aac": 0.45,
+            "ac3": 0.20,
+            "eac3": 0.15,
+            "dts": 0.08,
+            "truehd": 0.05,
+            "opus": 0.07,
+        }
+    )
+    subtitle_codecs: Dict[str, float] = field(
+        default_factory=lambda: {
+            "subrip": 0.55,
+            "hdmv_pgs_subtitle": 0.30,
+            "ass": 0.10,
+            "mov_text": 0.05,
+        }
+    )
+    # Track counts per file; files always have one video stream
+    audio_tracks: Dict[int, float] = field(
+        default_factory=lambda: {1: 0.45, 2: 0.25, 3: 0.15, 4: 0.10, 8: 0.05}
+    )
+    subtitle_tracks: Dict[int, float] = field(
+        default_factory=lambda: {
+            0: 0.21,
+            1: 0.20,
+            3: 0.15,
+            6: 0.15,
+            12: 0.13,
+            20: 0.10,
+            30: 0.06,
+        }
+    )
+    chapters: Dict[int, float] = field(
+        default_factory=lambda: {0: 0.40, 5: 0.20, 12: 0.25, 24: 0.10, 60: 0.05}
+    )
+    # Bytes of free text in the format "comment" tag
+    tag_bytes: Dict[int, float] = field(
+        default_factory=lambda: {0: 0.60, 64: 0.25, 512: 0.10, 4096: 0.05}
+    )
+    min_duration: float = 60.0
+    max_duration: float = 3 * 3600.0
+
+    @property
+    def mean_streams(self) -> float:
+        def mean(weights: Dict[int, float]) -> float:
+            return sum(k * w for k, w in weights.items()) / sum(weights.values())
+
+        return 1 + mean(self.audio_tracks) + mean(self.subtitle_tracks)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CatalogProfile":
+        """A profile overriding the defaults; JSON object keys become ints
+        for the count distributions."""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+        values = dict(data)
+        for name in ("audio_tracks", "subtitle_tracks", "chapters", "tag_bytes"):
+            if name in values:
+                values[name] = {int(k): w for k, w in values[name].items()}
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, path: str) -> "CatalogProfile":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _text(rng: random.Random, size: int) -> str:
+    words: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def _stream(
+    rng: random.Random, index: int, codec_type: str, codec_name: str, duration: str
+) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "codec_name": codec_name,
+        "codec_long_name": CODEC_LONG_NAMES.get(codec_name),
+        "codec_type": codec_type,
+        "codec_tag_string": "[0][0][0][0]",
+        "codec_tag": "0x0000",
+        "time_base": "1/1000",
+        "start_pts": 0,
+        "start_time": "0.000000",
+        "duration": duration,
+        "disposition": {"default": 1 if index < 2 else 0, "forced": 0},
+        "tags": {"language": rng.choice(LANGUAGES)},
+    }
+
+
+class CatalogGenerator:
+    """Deterministic ffprobe documents for file ``index`` of a catalog."""
+
+    def __init__(
+        self,
+        profile: Optional[CatalogProfile] = None,
+        seed: int = 0,
+        prefix: str = "/catalog",
+    ):
+        self.profile = profile or CatalogProfile()
+        self.seed = seed
+        self.prefix = prefix.rstrip("/")
+
+    def filepath(self, index: int, container: str) -> str:
+        extension = CONTAINERS.get(container, ("", ".bin"))[1]
+        return f"{self.prefix}/{index // 1000:05d}/{index:08d}{extension}"
+
+    def probe(self, index: int) -> Tuple[str, Dict[str, Any]]:
+        """``(filepath, ffprobe output)`` for the file at ``index``."""
+        rng = random.Random(self.seed * 1_000_003 + index)
+        profile = self.profile
+        container = _weighted(rng, profile.containers)
+        filepath = self.filepath(index, container)
+        seconds = rng.uniform(profile.min_duration, profile.max_duration)
+        duration = f"{seconds:.6f}"
+
+        video_codec = _weighted(rng, profile.video_codecs)
+        width, height = (int(v) for v in _weighted(rng, profile.resolutions).split("x"))
+        video_bit_rate = int(width * height * rng.uniform(1.5, 4.0))
+        video = _stream(rng, 0, "video", video_codec, duration)
+        video.update(
+            width=width,
+            height=height,
+            coded_width=width,
+            coded_height=height,
+            pix_fmt="yuv420p10le" if video_codec in ("hevc", "av1") else "yuv420p",
+            r_frame_rate="24000/1001",
+            avg_frame_rate="24000/1001",
+            bit_rate=str(video_bit_rate),
+            nb_frames=str(int(seconds * 24000 / 1001)),
+        )
+        streams = [video]
+        bit_rate = video_bit_rate
+
+        for _ in range(_weighted(rng, profile.audio_tracks)):
+            channels = rng.choice(list(CHANNEL_LAYOUTS))
+            audio_bit_rate = 64_000 * channels
+            audio = _stream(
+                rng,
+                len(streams),
+                "audio",
+                _weighted(rng, profile.audio_codecs),
+                duration,
+            )
+            audio.update(
+                sample_fmt="fltp",
+                sample_rate=48000,
+                channels=channels,
+                channel_layout=CHANNEL_LAYOUTS[channels],
+                bit_rate=str(audio_bit_rate),
+            )
+            streams.append(audio)
+            bit_rate += audio_bit_rate
+
+        for _ in range(_weighted(rng, profile.subtitle_tracks)):
+            streams.append(
+                _stream(
+                    rng,
+                    len(streams),
+                    "subtitle",
+                    _weighted(rng, profile.subtitle_codecs),
+                    duration,
+                )
+            )
+
+        chapter_count = _weighted(rng, profile.chapters)
+        chapter_length = seconds / max(chapter_count, 1)
+        chapters = [
+            {
+                "id": n,
+                "time_base": "1/1000000000",
+                "start": int(n * chapter_length * 1e9),
+                "start_time": f"{n * chapter_length:.6f}",
+                "end": int((n + 1) * chapter_length * 1e9),
+                "end_time": f"{(n + 1) * chapter_length:.6f}",
+                "tags": {"title": f"Chapter {n + 1}"},
+            }
+            for n in range(chapter_count)
+        ]
+
+        tags = {"title": f"Title {index}", "encoder": "libebml v1.4.2"}
+        comment_bytes = _weighted(rng, profile.tag_bytes)
+        if comment_bytes:
+            tags["comment"] = _text(rng, comment_bytes)
+
+        format_long_name = CONTAINERS.get(container, (container, ""))[0]
+        return filepath, {
+            "format": {
+                "filename": filepath,
+                "nb_streams": len(streams),
+                "nb_programs": 0,
+                "format_name": container,
+                "format_long_name": format_long_name,
+                "start_time": "0.000000",
+                "duration": duration,
+                "size": str(int(seconds * bit_rate / 8)),
+                "bit_rate": str(bit_rate),
+                "probe_score": 100,
+                "tags": tags,
+            },
+            "streams": streams,
+            "chapters": chapters,
+        }
+
+    def probes(self, start: int, stop: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for index in range(start, stop):
+            yield self.probe(index)
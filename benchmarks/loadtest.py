@@ -0,0 +1,385 @@
+"""Replay mixed read/write traffic against the API and report latencies.
+
+A fixed number of concurrent clients each loop over a weighted mix of
+operations (closed loop: a client sends its next request as soon as the
+previous one finishes) for ``--duration`` seconds or ``--requests`` requests,
+then p50/p95/p99 latency and throughput are printed per endpoint.
+
+    python -m benchmarks.loadtest --base-url http://localhost:8000 --duration 60
+    python -m benchmarks.loadtest --concurrency 64 --mix detail=60,create=0
+    DATABASE_URL=sqlite+aiosqlite:///catalog.db python -m benchmarks.loadtest --asgi
+
+Reads target a working set of ``--sample`` existing files discovered at
+startup (load a catalog first with ``benchmarks.load_catalog``). Writes
+create files under their own prefix; updates rewrite files from the working
+set with a freshly generated probe and deletes only remove files the run
+created itself, so a catalog can be reused across runs.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.generator import CatalogGenerator
+
+PAGE_SIZE = 50
+
+DEFAULT_MIX = {
+    "detail": 35,
+    "revalidate": 10,
+    "list": 10,
+    "search": 10,
+    "streams": 10,
+    "stats": 5,
+    "create": 10,
+    "update": 5,
+    "delete": 5,
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """``"detail=60,create=0"`` on top of the default mix."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(
+                f"Unknown operation {name!r}. Known: {', '.join(DEFAULT_MIX)}"
+            )
+        mix[name] = int(weight)
+    return mix
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+
+class LoadTest:
+    """Shared state of one run: the working set and per-endpoint timings."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        mix: Dict[str, int],
+        generator: Optional[CatalogGenerator] = None,
+        seed: int = 0,
+    ):
+        self.client = client
+        self.rng = random.Random(seed)
+        # New files go under a per-run prefix so runs never collide
+        self.generator = generator or CatalogGenerator(
+            seed=seed, prefix=f"/loadtest/{uuid.uuid4().hex[:8]}"
+        )
+        self.operations: Dict[str, Callable[[], Awaitable[Optional[str]]]] = {
+            "detail": self.detail,
+            "revalidate": self.revalidate,
+            "list": self.list_files,
+            "search": self.search,
+            "streams": self.streams,
+            "stats": self.stats,
+            "create": self.create,
+            "update": self.update,
+            "delete": self.delete,
+        }
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0}
+        self.files: List[Tuple[int, str]] = []
+        self.created: List[int] = []
+        self.etags: Dict[int, str] = {}
+        self.results: Dict[str, EndpointStats] = {}
+        self._next_index = 0
+
+    async def discover(self, sample: int) -> int:
+        """Collect up to ``sample`` existing (id, filepath) pairs."""
+        url = f"/media-files/?fields=filepath&limit={min(sample, 1000)}"
+        while url and len(self.files) < sample:
+            response = await self.client.get(url)
+            response.raise_for_status()
+            self.files += [(item["id"], item["filepath"]) for item in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            url = (
+                f"/media-files/?fields=filepath&limit={min(sample, 1000)}"
+                f"&cursor={cursor}"
+                if cursor
+                else None
+            )
+        del self.files[sample:]
+        return len(self.files)
+
+    async def _timed(
+        self, label: str, method: str, url: str, expected=(200,), **kwargs
+    ) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.results.setdefault(label, EndpointStats()).errors += 1
+            raise
+        stats = self.results.setdefault(label, EndpointStats())
+        stats.latencies.append(time.perf_counter() - started)
+        if response.status_code not in expected:
+            stats.errors += 1
+        return response
+
+    def _file(self) -> Tuple[int, str]:
+        return self.rng.choice(self.files)
+
+    def _new_probe(self, filepath: Optional[str] = None) -> Dict[str, Any]:
+        self._next_index += 1
+        path, probe = self.generator.probe(self._next_index)
+        if filepath:
+            probe["format"]["filename"] = filepath
+        return {"filepath": filepath or path, "ffprobe_data": probe}
+
+    # Operations return the name of the one that actually ran, or None when
+    # its precondition failed and another should be drawn.
+
+    async def detail(self):
+        media_file_id, _ = self._file()
+        response = await self._timed(
+            "GET /media-files/{id}", "GET", _detail(media_file_id)
+        )
+        if "etag" in response.headers:
+            self.etags[media_file_id] = response.headers["etag"]
+        return "detail"
+
+    async def revalidate(self):
+        if not self.etags:
+            return None
+        media_file_id = self.rng.choice(list(self.etags))
+        await self._timed(
+            "GET /media-files/{id} If-None-Match",
+            "GET",
+            _detail(media_file_id),
+            expected=(200, 304),
+            headers={"If-None-Match": self.etags[media_file_id]},
+        )
+        return "revalidate"
+
+    async def list_files(self):
+        container = self.rng.choice(list(self.generator.profile.containers))
+        await self._timed(
+            "GET /media-files/",
+            "GET",
+            "/media-files/",
+            params={"format_name": container, "limit": PAGE_SIZE},
+        )
+        return "list"
+
+    async def search(self):
+        profile = self.generator.profile
+        resolution = self.rng.choice(list(profile.resolutions))
+        await self._timed(
+            "GET /media-files/search",
+            "GET",
+            "/media-files/search",
+            params={
+                "codec_name": self.rng.choice(list(profile.video_codecs)),
+                "min_height": int(resolution.split("x")[1]),
+                "limit": PAGE_SIZE,
+            },
+        )
+        return "search"
+
+    async def streams(self):
+        media_file_id, _ = self._file()
+        await self._timed(
+            "GET /media-files/{id}/streams",
+            "GET",
+            f"{_detail(media_file_id)}/streams",
+        )
+        return "streams"
+
+    async def stats(self):
+        await self._timed("GET /stats", "GET", "/stats")
+        return "stats"
+
+    async def create(self):
+        response = await self._timed(
+            "POST /media-files/",
+            "POST",
+            "/media-files/",
+            expected=(201,),
+            json=self._new_probe(),
+        )
+        if response.status_code == 201:
+            self.created.append(response.json()["id"])
+        return "create"
+
+    async def update(self):
+        media_file_id, filepath = self._file()
+        await self._timed(
+            "PUT /media-files/{id}",
+            "PUT",
+            _detail(media_file_id),
+            json=self._new_probe(filepath),
+        )
+        return "update"
+
+    async def delete(self):
+        if not self.created:
+            return None
+        media_file_id = self.created.pop(self.rng.randrange(len(self.created)))
+        await self._timed(
+            "DELETE /media-files/{id}",
+            "DELETE",
+            _detail(media_file_id),
+            expected=(204,),
+        )
+        return "delete"
+
+    async def _client_loop(self, deadline: float, remaining: List[float]) -> None:
+        names, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            for _ in range(len(names) + 1):
+                name = self.rng.choices(names, weights=weights)[0]
+                try:
+                    if await self.operations[name]() is not None:
+                        break
+                except httpx.HTTPError:
+                    break
+
+    async def run(
+        self, concurrency: int, duration: float, requests: Optional[int] = None
+    ) -> float:
+        """Run the mix; returns the elapsed wall time in seconds."""
+        if not self.files and any(
+            self.mix.get(name) for name in ("detail", "streams", "update")
+        ):
+            raise RuntimeError(
+                "No media files to read; load a catalog first or disable "
+                "detail, streams and update in the mix"
+            )
+        started = time.perf_counter()
+        remaining = [requests if requests is not None else float("inf")]
+        await asyncio.gather(
+            *(
+                self._client_loop(started + duration, remaining)
+                for _ in range(concurrency)
+            )
+        )
+        return time.perf_counter() - started
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, Any]]:
+        endpoints = {
+            label: stats.summary(elapsed)
+            for label, stats in sorted(self.results.items())
+        }
+        total = EndpointStats(
+            [latency for stats in self.results.values() for latency in stats.latencies],
+            sum(stats.errors for stats in self.results.values()),
+        )
+        endpoints["total"] = total.summary(elapsed)
+        return endpoints
+
+
+def _detail(media_file_id: int) -> str:
+    return f"/media-files/{media_file_id}"
+
+
+def format_summary(summary: Dict[str, Dict[str, Any]]) -> str:
+    width = max(len(label) for label in summary)
+    lines = [
+        f"{'endpoint':<{width}} {'requests':>9} {'errors':>7} {'req/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    ]
+    for label, row in summary.items():
+        lines.append(
+            f"{label:<{width}} {row['requests']:>9} {row['errors']:>7} "
+            f"{row['throughput']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+            f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    if args.asgi:
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    else:
+        transport = httpx.AsyncHTTPTransport(retries=0)
+        base_url = args.base_url
+
+    async with httpx.AsyncClient(
+        transport=transport,
+        base_url=base_url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+        load_test = LoadTest(client, args.mix, seed=args.seed)
+        found = await load_test.discover(args.sample)
+        print(
+            f"Working set: {found} files; {args.concurrency} clients for "
+            f"{args.duration:.0f}s"
+            + (f" or {args.requests} requests" if args.requests else "")
+        )
+        elapsed = await load_test.run(args.concurrency, args.duration, args.requests)
+        return load_test.summary(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--asgi",
+        action="store_true",
+        help="drive main.app in-process instead of --base-url",
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=dict(DEFAULT_MIX),
+        help="operation weights, default "
+        + ",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+    )
+    parser.add_argument("--sample", type=int, default=10_000, help="files to read")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="also write the summary as JSON")
+    args = parser.parse_args()
+
+    summary = asyncio.run(_main(args))
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
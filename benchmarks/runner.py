@@ -0,0 +1,192 @@
+"""Timing, result files and baseline comparison for the benchmark suite."""
+
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_MIN_TIME = 0.2  # seconds per round
+DEFAULT_ROUNDS = 5
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    median_us: float
+    min_us: float
+    max_us: float
+    rounds: int
+    iterations: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class Benchmark:
+    """A named operation. ``setup`` returns the callable that gets timed."""
+
+    name: str
+    setup: Callable[..., Any]
+    is_async: bool = False
+    tags: List[str] = field(default_factory=list)
+
+
+def _calibrate(run_once: Callable[[int], float], min_time: float) -> int:
+    """Iterations per round so that a round lasts at least ``min_time``."""
+    iterations = 1
+    while True:
+        elapsed = run_once(iterations)
+        if elapsed >= min_time or iterations >= 1_000_000:
+            return iterations
+        iterations = max(
+            iterations * 2, int(iterations * min_time / max(elapsed, 1e-9))
+        )
+
+
+def _summarize(name: str, timings: List[float], iterations: int) -> BenchmarkResult:
+    per_call = [elapsed / iterations * 1e6 for elapsed in timings]
+    return BenchmarkResult(
+        name=name,
+        median_us=statistics.median(per_call),
+        min_us=min(per_call),
+        max_us=max(per_call),
+        rounds=len(per_call),
+        iterations=iterations,
+    )
+
+
+def time_sync(
+    name: str, func: Callable[[], Any], rounds: int, min_time: float
+) -> BenchmarkResult:
+    def run_once(iterations: int) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        return time.perf_counter() - start
+
+    iterations = _calibrate(run_once, min_time)
+    return _summarize(name, [run_once(iterations) for _ in range(rounds)], iterations)
+
+
+async def time_async(
+    name: str, func: Callable[[], Awaitable[Any]], rounds: int, min_time: float
+) -> BenchmarkResult:
+    # Calibration needs awaiting, so it is inlined rather than shared
+    async def run_once(iterations: int) -> float:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        return time.perf_counter() - start
+
+    iterations = 1
+    while True:
+        elapsed = await run_once(iterations)
+        if elapsed >= min_time or iterations >= 100_000:
+            break
+        iterations = max(
+            iterations * 2, int(iterations * min_time / max(elapsed, 1e-9))
+        )
+
+    timings = [await run_once(iterations) for _ in range(rounds)]
+    return _summarize(name, timings, iterations)
+
+
+def environment() -> Dict[str, Any]:
+    import pydantic
+    import sqlalchemy
+    import fastapi
+
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fastapi": fastapi.__version__,
+        "pydantic": pydantic.VERSION,
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+def save_results(path: str, results: List[BenchmarkResult]) -> None:
+    document = {
+        "environment": environment(),
+        "results": {result.name: result.to_dict() for result in results},
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_us: Optional[float]
+    current_us: float
+
+    @property
+    def change(self) -> Optional[float]:
+        """Relative change of the median; positive means slower."""
+        if not self.baseline_us:
+            return None
+        return self.current_us / self.baseline_us - 1
+
+
+def compare_results(
+    baseline: Dict[str, Dict[str, Any]], results: List[BenchmarkResult]
+) -> List[Comparison]:
+    return [
+        Comparison(
+            name=result.name,
+            baseline_us=baseline.get(result.name, {}).get("median_us"),
+            current_us=result.median_us,
+        )
+        for result in results
+    ]
+
+
+def regressions(comparisons: List[Comparison], threshold: float) -> List[Comparison]:
+    return [
+        comparison
+        for comparison in comparisons
+        if comparison.change is not None and comparison.change > threshold
+    ]
+
+
+def run_benchmarks(
+    benchmarks: List[Benchmark], rounds: int, min_time: float, report=print
+) -> List[BenchmarkResult]:
+    async def run_all() -> List[BenchmarkResult]:
+        results = []
+        for benchmark in benchmarks:
+            if benchmark.is_async:
+                func = await benchmark.setup()
+                result = await time_async(benchmark.name, func, rounds, min_time)
+            else:
+                func = benchmark.setup()
+                result = time_sync(benchmark.name, func, rounds, min_time)
+            report(result)
+            results.append(result)
+        return results
+
+    return asyncio.run(run_all())
@@ -0,0 +1,158 @@
+"""initial schema
+
+Revision ID: 7b1e3c9a2d45
+Revises: 4edc0dc62195
+Create Date: 2026-10-17 09:12:41.508233
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7b1e3c9a2d45"
+down_revision: Union[str, Sequence[str], None] = "4edc0dc62195"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "media_files",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=True),
+        sa.Column("format_name", sa.String(), nullable=True),
+        sa.Column("format_long_name", sa.String(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("bit_rate", sa.Integer(), nullable=True),
+        sa.Column("probe_score", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.Float(), nullable=True),
+        sa.Column("nb_streams", sa.Integer(), nullable=True),
+        sa.Column("nb_programs", sa.Integer(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("raw_ffprobe", sa.JSON(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_files_id", "media_files", ["id"], unique=False)
+
+    op.create_table(
+        "media_streams",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("media_file_id", sa.Integer(), nullable=False),
+        sa.Column("index", sa.Integer(), nullable=False),
+        sa.Column("codec_name", sa.String(), nullable=True),
+        sa.Column("codec_long_name", sa.String(), nullable=True),
+        sa.Column("codec_type", sa.String(), nullable=True),
+        sa.Column("codec_tag_string", sa.String(), nullable=True),
+        sa.Column("codec_tag", sa.String(), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("coded_width", sa.Integer(), nullable=True),
+        sa.Column("coded_height", sa.Integer(), nullable=True),
+        sa.Column("closed_captions", sa.Boolean(), nullable=True),
+        sa.Column("film_grain", sa.Boolean(), nullable=True),
+        sa.Column("has_b_frames", sa.Integer(), nullable=True),
+        sa.Column("sample_aspect_ratio", sa.String(), nullable=True),
+        sa.Column("display_aspect_ratio", sa.String(), nullable=True),
+        sa.Column("pix_fmt", sa.String(), nullable=True),
+        sa.Column("level", sa.Integer(), nullable=True),
+        sa.Column("color_range", sa.String(), nullable=True),
+        sa.Column("color_space", sa.String(), nullable=True),
+        sa.Column("color_transfer", sa.String(), nullable=True),
+        sa.Column("color_primaries", sa.String(), nullable=True),
+        sa.Column("chroma_location", sa.String(), nullable=True),
+        sa.Column("field_order", sa.String(), nullable=True),
+        sa.Column("refs", sa.Integer(), nullable=True),
+        sa.Column("r_frame_rate", sa.String(), nullable=True),
+        sa.Column("avg_frame_rate", sa.String(), nullable=True),
+        sa.Column("time_base", sa.String(), nullable=True),
+        sa.Column("sample_fmt", sa.String(), nullable=True),
+        sa.Column("sample_rate", sa.Integer(), nullable=True),
+        sa.Column("channels", sa.Integer(), nullable=True),
+        sa.Column("channel_layout", sa.String(), nullable=True),
+        sa.Column("bits_per_sample", sa.Integer(), nullable=True),
+        sa.Column("start_pts", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.Float(), nullable=True),
+        sa.Column("duration_ts", sa.Integer(), nullable=True),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("bit_rate", sa.Integer(), nullable=True),
+        sa.Column("max_bit_rate", sa.Integer(), nullable=True),
+        sa.Column("bits_per_raw_sample", sa.Integer(), nullable=True),
+        sa.Column("nb_frames", sa.Integer(), nullable=True),
+        sa.Column("nb_read_frames", sa.Integer(), nullable=True),
+        sa.Column("nb_read_packets", sa.Integer(), nullable=True),
+        sa.Column("disposition", sa.JSON(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["media_file_id"], ["media_files.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_streams_id", "media_streams", ["id"], unique=False)
+
+    op.create_table(
+        "media_chapters",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("media_file_id", sa.Integer(), nullable=False),
+        sa.Column("chapter_id", sa.Integer(), nullable=False),
+        sa.Column("time_base", sa.String(), nullable=True),
+        sa.Column("start", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.Float(), nullable=True),
+        sa.Column("end", sa.Integer(), nullable=True),
+        sa.Column("end_time", sa.Float(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["media_file_id"], ["media_files.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_chapters_id", "media_chapters", ["id"], unique=False)
+
+    op.create_table(
+        "ffprobe_errors",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("error_code", sa.Integer(), nullable=True),
+        sa.Column(
+            "attempted_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ffprobe_errors_id", "ffprobe_errors", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ffprobe_errors_id", table_name="ffprobe_errors")
+    op.drop_table("ffprobe_errors")
+    op.drop_index("ix_media_chapters_id", table_name="media_chapters")
+    op.drop_table("media_chapters")
+    op.drop_index("ix_media_streams_id", table_name="media_streams")
+    op.drop_table("media_streams")
+    op.drop_index("ix_media_files_id", table_name="media_files")
+    op.drop_table("media_files")
@@ -0,0 +1,62 @@
+"""ffprobe cache
+
+Revision ID: 9c2f4d6e8a13
+Revises: 7b1e3c9a2d45
+Create Date: 2026-10-17 09:14:05.117902
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c2f4d6e8a13"
+down_revision: Union[str, Sequence[str], None] = "7b1e3c9a2d45"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ffprobe_cache",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("device", sa.BigInteger(), nullable=False),
+        sa.Column("inode", sa.BigInteger(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("mtime_ns", sa.BigInteger(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("ffprobe_data", sa.JSON(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ffprobe_cache_id", "ffprobe_cache", ["id"], unique=False)
+    op.create_index(
+        "ix_ffprobe_cache_identity",
+        "ffprobe_cache",
+        ["device", "inode", "size", "mtime_ns"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_ffprobe_cache_content_hash",
+        "ffprobe_cache",
+        ["content_hash", "size"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ffprobe_cache_content_hash", table_name="ffprobe_cache")
+    op.drop_index("ix_ffprobe_cache_identity", table_name="ffprobe_cache")
+    op.drop_index("ix_ffprobe_cache_id", table_name="ffprobe_cache")
+    op.drop_table("ffprobe_cache")
@@ -0,0 +1,62 @@
+"""query path indexes
+
+Revision ID: a3d5f7b9c1e2
+Revises: 9c2f4d6e8a13
+Create Date: 2026-10-17 09:20:33.640118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3d5f7b9c1e2"
+down_revision: Union[str, Sequence[str], None] = "9c2f4d6e8a13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_media_files_created_at_id",
+        "media_files",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_media_files_filepath", "media_files", ["filepath"], unique=False
+    )
+    op.create_index(
+        "ix_media_streams_file_index",
+        "media_streams",
+        ["media_file_id", "index", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_media_streams_codec_type",
+        "media_streams",
+        ["codec_type", "media_file_id", "index", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_media_chapters_file_chapter",
+        "media_chapters",
+        ["media_file_id", "chapter_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_ffprobe_errors_filepath", "ffprobe_errors", ["filepath"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ffprobe_errors_filepath", table_name="ffprobe_errors")
+    op.drop_index("ix_media_chapters_file_chapter", table_name="media_chapters")
+    op.drop_index("ix_media_streams_codec_type", table_name="media_streams")
+    op.drop_index("ix_media_streams_file_index", table_name="media_streams")
+    op.drop_index("ix_media_files_filepath", table_name="media_files")
+    op.drop_index("ix_media_files_created_at_id", table_name="media_files")
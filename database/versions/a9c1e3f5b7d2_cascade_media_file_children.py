@@ -0,0 +1,55 @@
+"""cascade media file children
+
+Streams, chapters and raw probes are removed by ON DELETE CASCADE when their
+media file is deleted, so a delete is a single statement.
+
+Revision ID: a9c1e3f5b7d2
+Revises: b8d0f2a4c6e7
+Create Date: 2026-10-17 16:20:05.314877
+
+"""
+
+from typing import Optional, Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a9c1e3f5b7d2"
+down_revision: Union[str, Sequence[str], None] = "b8d0f2a4c6e7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHILD_TABLES = ["media_streams", "media_chapters", "media_file_raw_probes"]
+# The foreign keys were created unnamed. Batch mode names reflected SQLite
+# constraints with this convention so they can be dropped; PostgreSQL named
+# them <table>_<column>_fkey.
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"
+}
+
+
+def _replace_foreign_keys(ondelete: Optional[str]) -> None:
+    sqlite = op.get_bind().dialect.name == "sqlite"
+    for table in CHILD_TABLES:
+        if sqlite:
+            name = f"fk_{table}_media_file_id_media_files"
+        else:
+            name = f"{table}_media_file_id_fkey"
+        with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            batch_op.drop_constraint(name, type_="foreignkey")
+            batch_op.create_foreign_key(
+                name, "media_files", ["media_file_id"], ["id"], ondelete=ondelete
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _replace_foreign_keys("CASCADE")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(None)
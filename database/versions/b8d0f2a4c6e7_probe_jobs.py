@@ -0,0 +1,59 @@
+"""probe jobs
+
+Queue of ffprobe runs for POST /probe-jobs, worked by the in-process
+probe job workers.
+
+Revision ID: b8d0f2a4c6e7
+Revises: f7b9d1c3e5a6
+Create Date: 2026-10-17 15:02:41.508213
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d0f2a4c6e7"
+down_revision: Union[str, Sequence[str], None] = "f7b9d1c3e5a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "probe_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("lease_owner", sa.String(), nullable=True),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("media_file_id", sa.Integer(), nullable=True),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["media_file_id"], ["media_files.id"], ondelete="SET NULL"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_probe_jobs_status_id", "probe_jobs", ["status", "id"])
+    op.create_index("ix_probe_jobs_filepath", "probe_jobs", ["filepath"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_probe_jobs_filepath", table_name="probe_jobs")
+    op.drop_index("ix_probe_jobs_status_id", table_name="probe_jobs")
+    op.drop_table("probe_jobs")
@@ -0,0 +1,62 @@
+"""ffprobe failures
+
+One row per file whose last ffprobe run failed, with its attempt count,
+identity and next retry time; see media_api.utils.probe_failures.
+
+Revision ID: c0e2a4b6d8f1
+Revises: a9c1e3f5b7d2
+Create Date: 2026-10-17 17:41:12.860254
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c0e2a4b6d8f1"
+down_revision: Union[str, Sequence[str], None] = "a9c1e3f5b7d2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ffprobe_failures",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("filepath", sa.String(), nullable=False),
+        sa.Column("error_class", sa.String(), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("error_code", sa.Integer(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("device", sa.BigInteger(), nullable=True),
+        sa.Column("inode", sa.BigInteger(), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("mtime_ns", sa.BigInteger(), nullable=True),
+        sa.Column("first_failed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_failed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("next_retry_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_ffprobe_failures_filepath", "ffprobe_failures", ["filepath"], unique=True
+    )
+    op.create_index(
+        "ix_ffprobe_failures_error_class_id",
+        "ffprobe_failures",
+        ["error_class", "id"],
+    )
+    op.create_index(
+        "ix_ffprobe_failures_next_retry_at", "ffprobe_failures", ["next_retry_at"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ffprobe_failures_next_retry_at", table_name="ffprobe_failures")
+    op.drop_index("ix_ffprobe_failures_error_class_id", table_name="ffprobe_failures")
+    op.drop_index("ix_ffprobe_failures_filepath", table_name="ffprobe_failures")
+    op.drop_table("ffprobe_failures")
@@ -0,0 +1,105 @@
+"""raw probe store
+
+Moves media_files.raw_ffprobe into the gzip-compressed
+media_file_raw_probes table.
+
+Revision ID: c4e6a8b0d2f3
+Revises: a3d5f7b9c1e2
+Create Date: 2026-10-17 10:02:17.229514
+
+"""
+
+import gzip
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e6a8b0d2f3"
+down_revision: Union[str, Sequence[str], None] = "a3d5f7b9c1e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+media_files = sa.table(
+    "media_files", sa.column("id", sa.Integer), sa.column("raw_ffprobe", sa.JSON)
+)
+raw_probes = sa.table(
+    "media_file_raw_probes",
+    sa.column("media_file_id", sa.Integer),
+    sa.column("encoding", sa.String),
+    sa.column("data", sa.LargeBinary),
+    sa.column("size", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "media_file_raw_probes",
+        sa.Column("media_file_id", sa.Integer(), nullable=False),
+        sa.Column("encoding", sa.String(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+        sa.ForeignKeyConstraint(["media_file_id"], ["media_files.id"]),
+        sa.PrimaryKeyConstraint("media_file_id"),
+    )
+
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(media_files.c.id, media_files.c.raw_ffprobe)
+            .where(media_files.c.id > last_id, media_files.c.raw_ffprobe.is_not(None))
+            .order_by(media_files.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for media_file_id, raw_ffprobe in rows:
+            raw = json.dumps(raw_ffprobe, separators=(",", ":")).encode()
+            values.append(
+                {
+                    "media_file_id": media_file_id,
+                    "encoding": "gzip",
+                    "data": gzip.compress(raw, compresslevel=6, mtime=0),
+                    "size": len(raw),
+                }
+            )
+        connection.execute(raw_probes.insert(), values)
+        last_id = rows[-1].id
+
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.drop_column("raw_ffprobe")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.add_column(sa.Column("raw_ffprobe", sa.JSON(), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(raw_probes.c.media_file_id, raw_probes.c.data).where(
+            raw_probes.c.encoding == "gzip"
+        )
+    )
+    for media_file_id, data in rows.all():
+        connection.execute(
+            media_files.update()
+            .where(media_files.c.id == media_file_id)
+            .values(raw_ffprobe=json.loads(gzip.decompress(data)))
+        )
+
+    op.drop_table("media_file_raw_probes")
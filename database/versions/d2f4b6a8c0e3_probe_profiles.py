@@ -0,0 +1,57 @@
+"""probe profiles
+
+Record which probe profile (fast, standard, deep) produced a cached ffprobe
+result or a probe job is to run, and keep cached results per profile; see
+media_api.utils.probe_profiles.
+
+Revision ID: d2f4b6a8c0e3
+Revises: c0e2a4b6d8f1
+Create Date: 2026-10-17 19:12:36.402817
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d2f4b6a8c0e3"
+down_revision: Union[str, Sequence[str], None] = "c0e2a4b6d8f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows were all probed with what is now the standard profile
+    for table in ("ffprobe_cache", "probe_jobs"):
+        op.add_column(
+            table,
+            sa.Column(
+                "profile", sa.String(), server_default="standard", nullable=False
+            ),
+        )
+    op.drop_index("ix_ffprobe_cache_identity", table_name="ffprobe_cache")
+    op.create_index(
+        "ix_ffprobe_cache_identity",
+        "ffprobe_cache",
+        ["device", "inode", "size", "mtime_ns", "profile"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM ffprobe_cache WHERE profile != 'standard'")
+    op.drop_index("ix_ffprobe_cache_identity", table_name="ffprobe_cache")
+    op.create_index(
+        "ix_ffprobe_cache_identity",
+        "ffprobe_cache",
+        ["device", "inode", "size", "mtime_ns"],
+        unique=True,
+    )
+    for table in ("probe_jobs", "ffprobe_cache"):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("profile")
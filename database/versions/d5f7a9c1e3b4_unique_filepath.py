@@ -0,0 +1,73 @@
+"""unique filepath
+
+Makes ix_media_files_filepath unique so ingestion can upsert on it. If
+media_files has several rows for a filepath the upgrade stops and lists them,
+rather than picking which to delete; remove the unwanted rows (for example
+with DELETE /media-files/?ids=...) and run it again.
+
+Revision ID: d5f7a9c1e3b4
+Revises: c4e6a8b0d2f3
+Create Date: 2026-10-17 11:12:40.518230
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5f7a9c1e3b4"
+down_revision: Union[str, Sequence[str], None] = "c4e6a8b0d2f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+media_files = sa.table(
+    "media_files", sa.column("id", sa.Integer), sa.column("filepath", sa.String)
+)
+# Duplicates listed in the error; the total is always given
+LISTED_DUPLICATES = 20
+
+
+def _check_duplicates() -> None:
+    ids = sa.func.count(media_files.c.id)
+    duplicates = (
+        op.get_bind()
+        .execute(
+            sa.select(media_files.c.filepath, ids)
+            .group_by(media_files.c.filepath)
+            .having(ids > 1)
+            .order_by(media_files.c.filepath)
+        )
+        .all()
+    )
+    if not duplicates:
+        return
+    listed = "\n".join(
+        f"  {filepath} ({count} rows)"
+        for filepath, count in duplicates[:LISTED_DUPLICATES]
+    )
+    more = len(duplicates) - LISTED_DUPLICATES
+    if more > 0:
+        listed += f"\n  ... and {more} more"
+    raise RuntimeError(
+        f"media_files has {len(duplicates)} filepath(s) with more than one row; "
+        "delete the rows that should go and run the upgrade again:\n" + listed
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _check_duplicates()
+
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.drop_index("ix_media_files_filepath")
+        batch_op.create_index("ix_media_files_filepath", ["filepath"], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.drop_index("ix_media_files_filepath")
+        batch_op.create_index("ix_media_files_filepath", ["filepath"], unique=False)
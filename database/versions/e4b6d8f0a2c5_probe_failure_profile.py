@@ -0,0 +1,49 @@
+"""probe failure profile
+
+Keep ffprobe failures per probe profile, so a retry runs with the profile
+that failed; see media_api.utils.probe_failures.
+
+Revision ID: e4b6d8f0a2c5
+Revises: d2f4b6a8c0e3
+Create Date: 2026-10-17 21:04:18.553106
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b6d8f0a2c5"
+down_revision: Union[str, Sequence[str], None] = "d2f4b6a8c0e3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Failures recorded so far all come from the standard profile
+    op.add_column(
+        "ffprobe_failures",
+        sa.Column("profile", sa.String(), server_default="standard", nullable=False),
+    )
+    op.drop_index("ix_ffprobe_failures_filepath", table_name="ffprobe_failures")
+    op.create_index(
+        "ix_ffprobe_failures_filepath",
+        "ffprobe_failures",
+        ["filepath", "profile"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM ffprobe_failures WHERE profile != 'standard'")
+    op.drop_index("ix_ffprobe_failures_filepath", table_name="ffprobe_failures")
+    op.create_index(
+        "ix_ffprobe_failures_filepath", "ffprobe_failures", ["filepath"], unique=True
+    )
+    with op.batch_alter_table("ffprobe_failures") as batch_op:
+        batch_op.drop_column("profile")
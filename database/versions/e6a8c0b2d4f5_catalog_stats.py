@@ -0,0 +1,92 @@
+"""catalog stats
+
+Adds the catalog_stats summary table and fills it from the existing catalog.
+The grouping matches media_api.utils.catalog_stats.
+
+Revision ID: e6a8c0b2d4f5
+Revises: d5f7a9c1e3b4
+Create Date: 2026-10-17 12:03:51.774102
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e6a8c0b2d4f5"
+down_revision: Union[str, Sequence[str], None] = "d5f7a9c1e3b4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL = [
+    """
+    INSERT INTO catalog_stats (dimension, key, count, total_duration, total_bytes)
+    SELECT 'total', '', COUNT(id), COALESCE(SUM(duration), 0),
+           COALESCE(SUM(file_size), 0)
+    FROM media_files
+    HAVING COUNT(id) > 0
+    """,
+    """
+    INSERT INTO catalog_stats (dimension, key, count, total_duration, total_bytes)
+    SELECT 'format', COALESCE(format_name, ''), COUNT(id),
+           COALESCE(SUM(duration), 0), COALESCE(SUM(file_size), 0)
+    FROM media_files
+    GROUP BY COALESCE(format_name, '')
+    """,
+    """
+    INSERT INTO catalog_stats (dimension, key, count, total_duration, total_bytes)
+    SELECT 'codec', COALESCE(codec_type, '') || '/' || COALESCE(codec_name, ''),
+           COUNT(id), 0, 0
+    FROM media_streams
+    GROUP BY COALESCE(codec_type, '') || '/' || COALESCE(codec_name, '')
+    """,
+    """
+    INSERT INTO catalog_stats (dimension, key, count, total_duration, total_bytes)
+    SELECT 'resolution', bucket, COUNT(*), 0, 0
+    FROM (
+        SELECT CASE
+            WHEN height IS NULL THEN 'unknown'
+            WHEN height >= 2160 THEN '2160p'
+            WHEN height >= 1440 THEN '1440p'
+            WHEN height >= 1080 THEN '1080p'
+            WHEN height >= 720 THEN '720p'
+            WHEN height >= 480 THEN '480p'
+            ELSE 'sd'
+        END AS bucket
+        FROM media_streams
+        WHERE codec_type = 'video'
+    ) AS video_streams
+    GROUP BY bucket
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "catalog_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("dimension", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.Column("total_duration", sa.Float(), nullable=False),
+        sa.Column("total_bytes", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_catalog_stats_dimension_key",
+        "catalog_stats",
+        ["dimension", "key"],
+        unique=True,
+    )
+    for statement in BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_catalog_stats_dimension_key", table_name="catalog_stats")
+    op.drop_table("catalog_stats")
@@ -0,0 +1,80 @@
+"""search indexes
+
+Indexes for /media-files/search: duration and file_size ranges, streams by
+codec and resolution, and a GIN index over media_files.tags, which becomes
+JSONB on PostgreSQL. file_size widens to BIGINT so files over 2 GiB fit.
+
+Revision ID: f7b9d1c3e5a6
+Revises: e6a8c0b2d4f5
+Create Date: 2026-10-17 12:48:09.316487
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f7b9d1c3e5a6"
+down_revision: Union[str, Sequence[str], None] = "e6a8c0b2d4f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.alter_column(
+            "file_size", existing_type=sa.Integer(), type_=sa.BigInteger()
+        )
+        if is_postgresql:
+            batch_op.alter_column(
+                "tags",
+                existing_type=sa.JSON(),
+                type_=postgresql.JSONB(),
+                postgresql_using="tags::jsonb",
+            )
+        batch_op.create_index("ix_media_files_duration", ["duration"])
+        batch_op.create_index("ix_media_files_file_size", ["file_size"])
+
+    if is_postgresql:
+        op.create_index(
+            "ix_media_files_tags",
+            "media_files",
+            ["tags"],
+            postgresql_using="gin",
+        )
+
+    op.create_index(
+        "ix_media_streams_codec_name",
+        "media_streams",
+        ["codec_name", "height", "width", "media_file_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    is_postgresql = op.get_bind().dialect.name == "postgresql"
+
+    op.drop_index("ix_media_streams_codec_name", table_name="media_streams")
+    if is_postgresql:
+        op.drop_index("ix_media_files_tags", table_name="media_files")
+
+    with op.batch_alter_table("media_files") as batch_op:
+        batch_op.drop_index("ix_media_files_file_size")
+        batch_op.drop_index("ix_media_files_duration")
+        if is_postgresql:
+            batch_op.alter_column(
+                "tags",
+                existing_type=postgresql.JSONB(),
+                type_=sa.JSON(),
+                postgresql_using="tags::json",
+            )
+        batch_op.alter_column(
+            "file_size", existing_type=sa.BigInteger(), type_=sa.Integer()
+        )
@@ -1,19 +1,51 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 import os
-from media_api.core.database import engine
+from media_api.core.database import DATABASE_REPLICA_URLS, dispose_engines, engine
+from media_api.core.metrics import METRICS_ENABLED, render_metrics
+from media_api.core.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    ReadYourWritesMiddleware,
+)
 from media_api.core.models import Base
-from media_api.routers import media_files, media_streams
+from media_api.core.profiling import PROFILING_ENABLED
+from media_api.routers import (
+    media_files,
+    media_streams,
+    probe_failures,
+    probe_jobs,
+    profiles,
+    stats,
+)
+from media_api.utils.parse_pool import parse_pool
+from media_api.utils.probe_cache import probe_cache
+from media_api.utils.probe_failures import FFPROBE_RETRY_ENABLED, probe_retry_scheduler
+from media_api.utils.probe_jobs import PROBE_JOBS_ENABLED, probe_job_worker
+from media_api.utils.probe_pool import probe_pool
+from media_api.utils.response_cache import response_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup - create tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Startup - the schema is owned by Alembic (`alembic upgrade head`);
+    # create_all is kept as an opt-in shortcut for throwaway databases.
+    if os.getenv("DB_CREATE_ALL", "false").lower() == "true":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    if PROBE_JOBS_ENABLED:
+        probe_job_worker.start()
+        # Retries run as probe jobs
+        if FFPROBE_RETRY_ENABLED:
+            probe_retry_scheduler.start()
     yield
     # Shutdown
+    await probe_retry_scheduler.stop()
+    if PROBE_JOBS_ENABLED:
+        await probe_job_worker.stop()
+    parse_pool.shutdown()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -23,8 +55,20 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, router=app.router)
+if METRICS_ENABLED:
+    # Added last so it is outermost and times everything else
+    app.add_middleware(MetricsMiddleware, router=app.router)
+
 app.include_router(media_files.router)
 app.include_router(media_streams.router)
+app.include_router(probe_jobs.router)
+app.include_router(probe_failures.router)
+app.include_router(stats.router)
+app.include_router(profiles.router)
 
 
 @app.get("/")
@@ -34,7 +78,21 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "probe_pool": probe_pool.stats().to_dict(),
+        "parse_pool": parse_pool.stats().to_dict(),
+        "probe_cache": probe_cache.stats().to_dict(),
+        "probe_jobs": probe_job_worker.stats().to_dict(),
+        "probe_retries": probe_retry_scheduler.stats().to_dict(),
+        "response_cache": response_cache.stats().to_dict(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""Prometheus metrics for requests, database access and ffprobe.
+
+Every metric is registered on the default ``prometheus_client`` registry and
+exported by ``GET /metrics``. When the app runs in several worker processes
+set ``PROMETHEUS_MULTIPROC_DIR`` to a shared, empty directory so the
+endpoint aggregates all of them.
+
+Database statements are counted by engine events registered on every
+``Engine``, so the primary, the replicas and ad-hoc engines (scripts, tests)
+all feed the per-request totals kept in ``request_query_stats``.
+"""
+
+import heapq
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Route label for requests that did not match any route, so scanners
+# probing random paths cannot create unbounded label values
+UNMATCHED_ROUTE = "<unmatched>"
+
+HTTP_REQUEST_DURATION = Histogram(
+    "media_api_http_request_duration_seconds",
+    "Time to serve a request, including streaming the body.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "media_api_http_requests_in_progress",
+    "Requests currently being served.",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    "media_api_query_budget_exceeded_total",
+    "Route calls that executed more SQL statements than their budget.",
+    ["endpoint"],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "media_api_db_queries_per_request",
+    "SQL statements executed while serving one request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100),
+)
+DB_QUERY_SECONDS_PER_REQUEST = Histogram(
+    "media_api_db_query_seconds_per_request",
+    "Time spent executing SQL statements while serving one request.",
+    ["method", "route"],
+)
+DB_QUERY_DURATION = Histogram(
+    "media_api_db_query_duration_seconds",
+    "Execution time of individual SQL statements.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "media_api_db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool, including waiting for a free "
+    "one, connecting and the pre-ping.",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+FFPROBE_DURATION = Histogram(
+    "media_api_ffprobe_duration_seconds",
+    "Wall time of ffprobe runs, including waiting for a probe slot, by probe "
+    "profile and exit code ('timeout' and 'error' when ffprobe did not exit on "
+    "its own).",
+    ["profile", "exit_code"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+
+SLOWEST_STATEMENTS = 10
+MAX_STATEMENT_LENGTH = 1000
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed in one request (or any other unit of work).
+
+    Scopes nest: a statement counts towards the innermost scope and every
+    scope enclosing it.
+    """
+
+    count: int = 0
+    seconds: float = 0.0
+    # Statements run in an unbudgeted scope inside this one
+    unbudgeted: int = 0
+    parent: Optional["QueryStats"] = field(default=None, repr=False)
+    budgeted: bool = field(default=True, repr=False)
+    # (seconds, statement) of the slowest statements, kept only when asked for
+    slowest: Optional[List[Tuple[float, str]]] = field(default=None, repr=False)
+    # A session committed inside this scope
+    committed: bool = False
+
+    @property
+    def budgeted_count(self) -> int:
+        return self.count - self.unbudgeted
+
+    def record(self, elapsed: float, statement: str = "") -> None:
+        stats = self
+        unbudgeted = False
+        while stats is not None:
+            unbudgeted = unbudgeted or not stats.budgeted
+            stats.count += 1
+            stats.seconds += elapsed
+            if unbudgeted:
+                stats.unbudgeted += 1
+            if stats.slowest is not None:
+                entry = (elapsed, statement[:MAX_STATEMENT_LENGTH])
+                if len(stats.slowest) < SLOWEST_STATEMENTS:
+                    heapq.heappush(stats.slowest, entry)
+                else:
+                    heapq.heappushpop(stats.slowest, entry)
+            stats = stats.parent
+
+
+# The innermost counting scope; None when nothing is counting
+request_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+@contextmanager
+def count_queries(
+    budgeted: bool = True, keep_slowest: bool = False
+) -> Iterator[QueryStats]:
+    """Count the SQL statements executed inside the block.
+
+    Works across ``await``s in the same task and in tasks it starts, since
+    they inherit the context. Statements in a ``budgeted=False`` scope still
+    count everywhere but are left out of enclosing query budgets. With
+    ``keep_slowest`` the text of the slowest statements is kept as well.
+    """
+    stats = QueryStats(
+        parent=request_query_stats.get(),
+        budgeted=budgeted,
+        slowest=[] if keep_slowest else None,
+    )
+    token = request_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        request_query_stats.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(elapsed, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(exception_context):
+    # Failed statements (constraint violations, ...) still cost a round trip
+    connection = exception_context.connection
+    if connection is None or not connection.info.get("query_started"):
+        return
+    elapsed = time.perf_counter() - connection.info["query_started"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(elapsed, exception_context.statement or "")
+
+
+@event.listens_for(Session, "after_commit")
+def _session_committed(session):
+    stats = request_query_stats.get()
+    while stats is not None:
+        stats.committed = True
+        stats = stats.parent
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording checkout wait, labelled by ``pool_logging_name``."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.logging_name or "default").observe(
+                time.perf_counter() - started
+            )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type for ``GET /metrics``."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
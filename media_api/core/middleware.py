@@ -0,0 +1,231 @@
+import asyncio
+import cProfile
+import logging
+import os
+import pstats
+import random
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import read_from_primary
+from .metrics import (
+    DB_QUERIES_PER_REQUEST,
+    DB_QUERY_SECONDS_PER_REQUEST,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+    UNMATCHED_ROUTE,
+    count_queries,
+)
+from .profiling import (
+    PROFILE_ID_HEADER,
+    PROFILE_TOKEN_HEADER,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SECRET,
+    ProfileStore,
+    ProfileSummary,
+    new_profile_id,
+    profile_store,
+    verify_profile_token,
+)
+
+logger = logging.getLogger(__name__)
+
+# Roughly the worst replication lag we are willing to hide from a client
+DB_STICKY_SECONDS = int(os.getenv("DB_STICKY_SECONDS", "5"))
+STICKY_COOKIE = "db_primary_until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def route_template(router: Router, scope: Scope) -> str:
+    """Template of the route ``scope`` matches, or ``UNMATCHED_ROUTE``."""
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or UNMATCHED_ROUTE
+
+
+class ReadYourWritesMiddleware:
+    """Send a client's reads to the primary for a while after it writes.
+
+    A successful non-GET response sets a cookie holding the time until which
+    the client is pinned; requests carrying an unexpired cookie set
+    ``read_from_primary`` so ``get_read_db`` skips the replicas.
+    """
+
+    def __init__(self, app: ASGIApp, window: int = DB_STICKY_SECONDS):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            pinned_until = float(HTTPConnection(scope).cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            pinned_until = 0
+        is_write = scope["method"] not in SAFE_METHODS
+
+        async def send_with_cookie(message: Message) -> None:
+            if (
+                is_write
+                and message["type"] == "http.response.start"
+                and message["status"] < 400
+            ):
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{STICKY_COOKIE}={time.time() + self.window:.3f}; "
+                    f"Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        token = read_from_primary.set(pinned_until > time.time())
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            read_from_primary.reset(token)
+
+
+class MetricsMiddleware:
+    """Record latency, in-flight requests and SQL usage per route.
+
+    Requests are labelled with the route template, e.g.
+    ``/media-files/{media_file_id}``, rather than the path, so label
+    cardinality stays bounded by the number of routes. Timing covers the
+    whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp, router: Router):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.router, scope)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            with count_queries() as stats:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(
+                time.perf_counter() - started
+            )
+            in_progress.dec()
+            DB_QUERIES_PER_REQUEST.labels(method, route).observe(stats.count)
+            DB_QUERY_SECONDS_PER_REQUEST.labels(method, route).observe(stats.seconds)
+
+
+class ProfilingMiddleware:
+    """Record a cProfile of requests with a valid profiling token or sampled.
+
+    cProfile hooks the whole thread, so a profile also contains whatever
+    else the event loop ran in the meantime. To keep that readable only one
+    request per process is profiled at a time; requests arriving meanwhile
+    are served unprofiled. The profile id is returned in ``X-Profile-Id``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        router: Router,
+        secret: str = PROFILING_SECRET,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        store: ProfileStore = profile_store,
+    ):
+        self.app = app
+        self.router = router
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.store = store
+        self._profiling = False
+
+    def trigger(self, scope: Scope) -> Optional[str]:
+        # The admin endpoints take the same token; don't profile them
+        if scope["path"].startswith("/admin/"):
+            return None
+        token = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+        if token is not None and verify_profile_token(self.secret, token):
+            return "token"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._profiling:
+            await self.app(scope, receive, send)
+            return
+        trigger = self.trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        status = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        created_at = time.time()
+        started = time.perf_counter()
+        try:
+            with count_queries(keep_slowest=True) as queries:
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_profile_id)
+                finally:
+                    profiler.disable()
+        finally:
+            self._profiling = False
+            summary = ProfileSummary(
+                id=profile_id,
+                created_at=created_at,
+                method=scope["method"],
+                path=scope["path"],
+                route=route_template(self.router, scope),
+                status=status,
+                trigger=trigger,
+                duration_ms=(time.perf_counter() - started) * 1000,
+                query_count=queries.count,
+                query_ms=queries.seconds * 1000,
+                slowest_queries=[
+                    {"ms": seconds * 1000, "statement": statement}
+                    for seconds, statement in sorted(queries.slowest, reverse=True)
+                ],
+            )
+            try:
+                await asyncio.to_thread(
+                    self.store.save, summary, pstats.Stats(profiler)
+                )
+            except OSError:
+                logger.exception("Could not save profile %s", profile_id)
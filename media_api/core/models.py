@@ -1,6 +1,7 @@
 from sqlalchemy import (
     Column,
     Integer,
+    BigInteger,
     String,
     DateTime,
     Text,
@@ -8,7 +9,10 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     JSON,
+    Index,
+    LargeBinary,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -18,11 +22,28 @@ from .database import Base
 
 class MediaFile(Base):
     __tablename__ = "media_files"
+    __table_args__ = (
+        # Newest-first listing and its (created_at, id) keyset cursor; both
+        # columns sort descending so the index is simply scanned backwards.
+        Index("ix_media_files_created_at_id", "created_at", "id"),
+        # One row per path; ingestion upserts on it
+        Index("ix_media_files_filepath", "filepath", unique=True),
+        # Range filters of /media-files/search
+        Index("ix_media_files_duration", "duration"),
+        Index("ix_media_files_file_size", "file_size"),
+        # Tag containment and key lookups (@>, ?) on PostgreSQL; SQLite
+        # cannot index JSON documents and falls back to json_extract.
+        Index("ix_media_files_tags", "tags", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
-    filepath = Column(String, nullable=False)
-    file_size = Column(Integer)
+    # Unique and always supplied by the client, so bulk INSERT .. RETURNING
+    # can match returned ids to rows by filepath and batch on every dialect
+    filepath = Column(String, nullable=False, insert_sentinel=True)
+    file_size = Column(BigInteger)
     format_name = Column(String)
     format_long_name = Column(String)
     duration = Column(Float)  # in seconds
@@ -31,17 +52,32 @@ class MediaFile(Base):
     start_time = Column(Float)
     nb_streams = Column(Integer)
     nb_programs = Column(Integer)
-    tags = Column(JSON)  # Store format tags as JSON
-    raw_ffprobe = Column(JSON)  # Store complete ffprobe output
+    tags = Column(JSON().with_variant(JSONB(), "postgresql"))  # Format tags
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    # Relationships
+    # Relationships. Children are removed by ON DELETE CASCADE, so deleting a
+    # file never loads them; see utils.bulk_delete.
     streams = relationship(
-        "MediaStream", back_populates="media_file", cascade="all, delete-orphan"
+        "MediaStream",
+        back_populates="media_file",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     chapters = relationship(
-        "MediaChapter", back_populates="media_file", cascade="all, delete-orphan"
+        "MediaChapter",
+        back_populates="media_file",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+    # Complete ffprobe output lives in its own table so it is never loaded
+    # with the file row; see MediaFileRawProbe.
+    raw_probe = relationship(
+        "MediaFileRawProbe",
+        back_populates="media_file",
+        uselist=False,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -50,9 +86,31 @@ class MediaFile(Base):
 
 class MediaStream(Base):
     __tablename__ = "media_streams"
+    __table_args__ = (
+        # Relationship loads, per-file listings and the stream keyset cursor
+        Index("ix_media_streams_file_index", "media_file_id", "index", "id"),
+        # Listings filtered by codec_type in the same keyset order
+        Index(
+            "ix_media_streams_codec_type",
+            "codec_type",
+            "media_file_id",
+            "index",
+            "id",
+        ),
+        # Search: streams of a codec, optionally narrowed by resolution
+        Index(
+            "ix_media_streams_codec_name",
+            "codec_name",
+            "height",
+            "width",
+            "media_file_id",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    media_file_id = Column(Integer, ForeignKey("media_files.id"), nullable=False)
+    media_file_id = Column(
+        Integer, ForeignKey("media_files.id", ondelete="CASCADE"), nullable=False
+    )
     index = Column(Integer, nullable=False)  # Stream index from ffprobe
     codec_name = Column(String)
     codec_long_name = Column(String)
@@ -117,9 +175,14 @@ class MediaStream(Base):
 
 class MediaChapter(Base):
     __tablename__ = "media_chapters"
+    __table_args__ = (
+        Index("ix_media_chapters_file_chapter", "media_file_id", "chapter_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    media_file_id = Column(Integer, ForeignKey("media_files.id"), nullable=False)
+    media_file_id = Column(
+        Integer, ForeignKey("media_files.id", ondelete="CASCADE"), nullable=False
+    )
     chapter_id = Column(Integer, nullable=False)  # Chapter ID from ffprobe
     time_base = Column(String)
     start = Column(Integer)
@@ -136,8 +199,27 @@ class MediaChapter(Base):
         return f"<MediaChapter(id={self.chapter_id}, start_time={self.start_time}, end_time={self.end_time})>"
 
 
+class MediaFileRawProbe(Base):
+    __tablename__ = "media_file_raw_probes"
+
+    media_file_id = Column(
+        Integer, ForeignKey("media_files.id", ondelete="CASCADE"), primary_key=True
+    )
+    encoding = Column(String, nullable=False)  # gzip or zstd
+    data = Column(LargeBinary, nullable=False)  # Compressed ffprobe JSON
+    size = Column(Integer)  # Uncompressed size in bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    media_file = relationship("MediaFile", back_populates="raw_probe")
+
+    def __repr__(self):
+        return f"<MediaFileRawProbe(media_file_id={self.media_file_id}, encoding='{self.encoding}', size={self.size})>"
+
+
 class FFProbeError(Base):
     __tablename__ = "ffprobe_errors"
+    __table_args__ = (Index("ix_ffprobe_errors_filepath", "filepath"),)
 
     id = Column(Integer, primary_key=True, index=True)
     filepath = Column(String, nullable=False)
@@ -149,3 +231,118 @@ class FFProbeError(Base):
         return (
             f"<FFProbeError(filepath='{self.filepath}', error_code={self.error_code})>"
         )
+
+
+class FFProbeFailure(Base):
+    """The latest failed ffprobe run of a file with a probe profile.
+
+    See utils.probe_failures.
+    """
+
+    __tablename__ = "ffprobe_failures"
+    __table_args__ = (
+        Index("ix_ffprobe_failures_filepath", "filepath", "profile", unique=True),
+        Index("ix_ffprobe_failures_error_class_id", "error_class", "id"),
+        Index("ix_ffprobe_failures_next_retry_at", "next_retry_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    filepath = Column(String, nullable=False)
+    # Probe profile of the failed runs, and of their retries
+    profile = Column(String, nullable=False, server_default="standard")
+    error_class = Column(String, nullable=False)  # timeout, ffprobe_error, ...
+    error_message = Column(Text)
+    error_code = Column(Integer)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Identity of the file when it failed; NULL if it could not be read
+    device = Column(BigInteger)
+    inode = Column(BigInteger)
+    size = Column(BigInteger)
+    mtime_ns = Column(BigInteger)
+    first_failed_at = Column(DateTime(timezone=True), nullable=False)
+    last_failed_at = Column(DateTime(timezone=True), nullable=False)
+    # NULL while a retry is queued or after the last automatic retry
+    next_retry_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<FFProbeFailure(filepath='{self.filepath}', error_class='{self.error_class}', attempts={self.attempts})>"
+
+
+class ProbeCacheEntry(Base):
+    __tablename__ = "ffprobe_cache"
+    __table_args__ = (
+        Index(
+            "ix_ffprobe_cache_identity",
+            "device",
+            "inode",
+            "size",
+            "mtime_ns",
+            "profile",
+            unique=True,
+        ),
+        Index("ix_ffprobe_cache_content_hash", "content_hash", "size"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    filepath = Column(String, nullable=False)
+    device = Column(BigInteger, nullable=False)
+    inode = Column(BigInteger, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64))  # Partial content hash, see probe_cache
+    profile = Column(String, nullable=False, server_default="standard")
+    ffprobe_data = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ProbeCacheEntry(filepath='{self.filepath}', size={self.size})>"
+
+
+class CatalogStat(Base):
+    """One pre-aggregated group of catalog totals, see utils.catalog_stats."""
+
+    __tablename__ = "catalog_stats"
+    __table_args__ = (
+        Index("ix_catalog_stats_dimension_key", "dimension", "key", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    dimension = Column(String, nullable=False)  # total, format, codec, resolution
+    key = Column(String, nullable=False)  # "" stands for NULL
+    count = Column(BigInteger, nullable=False, default=0)
+    total_duration = Column(Float, nullable=False, default=0)  # in seconds
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogStat(dimension='{self.dimension}', key='{self.key}', count={self.count})>"
+
+
+class ProbeJob(Base):
+    """A queued ffprobe run, see utils.probe_jobs."""
+
+    __tablename__ = "probe_jobs"
+    __table_args__ = (
+        Index("ix_probe_jobs_status_id", "status", "id"),
+        Index("ix_probe_jobs_filepath", "filepath"),
+    )
+    # created_at comes back with the INSERT instead of a separate SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(Integer, primary_key=True)
+    filepath = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # see utils.probe_jobs
+    profile = Column(String, nullable=False, server_default="standard")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Worker holding the job and until when; an expired lease means the
+    # worker died and the job may be claimed again
+    lease_owner = Column(String)
+    lease_expires_at = Column(DateTime(timezone=True))
+    media_file_id = Column(Integer, ForeignKey("media_files.id", ondelete="SET NULL"))
+    error_message = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<ProbeJob(id={self.id}, filepath='{self.filepath}', status='{self.status}')>"
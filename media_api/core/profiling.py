@@ -0,0 +1,181 @@
+"""On-demand cProfile captures of single requests.
+
+A request is profiled when it carries a valid ``X-Profile-Token`` header or
+is picked by ``PROFILING_SAMPLE_RATE``. Tokens are ``<expires>.<signature>``,
+an HMAC-SHA256 of the expiry under ``PROFILING_SECRET``, so only someone
+holding the secret can make production requests pay for profiling:
+
+    python -m media_api.core.profiling --ttl 600
+
+Profiles are written to ``PROFILING_DIR`` as a ``.prof`` file (open it with
+``pstats``, snakeviz, ...) plus a ``.json`` summary holding the route, status,
+timings and slowest SQL statements. Only the newest
+``PROFILING_MAX_PROFILES`` are kept. The ``/admin/profiles`` endpoints list
+and serve them to holders of a valid token.
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import re
+import secrets
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+PROFILING_SECRET = os.getenv("PROFILING_SECRET", "")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv(
+    "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "media-api-profiles")
+)
+PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "100"))
+PROFILING_ENABLED = bool(PROFILING_SECRET) or PROFILING_SAMPLE_RATE > 0
+
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "x-profile-id"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{24}$")
+
+
+def _signature(secret: str, expires: int) -> str:
+    return hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+
+
+def profile_token(secret: str, ttl: int = 300) -> str:
+    """A token valid for ``ttl`` seconds."""
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(secret, expires)}"
+
+
+def verify_profile_token(secret: str, token: Optional[str]) -> bool:
+    if not secret or not token:
+        return False
+    expires, _, signature = token.partition(".")
+    try:
+        if int(expires) < time.time():
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(signature, _signature(secret, int(expires)))
+
+
+def new_profile_id() -> str:
+    # Time first, so ids sort in capture order
+    return f"{time.time_ns():016x}{secrets.token_hex(4)}"
+
+
+@dataclass
+class ProfileSummary:
+    id: str
+    created_at: float
+    method: str
+    path: str
+    route: str
+    status: int
+    trigger: str
+    duration_ms: float
+    query_count: int
+    query_ms: float
+    slowest_queries: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProfileStore:
+    """A bounded ring of profiles in one directory.
+
+    The ``.json`` summary is written last and atomically, so a profile is
+    listed only once both files are complete.
+    """
+
+    def __init__(
+        self, directory: str = PROFILING_DIR, max_profiles: int = PROFILING_MAX_PROFILES
+    ):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, suffix: str) -> str:
+        if not _PROFILE_ID.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, profile_id + suffix)
+
+    def save(self, summary: ProfileSummary, stats: pstats.Stats) -> None:
+        """Store a profile and drop the oldest beyond ``max_profiles``."""
+        os.makedirs(self.directory, exist_ok=True)
+        stats.dump_stats(self._path(summary.id, ".prof"))
+        summary_path = self._path(summary.id, ".json")
+        with open(summary_path + ".tmp", "w") as f:
+            json.dump(summary.to_dict(), f)
+        os.replace(summary_path + ".tmp", summary_path)
+
+        for profile_id in self.ids()[self.max_profiles :]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(self._path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def ids(self) -> List[str]:
+        """Stored profile ids, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = (name[: -len(".json")] for name in names if name.endswith(".json"))
+        return sorted((i for i in ids if _PROFILE_ID.match(i)), reverse=True)
+
+    def summary(self, profile_id: str) -> ProfileSummary:
+        """Raises ``KeyError`` for unknown ids."""
+        try:
+            with open(self._path(profile_id, ".json")) as f:
+                return ProfileSummary(**json.load(f))
+        except FileNotFoundError:
+            raise KeyError(profile_id) from None
+
+    def stats_path(self, profile_id: str) -> str:
+        path = self._path(profile_id, ".prof")
+        if not os.path.exists(path):
+            raise KeyError(profile_id)
+        return path
+
+    def top_functions(
+        self, profile_id: str, sort: str = "cumulative", limit: int = 30
+    ) -> List[Dict[str, Any]]:
+        """The ``limit`` most expensive functions by ``sort``."""
+        stats = pstats.Stats(self.stats_path(profile_id))
+        stats.sort_stats(sort)
+        rows = []
+        for func in stats.fcn_list[:limit]:
+            primitive_calls, calls, total, cumulative, _ = stats.stats[func]
+            filename, line, name = func
+            rows.append(
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": calls,
+                    "primitive_calls": primitive_calls,
+                    "total_ms": total * 1000,
+                    "cumulative_ms": cumulative * 1000,
+                }
+            )
+        return rows
+
+
+profile_store = ProfileStore()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Print a profiling token.")
+    parser.add_argument("--ttl", type=int, default=300, help="seconds")
+    args = parser.parse_args()
+    if not PROFILING_SECRET:
+        parser.error("PROFILING_SECRET is not set")
+    print(profile_token(PROFILING_SECRET, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Per-route SQL statement budgets.
+
+``@query_budget(n)`` declares the most statements a route handler may
+execute. Going over it almost always means a relationship started loading
+row by row (an N+1) or a new query crept into a hot path. With
+``QUERY_BUDGET_MODE=raise`` (the test suite) the handler fails with
+``QueryBudgetExceeded``; otherwise (``log``, the default) a warning is logged
+and ``media_api_query_budget_exceeded_total`` is incremented. ``off``
+disables the check. The count is only known once the handler returns, so a
+handler that committed is never failed for it, even with ``raise``: the
+client would get a 500 for a write that is in the database. Its overrun is
+logged and counted instead.
+
+The budget covers the handler body, where all of this app's queries run:
+response models are built from rows loaded eagerly, since a lazy load while
+FastAPI serializes the response fails outright under asyncio. Queries made
+while a ``StreamingResponse`` body is sent are not included.
+"""
+
+import functools
+import logging
+import os
+from typing import Awaitable, Callable, TypeVar
+
+from .metrics import QUERY_BUDGET_EXCEEDED, count_queries
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log").lower()
+
+T = TypeVar("T")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A route handler executed more SQL statements than its budget."""
+
+    def __init__(self, endpoint: str, budget: int, count: int):
+        super().__init__(
+            f"{endpoint} executed {count} SQL statements, budget is {budget}"
+        )
+        self.endpoint = endpoint
+        self.budget = budget
+        self.count = count
+
+
+def query_budget(
+    budget: int,
+) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+    """Declare the maximum number of SQL statements an async handler runs."""
+
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        endpoint = f"{func.__module__}.{func.__qualname__}"
+
+        # functools.wraps keeps the signature FastAPI reads dependencies from
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            if QUERY_BUDGET_MODE == "off":
+                return await func(*args, **kwargs)
+            with count_queries() as stats:
+                result = await func(*args, **kwargs)
+            if stats.budgeted_count > budget:
+                _over_budget(endpoint, budget, stats.budgeted_count, stats.committed)
+            return result
+
+        wrapper.query_budget = budget
+        return wrapper
+
+    return decorator
+
+
+def unbudgeted():
+    """Leave the statements run inside the block out of the route's budget.
+
+    For paths whose cost grows with the input by design, such as retrying a
+    rejected batch row by row. They still show up in the request metrics.
+    """
+    return count_queries(budgeted=False)
+
+
+def _over_budget(endpoint: str, budget: int, count: int, committed: bool) -> None:
+    if QUERY_BUDGET_MODE == "raise" and not committed:
+        raise QueryBudgetExceeded(endpoint, budget, count)
+    QUERY_BUDGET_EXCEEDED.labels(endpoint).inc()
+    logger.warning(
+        "%s executed %d SQL statements, budget is %d", endpoint, count, budget
+    )
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Literal, Union
 
 
 # FFProbe input schemas (for parsing ffprobe JSON)
@@ -154,11 +154,51 @@ class MediaFileResponse(BaseModel):
         from_attributes = True
 
 
+class MediaFileSparseResponse(BaseModel):
+    """A media file restricted to the fields and relations a client asked for.
+
+    Serialized with ``exclude_unset`` so only requested keys appear.
+    """
+
+    id: int
+    filename: Optional[str] = None
+    filepath: Optional[str] = None
+    file_size: Optional[int] = None
+    format_name: Optional[str] = None
+    format_long_name: Optional[str] = None
+    duration: Optional[float] = None
+    bit_rate: Optional[int] = None
+    nb_streams: Optional[int] = None
+    tags: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    streams: Optional[List[MediaStreamResponse]] = None
+    chapters: Optional[List[MediaChapterResponse]] = None
+
+
 class MediaFileCreate(BaseModel):
     filepath: str
     ffprobe_data: FFProbeOutput
 
 
+class MediaFileBatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+    media_file: Optional[MediaFileResponse] = None
+
+
+class MediaFileBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[MediaFileBatchItemResult]
+
+
+class MediaFileBulkDeleteResponse(BaseModel):
+    deleted: int
+    batches: int
+
+
 class MediaStreamCreate(BaseModel):
     media_file_id: int
     index: int
@@ -262,3 +302,107 @@ class FFProbeErrorResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class FormatStats(BaseModel):
+    format_name: Optional[str] = None
+    count: int
+    total_duration: float
+    total_bytes: int
+
+
+class CodecStats(BaseModel):
+    codec_type: Optional[str] = None
+    codec_name: Optional[str] = None
+    count: int
+
+
+class ResolutionStats(BaseModel):
+    bucket: str
+    count: int
+
+
+class CatalogStatsResponse(BaseModel):
+    files: int = 0
+    total_duration: float = 0.0
+    total_bytes: int = 0
+    formats: List[FormatStats] = []
+    codecs: List[CodecStats] = []
+    resolutions: List[ResolutionStats] = []
+
+
+class ProfileQuery(BaseModel):
+    ms: float
+    statement: str
+
+
+class ProfileSummaryResponse(BaseModel):
+    id: str
+    created_at: float
+    method: str
+    path: str
+    route: str
+    status: int
+    trigger: str
+    duration_ms: float
+    query_count: int
+    query_ms: float
+    slowest_queries: List[ProfileQuery] = []
+
+
+class ProfileFunctionStats(BaseModel):
+    function: str
+    calls: int
+    primitive_calls: int
+    total_ms: float
+    cumulative_ms: float
+
+
+class ProfileDetailResponse(ProfileSummaryResponse):
+    functions: List[ProfileFunctionStats] = []
+
+
+class ProbeJobCreate(BaseModel):
+    filepath: str
+    # fast, standard or deep; FFPROBE_DEFAULT_PROFILE when not given
+    profile: Optional[Literal["fast", "standard", "deep"]] = None
+
+
+class ProbeJobResponse(BaseModel):
+    id: int
+    filepath: str
+    status: str  # queued, running, succeeded or failed
+    profile: str
+    attempts: int
+    max_attempts: int
+    media_file_id: Optional[int] = None
+    error_message: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class FFProbeFailureResponse(BaseModel):
+    id: int
+    filepath: str
+    profile: str
+    error_class: str  # timeout, ffprobe_error or invalid_output
+    error_message: Optional[str] = None
+    error_code: Optional[int] = None
+    attempts: int
+    first_failed_at: datetime
+    last_failed_at: datetime
+    next_retry_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class FFProbeFailureClassResponse(BaseModel):
+    error_class: str
+    count: int
+    # Failures that still have an automatic retry ahead of them
+    scheduled: int
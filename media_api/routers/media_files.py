@@ -1,35 +1,95 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+import contextlib
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from typing import List, Literal, Optional, Dict, Any
 
-from ..core.database import get_db
-from ..core.models import MediaFile, MediaStream, MediaChapter
-from ..core.schemas import MediaFileResponse, MediaFileCreate
+from ..core.database import get_db, get_read_db, get_read_sessionmaker
+from ..core.models import MediaFile, MediaStream, MediaChapter, MediaFileRawProbe
+from ..core.query_budget import query_budget, unbudgeted
+from ..core.schemas import (
+    MediaFileResponse,
+    MediaFileCreate,
+    MediaFileBatchItemResult,
+    MediaFileBatchResponse,
+    MediaFileBulkDeleteResponse,
+    MediaStreamResponse,
+)
+from ..utils.bulk_delete import delete_media_files, delete_media_files_in_batches
+from ..utils.diff_update import apply_media_file_update
+from ..utils.bulk_insert import (
+    insert_media_files,
+    insert_media_files_isolated,
+    upsert_media_files,
+)
 from ..utils.ffprobe_parser import FFProbeParser
+from ..utils.export import EXPORT_MEDIA_TYPES, stream_export
+from ..utils.fieldsets import MEDIA_FILE_FIELDS, MediaFileFieldset
+from ..utils.filters import MediaFileFilters, MediaFileSearch
+from ..utils.raw_probe import iter_decompressed
+from ..utils.response_cache import etag_matches, media_file_etag, response_cache
+from ..utils.pagination import (
+    apply_media_file_cursor,
+    media_file_cursor,
+    set_next_page_headers,
+)
 
 router = APIRouter(prefix="/media-files", tags=["media-files"])
 
+MAX_BATCH_SIZE = 1000
+
 
 @router.post("/", response_model=MediaFileResponse, status_code=status.HTTP_201_CREATED)
+@query_budget(12)
 async def create_media_file(
-    media_file_data: MediaFileCreate, db: AsyncSession = Depends(get_db)
+    media_file_data: MediaFileCreate,
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_db),
 ):
+    """Create a media file.
+
+    A filepath that already exists is rejected with 409 unless ``upsert`` is
+    set, in which case the stored file and its children are overwritten.
+    """
     try:
-        media_file = FFProbeParser.parse_ffprobe_to_models(
-            media_file_data.filepath, media_file_data.ffprobe_data.model_dump()
+        parsed = FFProbeParser.convert_ffprobe_output(
+            media_file_data.filepath,
+            media_file_data.ffprobe_data,
+            media_file_data.ffprobe_data.model_dump(),
         )
-        db.add(media_file)
+        if upsert:
+            [media_file_id] = await upsert_media_files(db, [parsed])
+        else:
+            [media_file_id] = await insert_media_files(db, [parsed])
         await db.commit()
-        await db.refresh(media_file)
+        response_cache.invalidate([media_file_id])
 
         result = await db.execute(
             select(MediaFile)
             .options(selectinload(MediaFile.streams), selectinload(MediaFile.chapters))
-            .where(MediaFile.id == media_file.id)
+            .where(MediaFile.id == media_file_id)
+            .execution_options(populate_existing=True)
         )
         return result.scalar_one()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Media file already exists: {media_file_data.filepath}",
+        )
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -38,26 +98,294 @@ async def create_media_file(
         )
 
 
+@router.post("/batch", response_model=MediaFileBatchResponse)
+@query_budget(9)
+async def create_media_files_batch(
+    items: List[Dict[str, Any]] = Body(...),
+    full: bool = False,
+    upsert: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """Create many media files at once, reporting the outcome of each item.
+
+    Each item has the shape of ``MediaFileCreate``. Items are validated one by
+    one so an invalid payload does not reject the rest of the batch. With
+    ``upsert`` existing filepaths are overwritten instead of failing.
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch size exceeds the limit of {MAX_BATCH_SIZE} items",
+        )
+
+    results = [MediaFileBatchItemResult(index=i) for i in range(len(items))]
+    parsed_files = []
+    positions = []
+    for i, item in enumerate(items):
+        try:
+            media_file_data = MediaFileCreate.model_validate(item)
+            parsed_files.append(
+                FFProbeParser.convert_ffprobe_output(
+                    media_file_data.filepath,
+                    media_file_data.ffprobe_data,
+                    media_file_data.ffprobe_data.model_dump(),
+                )
+            )
+            positions.append(i)
+        except Exception as e:
+            results[i].error = str(e)
+
+    try:
+        write = upsert_media_files if upsert else insert_media_files
+        ids = await write(db, parsed_files)
+        await db.commit()
+        outcomes = [(media_file_id, None) for media_file_id in ids]
+    except Exception:
+        # Something in the batch was rejected; retry row by row to find it.
+        await db.rollback()
+        with unbudgeted():
+            outcomes = await insert_media_files_isolated(
+                db, parsed_files, upsert=upsert
+            )
+        await db.commit()
+
+    for position, (media_file_id, error) in zip(positions, outcomes, strict=True):
+        results[position].id = media_file_id
+        results[position].error = error
+
+    created_ids = [result.id for result in results if result.id is not None]
+    if upsert:
+        response_cache.invalidate(created_ids)
+    if full and created_ids:
+        result = await db.execute(
+            select(MediaFile)
+            .options(selectinload(MediaFile.streams), selectinload(MediaFile.chapters))
+            .where(MediaFile.id.in_(created_ids))
+            .execution_options(populate_existing=True)
+        )
+        media_files = {media_file.id: media_file for media_file in result.scalars()}
+        for item_result in results:
+            if item_result.id is not None:
+                item_result.media_file = MediaFileResponse.model_validate(
+                    media_files[item_result.id]
+                )
+
+    return MediaFileBatchResponse(
+        created=len(created_ids),
+        failed=len(results) - len(created_ids),
+        results=results,
+    )
+
+
+@router.get("/export")
+# Rows are read while the body streams, after the handler has returned
+@query_budget(0)
+async def export_media_files(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    fields: Optional[str] = None,
+    filters: MediaFileFilters = Depends(),
+    session_factory: async_sessionmaker = Depends(get_read_sessionmaker),
+):
+    """Stream the catalog as NDJSON or CSV, one row per media file.
+
+    Accepts the same filters as the listing and an optional ``fields`` list.
+    """
+    fieldset = MediaFileFieldset.parse(fields, None)
+    columns = fieldset.fields if fieldset else MEDIA_FILE_FIELDS
+    query = filters.apply(
+        select(*(getattr(MediaFile, name) for name in columns))
+    ).order_by(MediaFile.id)
+
+    return StreamingResponse(
+        stream_export(session_factory, query, columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="media-files.{format}"'},
+    )
+
+
 @router.get("/", response_model=List[MediaFileResponse])
+@query_budget(3)
 async def list_media_files(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    filters: MediaFileFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(MediaFile)
-        .options(selectinload(MediaFile.streams), selectinload(MediaFile.chapters))
-        .offset(skip)
-        .limit(limit)
-        .order_by(MediaFile.created_at.desc())
+    """List media files newest first.
+
+    Pass the ``X-Next-Cursor`` value from the previous page as ``cursor`` for
+    stable keyset pagination; ``skip`` is ignored when a cursor is given.
+    ``fields`` (comma-separated columns) and ``include`` (``streams``,
+    ``chapters``) return a sparse representation that only loads what was
+    asked for.
+    """
+    return await _list_media_files(
+        request, response, db, filters, skip, limit, cursor, fields, include
+    )
+
+
+@router.get("/search", response_model=List[MediaFileResponse])
+@query_budget(3)
+async def search_media_files(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    search: MediaFileSearch = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search media files by duration, size, stream properties and tags.
+
+    All criteria are combined with AND in a single query; stream criteria
+    (``codec_name``, ``codec_type``, width and height bounds) must match the
+    same stream. Paging and sparse fieldsets work as in the listing.
+    """
+    return await _list_media_files(
+        request, response, db, search, skip, limit, cursor, fields, include
     )
-    return result.scalars().all()
+
+
+async def _list_media_files(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    filters: MediaFileFilters,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    include: Optional[str],
+):
+    fieldset = MediaFileFieldset.parse(fields, include)
+    if fieldset is None:
+        query = select(MediaFile).options(
+            selectinload(MediaFile.streams), selectinload(MediaFile.chapters)
+        )
+    else:
+        query = select(MediaFile).options(*fieldset.load_options(["created_at"]))
+    query = apply_media_file_cursor(filters.apply(query), cursor)
+    if not cursor:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit))
+    media_files = result.scalars().all()
+
+    next_cursor = None
+    if media_files and len(media_files) == limit:
+        next_cursor = media_file_cursor(media_files[-1])
+
+    if fieldset is None:
+        set_next_page_headers(request, response, next_cursor)
+        return media_files
+
+    sparse_response = JSONResponse(
+        [fieldset.serialize(media_file) for media_file in media_files]
+    )
+    set_next_page_headers(request, sparse_response, next_cursor)
+    return sparse_response
+
+
+@router.delete("/", response_model=MediaFileBulkDeleteResponse)
+# One batch: select its ids, count its streams, delete, update catalog stats
+@query_budget(4)
+async def delete_media_files_bulk(
+    ids: List[int] = Query(default=[]),
+    search: MediaFileSearch = Depends(),
+    db: AsyncSession = Depends(get_db),
+):
+    """Delete every media file matching ``ids`` and/or the search filters.
+
+    Files are deleted in batches, each committed on its own so locks are
+    only held for one batch; a failure part-way leaves the earlier batches
+    deleted. At least one id or filter is required.
+    """
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_SIZE} ids per request; use filters for more",
+        )
+    query = search.apply(select(MediaFile.id))
+    if ids:
+        query = query.where(MediaFile.id.in_(ids))
+    if query.whereclause is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass ids or at least one filter to delete media files",
+        )
+
+    deleted = batches = 0
+    try:
+        with contextlib.ExitStack() as stack:
+            async for batch in delete_media_files_in_batches(db, query):
+                if not batches:
+                    # Every further batch runs the same statements again
+                    stack.enter_context(unbudgeted())
+                deleted += len(batch)
+                batches += 1
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error deleting media files after {deleted} were deleted: {e}",
+        )
+    return {"deleted": deleted, "batches": batches}
 
 
 @router.get("/{media_file_id}", response_model=MediaFileResponse)
-async def get_media_file(media_file_id: int, db: AsyncSession = Depends(get_db)):
+@query_budget(4)
+async def get_media_file(
+    media_file_id: int,
+    request: Request,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Fetch one media file.
+
+    Responses carry a strong ``ETag``; a matching ``If-None-Match`` gets a
+    304 after a single indexed lookup of the row's timestamps, and full
+    representations are served from an in-process cache while they are
+    current.
+    """
+    fieldset = MediaFileFieldset.parse(fields, include)
+
     result = await db.execute(
-        select(MediaFile)
-        .options(selectinload(MediaFile.streams), selectinload(MediaFile.chapters))
-        .where(MediaFile.id == media_file_id)
+        select(MediaFile.updated_at, MediaFile.created_at).where(
+            MediaFile.id == media_file_id
+        )
+    )
+    version = result.one_or_none()
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Media file not found"
+        )
+
+    variant = "" if fieldset is None else f"{fields or ''};{include or ''}"
+    etag = media_file_etag(
+        media_file_id, version.created_at, version.updated_at, variant
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if fieldset is None:
+        body = response_cache.get(media_file_id, etag)
+        if body is not None:
+            return Response(body, media_type="application/json", headers=headers)
+        options = [selectinload(MediaFile.streams), selectinload(MediaFile.chapters)]
+    else:
+        options = fieldset.load_options()
+
+    result = await db.execute(
+        select(MediaFile).options(*options).where(MediaFile.id == media_file_id)
     )
     media_file = result.scalar_one_or_none()
 
@@ -66,41 +394,58 @@ async def get_media_file(media_file_id: int, db: AsyncSession = Depends(get_db))
             status_code=status.HTTP_404_NOT_FOUND, detail="Media file not found"
         )
 
-    return media_file
+    if fieldset is not None:
+        return JSONResponse(fieldset.serialize(media_file), headers=headers)
+
+    body = MediaFileResponse.model_validate(media_file).model_dump_json().encode()
+    response_cache.put(media_file_id, etag, body)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @router.put("/{media_file_id}", response_model=MediaFileResponse)
+# Worst case, however many streams or chapters changed: 4 loads (file,
+# streams, chapters, raw probe); a flush of one UPDATE per table, one DELETE
+# per child table and the catalog stats; one multi-row INSERT each for new
+# streams and chapters plus their stats; the updated_at refresh
+@query_budget(15)
 async def update_media_file(
     media_file_id: int,
     media_file_data: MediaFileCreate,
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(MediaFile).where(MediaFile.id == media_file_id))
-    existing_media_file = result.scalar_one_or_none()
+    result = await db.execute(
+        select(MediaFile)
+        .options(
+            selectinload(MediaFile.streams),
+            selectinload(MediaFile.chapters),
+            selectinload(MediaFile.raw_probe),
+        )
+        .where(MediaFile.id == media_file_id)
+    )
+    media_file = result.scalar_one_or_none()
 
-    if not existing_media_file:
+    if not media_file:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Media file not found"
         )
 
     try:
-        await db.delete(existing_media_file)
-
-        updated_media_file = FFProbeParser.parse_ffprobe_to_models(
-            media_file_data.filepath, media_file_data.ffprobe_data.model_dump()
+        parsed = FFProbeParser.convert_ffprobe_output(
+            media_file_data.filepath,
+            media_file_data.ffprobe_data,
+            media_file_data.ffprobe_data.model_dump(),
         )
-        updated_media_file.id = media_file_id
-
-        db.add(updated_media_file)
-        await db.commit()
-        await db.refresh(updated_media_file)
-
-        result = await db.execute(
-            select(MediaFile)
-            .options(selectinload(MediaFile.streams), selectinload(MediaFile.chapters))
-            .where(MediaFile.id == updated_media_file.id)
+        if await apply_media_file_update(db, media_file, parsed):
+            await db.commit()
+            response_cache.invalidate([media_file_id])
+            await db.refresh(media_file, ["updated_at"])
+        return media_file
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Media file already exists: {media_file_data.filepath}",
         )
-        return result.scalar_one()
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -110,18 +455,20 @@ async def update_media_file(
 
 
 @router.delete("/{media_file_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(3)
 async def delete_media_file(media_file_id: int, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(MediaFile).where(MediaFile.id == media_file_id))
-    media_file = result.scalar_one_or_none()
-
-    if not media_file:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Media file not found"
-        )
-
+    """Delete a media file; its streams, chapters and raw probe go by cascade."""
     try:
-        await db.delete(media_file)
+        deleted = await delete_media_files(db, [media_file_id])
+        if not deleted:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Media file not found"
+            )
         await db.commit()
+        response_cache.invalidate(deleted)
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -130,9 +477,10 @@ async def delete_media_file(media_file_id: int, db: AsyncSession = Depends(get_d
         )
 
 
-@router.get("/{media_file_id}/streams", response_model=List[dict])
+@router.get("/{media_file_id}/streams", response_model=List[MediaStreamResponse])
+@query_budget(2)
 async def get_media_file_streams(
-    media_file_id: int, db: AsyncSession = Depends(get_db)
+    media_file_id: int, db: AsyncSession = Depends(get_read_db)
 ):
     result = await db.execute(
         select(MediaFile)
@@ -147,3 +495,40 @@ async def get_media_file_streams(
         )
 
     return media_file.streams
+
+
+@router.get("/{media_file_id}/raw-probe")
+@query_budget(1)
+async def get_media_file_raw_probe(
+    media_file_id: int, request: Request, db: AsyncSession = Depends(get_read_db)
+):
+    """Return the complete ffprobe JSON stored for a media file.
+
+    gzip-stored documents are sent as-is to clients that accept gzip;
+    otherwise the document is decompressed as it streams out.
+    """
+    result = await db.execute(
+        select(MediaFileRawProbe.encoding, MediaFileRawProbe.data).where(
+            MediaFileRawProbe.media_file_id == media_file_id
+        )
+    )
+    raw_probe = result.one_or_none()
+
+    if not raw_probe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Raw probe not found"
+        )
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if raw_probe.encoding == "gzip" and "gzip" in accept_encoding:
+        return Response(
+            content=raw_probe.data,
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+
+    return StreamingResponse(
+        iter_decompressed(raw_probe.encoding, raw_probe.data),
+        media_type="application/json",
+        headers={"Vary": "Accept-Encoding"},
+    )
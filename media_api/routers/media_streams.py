@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.sql import func
 from typing import List, Optional
 
-from ..core.database import get_db
+from ..core.database import get_db, get_read_db
 from ..core.models import MediaStream, MediaFile
+from ..core.query_budget import query_budget
 from ..core.schemas import MediaStreamResponse, MediaStreamCreate, MediaStreamUpdate
+from ..utils.response_cache import response_cache
+from ..utils.pagination import (
+    apply_media_stream_cursor,
+    media_stream_cursor,
+    set_next_page_headers,
+)
 
 router = APIRouter(prefix="/media-streams", tags=["media-streams"])
 
@@ -13,6 +21,7 @@ router = APIRouter(prefix="/media-streams", tags=["media-streams"])
 @router.post(
     "/", response_model=MediaStreamResponse, status_code=status.HTTP_201_CREATED
 )
+@query_budget(5)
 async def create_media_stream(
     stream_data: MediaStreamCreate, db: AsyncSession = Depends(get_db)
 ):
@@ -29,7 +38,9 @@ async def create_media_stream(
     try:
         media_stream = MediaStream(**stream_data.model_dump())
         db.add(media_stream)
+        media_file.updated_at = func.now()
         await db.commit()
+        response_cache.invalidate([media_file.id])
         await db.refresh(media_stream)
         return media_stream
     except Exception as e:
@@ -41,14 +52,18 @@ async def create_media_stream(
 
 
 @router.get("/", response_model=List[MediaStreamResponse])
+@query_budget(1)
 async def list_media_streams(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     media_file_id: Optional[int] = None,
     codec_type: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = select(MediaStream).offset(skip).limit(limit)
+    query = select(MediaStream)
 
     if media_file_id:
         query = query.where(MediaStream.media_file_id == media_file_id)
@@ -56,14 +71,12 @@ async def list_media_streams(
     if codec_type:
         query = query.where(MediaStream.codec_type == codec_type)
 
-    query = query.order_by(MediaStream.media_file_id, MediaStream.index)
-
-    result = await db.execute(query)
-    return result.scalars().all()
+    return await _paginate_streams(request, response, db, query, skip, limit, cursor)
 
 
 @router.get("/{stream_id}", response_model=MediaStreamResponse)
-async def get_media_stream(stream_id: int, db: AsyncSession = Depends(get_db)):
+@query_budget(1)
+async def get_media_stream(stream_id: int, db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(MediaStream).where(MediaStream.id == stream_id))
     media_stream = result.scalar_one_or_none()
 
@@ -76,6 +89,7 @@ async def get_media_stream(stream_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.put("/{stream_id}", response_model=MediaStreamResponse)
+@query_budget(5)
 async def update_media_stream(
     stream_id: int, stream_data: MediaStreamUpdate, db: AsyncSession = Depends(get_db)
 ):
@@ -92,7 +106,9 @@ async def update_media_stream(
         for field, value in update_data.items():
             setattr(media_stream, field, value)
 
+        await _touch_media_file(db, media_stream.media_file_id)
         await db.commit()
+        response_cache.invalidate([media_stream.media_file_id])
         await db.refresh(media_stream)
         return media_stream
     except Exception as e:
@@ -104,6 +120,7 @@ async def update_media_stream(
 
 
 @router.delete("/{stream_id}", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(4)
 async def delete_media_stream(stream_id: int, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(MediaStream).where(MediaStream.id == stream_id))
     media_stream = result.scalar_one_or_none()
@@ -115,7 +132,9 @@ async def delete_media_stream(stream_id: int, db: AsyncSession = Depends(get_db)
 
     try:
         await db.delete(media_stream)
+        await _touch_media_file(db, media_stream.media_file_id)
         await db.commit()
+        response_cache.invalidate([media_stream.media_file_id])
     except Exception as e:
         await db.rollback()
         raise HTTPException(
@@ -125,14 +144,46 @@ async def delete_media_stream(stream_id: int, db: AsyncSession = Depends(get_db)
 
 
 @router.get("/by-type/{codec_type}", response_model=List[MediaStreamResponse])
+@query_budget(1)
 async def get_streams_by_type(
-    codec_type: str, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    codec_type: str,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    result = await db.execute(
-        select(MediaStream)
-        .where(MediaStream.codec_type == codec_type)
-        .offset(skip)
-        .limit(limit)
-        .order_by(MediaStream.media_file_id, MediaStream.index)
+    query = select(MediaStream).where(MediaStream.codec_type == codec_type)
+    return await _paginate_streams(request, response, db, query, skip, limit, cursor)
+
+
+async def _paginate_streams(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    query,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+):
+    """Run a stream listing with keyset pagination, falling back to offsets."""
+    query = apply_media_stream_cursor(query, cursor)
+    if not cursor:
+        query = query.offset(skip)
+
+    result = await db.execute(query.limit(limit))
+    media_streams = result.scalars().all()
+
+    if media_streams and len(media_streams) == limit:
+        set_next_page_headers(request, response, media_stream_cursor(media_streams[-1]))
+    return media_streams
+
+
+async def _touch_media_file(db: AsyncSession, media_file_id: int) -> None:
+    """Bump the parent's updated_at so its ETag changes with its streams."""
+    await db.execute(
+        update(MediaFile)
+        .where(MediaFile.id == media_file_id)
+        .values(updated_at=func.now())
     )
-    return result.scalars().all()
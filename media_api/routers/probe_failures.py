@@ -0,0 +1,37 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_read_db
+from ..core.query_budget import query_budget
+from ..core.schemas import FFProbeFailureClassResponse, FFProbeFailureResponse
+from ..utils.probe_failures import count_failures_by_class, list_failures
+
+router = APIRouter(prefix="/probe-failures", tags=["probe-failures"])
+
+ErrorClass = Literal["timeout", "ffprobe_error", "invalid_output"]
+
+
+@router.get("", response_model=List[FFProbeFailureResponse])
+@query_budget(1)
+async def list_probe_failures(
+    error_class: Optional[ErrorClass] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Files whose last ffprobe run failed, newest first.
+
+    ``attempts`` counts the failed runs of the file as it is now;
+    ``next_retry_at`` is empty once automatic retries gave up, or while a
+    retry is queued.
+    """
+    return await list_failures(db, error_class, skip, limit)
+
+
+@router.get("/classes", response_model=List[FFProbeFailureClassResponse])
+@query_budget(1)
+async def list_probe_failure_classes(db: AsyncSession = Depends(get_read_db)):
+    """Number of failed files per error class."""
+    return await count_failures_by_class(db)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_db, get_read_db
+from ..core.models import ProbeJob
+from ..core.query_budget import query_budget
+from ..core.schemas import ProbeJobCreate, ProbeJobResponse
+from ..utils.probe_jobs import enqueue_probe_job, probe_job_worker
+
+router = APIRouter(prefix="/probe-jobs", tags=["probe-jobs"])
+
+
+@router.post("", response_model=ProbeJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@query_budget(2)
+async def create_probe_job(
+    job_data: ProbeJobCreate, response: Response, db: AsyncSession = Depends(get_db)
+):
+    """Queue an ffprobe run of a file and return at once.
+
+    Poll the URL in ``Location`` until the job has succeeded (its
+    ``media_file_id`` is set) or failed. While a file already has a queued or
+    running job with the same ``profile``, that job is returned instead of
+    queueing another.
+    """
+    job = await enqueue_probe_job(db, job_data.filepath, profile=job_data.profile)
+    probe_job_worker.notify()
+    response.headers["Location"] = f"{router.prefix}/{job.id}"
+    return job
+
+
+@router.get("/{job_id}", response_model=ProbeJobResponse)
+@query_budget(1)
+async def get_probe_job(job_id: int, db: AsyncSession = Depends(get_read_db)):
+    job = await db.get(ProbeJob, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Probe job not found"
+        )
+    return job
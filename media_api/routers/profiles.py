@@ -0,0 +1,75 @@
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from ..core import profiling
+from ..core.profiling import profile_store, verify_profile_token
+from ..core.schemas import ProfileDetailResponse, ProfileSummaryResponse
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+
+async def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    if not profiling.PROFILING_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiling endpoints are disabled (PROFILING_SECRET is not set)",
+        )
+    if not verify_profile_token(profiling.PROFILING_SECRET, x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Missing, invalid or expired X-Profile-Token",
+        )
+
+
+@router.get(
+    "",
+    response_model=List[ProfileSummaryResponse],
+    dependencies=[Depends(require_profile_token)],
+)
+async def list_profiles(limit: int = Query(100, ge=1, le=1000)):
+    """Stored request profiles, newest first."""
+    summaries = []
+    for profile_id in profile_store.ids()[:limit]:
+        try:
+            summaries.append(profile_store.summary(profile_id).to_dict())
+        except KeyError:
+            # Rotated out since it was listed
+            continue
+    return summaries
+
+
+@router.get(
+    "/{profile_id}",
+    response_model=ProfileDetailResponse,
+    dependencies=[Depends(require_profile_token)],
+)
+async def get_profile(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(30, ge=1, le=500),
+):
+    """A profile's summary plus its most expensive functions."""
+    try:
+        summary = profile_store.summary(profile_id)
+        functions = profile_store.top_functions(profile_id, sort, limit)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return {**summary.to_dict(), "functions": functions}
+
+
+@router.get("/{profile_id}/pstats", dependencies=[Depends(require_profile_token)])
+async def download_profile(profile_id: str):
+    """The raw profile, for ``pstats``, snakeviz and similar tools."""
+    try:
+        path = profile_store.stats_path(profile_id)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(
+        path, media_type="application/octet-stream", filename=f"{profile_id}.prof"
+    )
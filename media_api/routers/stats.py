@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_read_db
+from ..core.schemas import (
+    CatalogStatsResponse,
+    CodecStats,
+    FormatStats,
+    ResolutionStats,
+)
+from ..utils.catalog_stats import get_catalog_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("", response_model=CatalogStatsResponse)
+async def catalog_stats(db: AsyncSession = Depends(get_read_db)):
+    """Catalog totals per format, codec and resolution bucket.
+
+    Served from the pre-aggregated ``catalog_stats`` table, so the cost
+    depends on the number of groups rather than the size of the catalog.
+    """
+    stats = CatalogStatsResponse()
+    for row in await get_catalog_stats(db):
+        if row.dimension == "total":
+            stats.files = row.count
+            stats.total_duration = row.total_duration
+            stats.total_bytes = row.total_bytes
+        elif row.dimension == "format":
+            stats.formats.append(
+                FormatStats(
+                    format_name=row.key or None,
+                    count=row.count,
+                    total_duration=row.total_duration,
+                    total_bytes=row.total_bytes,
+                )
+            )
+        elif row.dimension == "codec":
+            codec_type, _, codec_name = row.key.partition("/")
+            stats.codecs.append(
+                CodecStats(
+                    codec_type=codec_type or None,
+                    codec_name=codec_name or None,
+                    count=row.count,
+                )
+            )
+        elif row.dimension == "resolution":
+            stats.resolutions.append(ResolutionStats(bucket=row.key, count=row.count))
+    return stats
@@ -0,0 +1,83 @@
+"""Set-based deletes of media files.
+
+Streams, chapters and raw probes reference their file with ``ON DELETE
+CASCADE``, so removing any number of files is a single ``DELETE`` on
+``media_files``. Nothing is loaded into the session, which also means the
+catalog_stats mapper events never see the rows; ``delete_media_files``
+computes the negative delta itself. Large sets are deleted in batches of
+``DELETE_BATCH_SIZE`` files, each in its own transaction, so row locks are
+held for one batch rather than the whole cleanup.
+"""
+
+import os
+from typing import AsyncIterator, List, Sequence
+
+from sqlalchemy import Select, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from media_api.core.models import MediaFile, MediaStream
+from media_api.utils.catalog_stats import (
+    FILE_STAT_COLUMNS,
+    STREAM_STAT_COLUMNS,
+    StatsDelta,
+    apply_stats_delta,
+)
+from media_api.utils.response_cache import response_cache
+
+DELETE_BATCH_SIZE = int(os.getenv("DELETE_BATCH_SIZE", "500"))
+
+
+async def delete_media_files(db: AsyncSession, ids: Sequence[int]) -> List[int]:
+    """Delete the given media files and, by cascade, their children.
+
+    Returns the ids that existed and were deleted. The caller owns the
+    transaction.
+    """
+    if not ids:
+        return []
+
+    delta = StatsDelta()
+    stream_columns = [getattr(MediaStream, name) for name in STREAM_STAT_COLUMNS]
+    streams = await db.execute(
+        select(*stream_columns, func.count())
+        .where(MediaStream.media_file_id.in_(ids))
+        .group_by(*stream_columns)
+    )
+    for *values, count in streams:
+        delta.add_stream(*values, sign=-count)
+
+    result = await db.execute(
+        delete(MediaFile)
+        .where(MediaFile.id.in_(ids))
+        .returning(
+            MediaFile.id, *(getattr(MediaFile, name) for name in FILE_STAT_COLUMNS)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    deleted = []
+    for media_file_id, *values in result:
+        deleted.append(media_file_id)
+        delta.add_file(*values, sign=-1)
+
+    await apply_stats_delta(db, delta)
+    return deleted
+
+
+async def delete_media_files_in_batches(
+    db: AsyncSession, query: Select, batch_size: int = DELETE_BATCH_SIZE
+) -> AsyncIterator[List[int]]:
+    """Delete the media files whose ids ``query`` selects, a batch at a time.
+
+    ``query`` selects ``MediaFile.id``. Each batch is committed before the
+    next is selected and its ids are yielded; the cached responses of deleted
+    files are dropped as each batch commits.
+    """
+    while True:
+        result = await db.execute(query.order_by(MediaFile.id).limit(batch_size))
+        ids = list(result.scalars())
+        if not ids:
+            return
+        deleted = await delete_media_files(db, ids)
+        await db.commit()
+        response_cache.invalidate(deleted)
+        yield deleted
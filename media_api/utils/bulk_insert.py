@@ -0,0 +1,180 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+from media_api.core.models import (
+    MediaFile,
+    MediaStream,
+    MediaChapter,
+    MediaFileRawProbe,
+)
+from media_api.utils.catalog_stats import (
+    FILE_STAT_COLUMNS,
+    STREAM_STAT_COLUMNS,
+    StatsDelta,
+    apply_stats_delta,
+)
+from media_api.utils.dialects import dialect_insert
+from media_api.utils.ffprobe_parser import ParsedMediaFile
+
+# ORM bulk inserts leave out None values by default, which splits rows with
+# different missing columns (video vs audio streams) into separate batches.
+# Rendering the NULLs keeps every row's key set equal so each table is
+# written with as few multi-row INSERTs as the driver allows.
+BULK_INSERT_OPTIONS = {"render_nulls": True}
+
+
+async def insert_media_files(
+    db: AsyncSession, parsed_files: List[ParsedMediaFile]
+) -> List[int]:
+    """Insert media files and their children with multi-row INSERT statements.
+
+    Returns the new ids in the same order as ``parsed_files``. The caller owns
+    the transaction.
+    """
+    if not parsed_files:
+        return []
+
+    result = await db.execute(
+        insert(MediaFile)
+        .returning(MediaFile.id, sort_by_parameter_order=True)
+        .execution_options(**BULK_INSERT_OPTIONS),
+        [parsed.media_file for parsed in parsed_files],
+    )
+    ids = list(result.scalars())
+    await _insert_children(db, ids, parsed_files)
+
+    delta = StatsDelta()
+    _add_parsed_stats(delta, parsed_files)
+    await apply_stats_delta(db, delta)
+    return ids
+
+
+async def upsert_media_files(
+    db: AsyncSession, parsed_files: List[ParsedMediaFile]
+) -> List[int]:
+    """Insert or overwrite media files keyed on ``filepath``.
+
+    Existing rows are updated in place with ``INSERT ... ON CONFLICT DO
+    UPDATE`` and their streams, chapters and raw probe are replaced, so a
+    rescan costs the same fixed set of statements as a fresh insert. Returns
+    the ids in the same order as ``parsed_files``; a filepath given twice
+    resolves to the last occurrence. The caller owns the transaction.
+    """
+    if not parsed_files:
+        return []
+
+    latest = {parsed.media_file["filepath"]: parsed for parsed in parsed_files}
+    unique_files = list(latest.values())
+
+    # Take the overwritten rows out of the catalog stats
+    delta = StatsDelta()
+    previous = await db.execute(
+        select(*(getattr(MediaFile, name) for name in FILE_STAT_COLUMNS)).where(
+            MediaFile.filepath.in_(latest)
+        )
+    )
+    for row in previous:
+        delta.add_file(*row, sign=-1)
+
+    stmt = dialect_insert(db.get_bind().dialect.name, MediaFile)
+
+    columns = {name for parsed in unique_files for name in parsed.media_file}
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaFile.filepath],
+        set_={
+            **{name: stmt.excluded[name] for name in columns if name != "filepath"},
+            "updated_at": func.now(),
+        },
+    )
+    # Every row needs the same keys for a single multi-row statement
+    rows = [
+        {name: parsed.media_file.get(name) for name in columns}
+        for parsed in unique_files
+    ]
+    result = await db.execute(
+        stmt.returning(MediaFile.id, MediaFile.filepath).execution_options(
+            **BULK_INSERT_OPTIONS
+        ),
+        rows,
+    )
+    ids_by_path = {filepath: media_file_id for media_file_id, filepath in result}
+    ids = [ids_by_path[parsed.media_file["filepath"]] for parsed in unique_files]
+
+    old_streams = await db.execute(
+        delete(MediaStream)
+        .where(MediaStream.media_file_id.in_(ids))
+        .returning(*(getattr(MediaStream, name) for name in STREAM_STAT_COLUMNS))
+    )
+    for row in old_streams:
+        delta.add_stream(*row, sign=-1)
+    for model in (MediaChapter, MediaFileRawProbe):
+        await db.execute(delete(model).where(model.media_file_id.in_(ids)))
+    await _insert_children(db, ids, unique_files)
+
+    _add_parsed_stats(delta, unique_files)
+    await apply_stats_delta(db, delta)
+
+    return [ids_by_path[parsed.media_file["filepath"]] for parsed in parsed_files]
+
+
+async def _insert_children(
+    db: AsyncSession, ids: List[int], parsed_files: List[ParsedMediaFile]
+) -> None:
+    stream_rows = [
+        {**stream, "media_file_id": media_file_id}
+        for media_file_id, parsed in zip(ids, parsed_files, strict=True)
+        for stream in parsed.streams
+    ]
+    if stream_rows:
+        await db.execute(
+            insert(MediaStream).execution_options(**BULK_INSERT_OPTIONS), stream_rows
+        )
+
+    chapter_rows = [
+        {**chapter, "media_file_id": media_file_id}
+        for media_file_id, parsed in zip(ids, parsed_files, strict=True)
+        for chapter in parsed.chapters
+    ]
+    if chapter_rows:
+        await db.execute(
+            insert(MediaChapter).execution_options(**BULK_INSERT_OPTIONS), chapter_rows
+        )
+
+    raw_probe_rows = []
+    for media_file_id, parsed in zip(ids, parsed_files, strict=True):
+        raw_probe_row = parsed.raw_probe_row()
+        if raw_probe_row is not None:
+            raw_probe_rows.append({**raw_probe_row, "media_file_id": media_file_id})
+    if raw_probe_rows:
+        await db.execute(
+            insert(MediaFileRawProbe).execution_options(**BULK_INSERT_OPTIONS),
+            raw_probe_rows,
+        )
+
+
+def _add_parsed_stats(delta: StatsDelta, parsed_files: List[ParsedMediaFile]) -> None:
+    for parsed in parsed_files:
+        delta.add_file(*(parsed.media_file.get(name) for name in FILE_STAT_COLUMNS))
+        for stream in parsed.streams:
+            delta.add_stream(*(stream.get(name) for name in STREAM_STAT_COLUMNS))
+
+
+async def insert_media_files_isolated(
+    db: AsyncSession, parsed_files: List[ParsedMediaFile], upsert: bool = False
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Insert media files one savepoint at a time so a bad row only fails itself.
+
+    Returns an ``(id, error)`` pair per input. Used as the fallback when a
+    whole batch is rejected by the database.
+    """
+    outcomes = []
+    for parsed in parsed_files:
+        try:
+            async with db.begin_nested():
+                write = upsert_media_files if upsert else insert_media_files
+                [media_file_id] = await write(db, [parsed])
+            outcomes.append((media_file_id, None))
+        except Exception as e:
+            outcomes.append((None, str(e)))
+    return outcomes
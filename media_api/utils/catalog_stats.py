@@ -0,0 +1,250 @@
+"""Incrementally maintained catalog totals.
+
+``catalog_stats`` holds one row per (dimension, key) group:
+
+* ``total`` / ``""`` - every media file
+* ``format`` / format_name - files, duration and bytes per container format
+* ``codec`` / "codec_type/codec_name" - streams per codec
+* ``resolution`` / bucket - video streams per height bucket
+
+Writes add signed deltas to those rows instead of recounting. ORM inserts,
+updates and deletes of ``MediaFile`` and ``MediaStream`` are picked up by
+mapper events and applied once per flush; the Core bulk paths in
+``bulk_insert`` and ``bulk_delete`` record their deltas explicitly. Streams
+removed by ``ON DELETE CASCADE`` are invisible to the events, so media files
+are deleted with ``bulk_delete.delete_media_files`` rather than
+``session.delete``. ``rebuild_catalog_stats`` recomputes everything from
+scratch.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from media_api.core.models import CatalogStat, MediaFile, MediaStream
+from media_api.utils.dialects import dialect_insert
+
+RESOLUTION_BUCKETS = [
+    (2160, "2160p"),
+    (1440, "1440p"),
+    (1080, "1080p"),
+    (720, "720p"),
+    (480, "480p"),
+]
+FILE_STAT_COLUMNS = ("format_name", "duration", "file_size")
+STREAM_STAT_COLUMNS = ("codec_type", "codec_name", "height")
+
+
+def resolution_bucket(height: Optional[int]) -> str:
+    if height is None:
+        return "unknown"
+    for min_height, bucket in RESOLUTION_BUCKETS:
+        if height >= min_height:
+            return bucket
+    return "sd"
+
+
+def codec_key(codec_type: Optional[str], codec_name: Optional[str]) -> str:
+    return f"{codec_type or ''}/{codec_name or ''}"
+
+
+class StatsDelta:
+    """Signed changes to catalog_stats rows, keyed by (dimension, key)."""
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, str], List[float]] = {}
+
+    def __bool__(self) -> bool:
+        return any(any(values) for values in self._groups.values())
+
+    def _add(self, dimension: str, key: str, count: int, duration=0.0, size=0):
+        values = self._groups.setdefault((dimension, key), [0, 0.0, 0])
+        values[0] += count
+        values[1] += duration
+        values[2] += size
+
+    def add_file(
+        self,
+        format_name: Optional[str],
+        duration: Optional[float],
+        file_size: Optional[int],
+        sign: int = 1,
+    ) -> None:
+        duration = sign * (duration or 0.0)
+        file_size = sign * (file_size or 0)
+        self._add("total", "", sign, duration, file_size)
+        self._add("format", format_name or "", sign, duration, file_size)
+
+    def add_stream(
+        self,
+        codec_type: Optional[str],
+        codec_name: Optional[str],
+        height: Optional[int],
+        sign: int = 1,
+    ) -> None:
+        self._add("codec", codec_key(codec_type, codec_name), sign)
+        if codec_type == "video":
+            self._add("resolution", resolution_bucket(height), sign)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        # Sorted so concurrent writers lock rows in the same order
+        return [
+            {
+                "dimension": dimension,
+                "key": key,
+                "count": values[0],
+                "total_duration": values[1],
+                "total_bytes": values[2],
+            }
+            for (dimension, key), values in sorted(self._groups.items())
+            if any(values)
+        ]
+
+    def statement(self, dialect_name: str):
+        stmt = dialect_insert(dialect_name, CatalogStat)
+        return stmt.on_conflict_do_update(
+            index_elements=[CatalogStat.dimension, CatalogStat.key],
+            set_={
+                name: getattr(CatalogStat, name) + stmt.excluded[name]
+                for name in ("count", "total_duration", "total_bytes")
+            },
+        )
+
+
+async def apply_stats_delta(db: AsyncSession, delta: StatsDelta) -> None:
+    """Add ``delta`` to catalog_stats inside the caller's transaction."""
+    if delta:
+        await db.execute(delta.statement(db.get_bind().dialect.name), delta.rows())
+
+
+async def get_catalog_stats(db: AsyncSession) -> List[CatalogStat]:
+    result = await db.execute(
+        select(CatalogStat)
+        .where(CatalogStat.count > 0)
+        .order_by(CatalogStat.dimension, CatalogStat.count.desc(), CatalogStat.key)
+    )
+    return list(result.scalars())
+
+
+async def rebuild_catalog_stats(db: AsyncSession) -> int:
+    """Recompute catalog_stats from the catalog; returns the number of groups.
+
+    The caller commits.
+    """
+    delta = StatsDelta()
+
+    files = await db.execute(
+        select(
+            MediaFile.format_name,
+            func.count(MediaFile.id),
+            func.sum(MediaFile.duration),
+            func.sum(MediaFile.file_size),
+        ).group_by(MediaFile.format_name)
+    )
+    for format_name, count, duration, size in files:
+        delta._add("total", "", count, duration or 0.0, size or 0)
+        delta._add("format", format_name or "", count, duration or 0.0, size or 0)
+
+    streams = await db.execute(
+        select(
+            MediaStream.codec_type,
+            MediaStream.codec_name,
+            func.count(MediaStream.id),
+        ).group_by(MediaStream.codec_type, MediaStream.codec_name)
+    )
+    for codec_type, codec_name, count in streams:
+        delta._add("codec", codec_key(codec_type, codec_name), count)
+
+    heights = await db.execute(
+        select(MediaStream.height, func.count(MediaStream.id))
+        .where(MediaStream.codec_type == "video")
+        .group_by(MediaStream.height)
+    )
+    for height, count in heights:
+        delta._add("resolution", resolution_bucket(height), count)
+
+    await db.execute(delete(CatalogStat))
+    await apply_stats_delta(db, delta)
+    return len(delta.rows())
+
+
+# ORM write tracking. Deltas are collected per session while the unit of work
+# runs and written with one statement at the end of the flush.
+
+
+def _session_delta(target) -> StatsDelta:
+    session = object_session(target)
+    return session.info.setdefault("catalog_stats_delta", StatsDelta())
+
+
+def _values(target, columns, previous: bool = False) -> List[Any]:
+    """Current column values, or the ones before this flush's changes."""
+    state = inspect(target)
+    values = []
+    for name in columns:
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(state.dict.get(name))
+    return values
+
+
+def _changed(target, columns) -> bool:
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in columns)
+
+
+@event.listens_for(MediaFile, "after_insert")
+def _media_file_inserted(mapper, connection, target):
+    _session_delta(target).add_file(*_values(target, FILE_STAT_COLUMNS))
+
+
+@event.listens_for(MediaFile, "after_update")
+def _media_file_updated(mapper, connection, target):
+    if _changed(target, FILE_STAT_COLUMNS):
+        delta = _session_delta(target)
+        delta.add_file(*_values(target, FILE_STAT_COLUMNS, previous=True), sign=-1)
+        delta.add_file(*_values(target, FILE_STAT_COLUMNS))
+
+
+@event.listens_for(MediaFile, "after_delete")
+def _media_file_deleted(mapper, connection, target):
+    _session_delta(target).add_file(
+        *_values(target, FILE_STAT_COLUMNS, previous=True), sign=-1
+    )
+
+
+@event.listens_for(MediaStream, "after_insert")
+def _media_stream_inserted(mapper, connection, target):
+    _session_delta(target).add_stream(*_values(target, STREAM_STAT_COLUMNS))
+
+
+@event.listens_for(MediaStream, "after_update")
+def _media_stream_updated(mapper, connection, target):
+    if _changed(target, STREAM_STAT_COLUMNS):
+        delta = _session_delta(target)
+        delta.add_stream(*_values(target, STREAM_STAT_COLUMNS, previous=True), sign=-1)
+        delta.add_stream(*_values(target, STREAM_STAT_COLUMNS))
+
+
+@event.listens_for(MediaStream, "after_delete")
+def _media_stream_deleted(mapper, connection, target):
+    _session_delta(target).add_stream(
+        *_values(target, STREAM_STAT_COLUMNS, previous=True), sign=-1
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_session_delta(session, flush_context):
+    delta = session.info.pop("catalog_stats_delta", None)
+    if delta:
+        connection = session.connection()
+        connection.execute(delta.statement(connection.dialect.name), delta.rows())
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_session_delta(session):
+    session.info.pop("catalog_stats_delta", None)
@@ -0,0 +1,149 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+from sqlalchemy.sql import func
+
+from media_api.core.models import (
+    MediaChapter,
+    MediaFile,
+    MediaFileRawProbe,
+    MediaStream,
+)
+from media_api.utils.bulk_insert import BULK_INSERT_OPTIONS
+from media_api.utils.catalog_stats import (
+    STREAM_STAT_COLUMNS,
+    StatsDelta,
+    apply_stats_delta,
+)
+from media_api.utils.ffprobe_parser import ParsedMediaFile
+
+
+def _assign(instance: Any, values: Dict[str, Any]) -> bool:
+    """Set only the attributes whose value differs; return whether any did."""
+    changed = False
+    for name, value in values.items():
+        if getattr(instance, name) != value:
+            setattr(instance, name, value)
+            changed = True
+    return changed
+
+
+def _assign_row(instance: Any, values: Dict[str, Any]) -> bool:
+    """Like ``_assign``, but rewrite every column once any of them changed.
+
+    The unit of work batches UPDATEs with the same SET clause into one
+    executemany, so changed streams (or chapters) all sharing the full column
+    list cost one statement instead of one per distinct set of changes.
+
+    Only the unchanged columns are flagged: flagging a changed one drops its
+    old value from the attribute history, which catalog_stats reads to
+    subtract the row's previous counts.
+    """
+    changed = {
+        name for name, value in values.items() if getattr(instance, name) != value
+    }
+    if not changed:
+        return False
+    for name, value in values.items():
+        if name in changed:
+            setattr(instance, name, value)
+        else:
+            flag_modified(instance, name)
+    return True
+
+
+async def _insert_children(
+    db: AsyncSession,
+    media_file: MediaFile,
+    name: str,
+    model: Any,
+    rows: List[Dict[str, Any]],
+) -> None:
+    """Insert new children with one multi-row INSERT and add them to ``name``.
+
+    Added to the collection as ORM objects, the unit of work would emit one
+    INSERT per row on backends without an insertmanyvalues sentinel (SQLite).
+    """
+    if not rows:
+        return
+    # No sort_by_parameter_order: without a sentinel column it makes SQLite
+    # fall back to one INSERT per row. Ordering by id instead gives the order
+    # a fresh load would.
+    result = await db.scalars(
+        insert(model).returning(model).execution_options(**BULK_INSERT_OPTIONS),
+        [{**row, "media_file_id": media_file.id} for row in rows],
+    )
+    added = sorted(result, key=lambda child: child.id)
+    # Already in the database: extend the loaded collection without making
+    # the ORM think it has anything left to write
+    set_committed_value(media_file, name, [*getattr(media_file, name), *added])
+
+
+async def apply_media_file_update(
+    db: AsyncSession, media_file: MediaFile, parsed: ParsedMediaFile
+) -> bool:
+    """Bring a loaded media file graph in line with a fresh probe.
+
+    Streams are matched on ``index`` and chapters on ``chapter_id``. Changed
+    and removed children go through the unit of work, which batches them
+    into one UPDATE and one DELETE per table; new children are written with
+    one multi-row INSERT per table. ``streams``, ``chapters`` and
+    ``raw_probe`` must already be loaded. Returns whether anything changed;
+    ``updated_at`` is only bumped when it did. The caller commits.
+    """
+    changed = _assign(media_file, parsed.media_file)
+
+    new_streams = []
+    existing_streams = {stream.index: stream for stream in media_file.streams}
+    for row in parsed.streams:
+        stream = existing_streams.pop(row["index"], None)
+        if stream is None:
+            new_streams.append(row)
+        else:
+            changed |= _assign_row(stream, row)
+    for stream in existing_streams.values():
+        media_file.streams.remove(stream)
+        changed = True
+
+    new_chapters = []
+    existing_chapters = {chapter.chapter_id: chapter for chapter in media_file.chapters}
+    for row in parsed.chapters:
+        chapter = existing_chapters.pop(row["chapter_id"], None)
+        if chapter is None:
+            new_chapters.append(row)
+        else:
+            changed |= _assign_row(chapter, row)
+    for chapter in existing_chapters.values():
+        media_file.chapters.remove(chapter)
+        changed = True
+
+    # Compression is deterministic, so equal documents give equal payloads.
+    raw_probe_row = parsed.raw_probe_row()
+    if raw_probe_row is None:
+        if media_file.raw_probe is not None:
+            media_file.raw_probe = None
+            changed = True
+    elif media_file.raw_probe is None:
+        media_file.raw_probe = MediaFileRawProbe(**raw_probe_row)
+        changed = True
+    else:
+        changed |= _assign(media_file.raw_probe, raw_probe_row)
+
+    if new_streams or new_chapters:
+        changed = True
+    if changed:
+        media_file.updated_at = func.now()
+
+    if new_streams or new_chapters:
+        # Write the ORM changes first; the mapper events record their stats
+        await db.flush()
+        await _insert_children(db, media_file, "streams", MediaStream, new_streams)
+        await _insert_children(db, media_file, "chapters", MediaChapter, new_chapters)
+        # Core inserts are invisible to those events
+        delta = StatsDelta()
+        for row in new_streams:
+            delta.add_stream(*(row.get(name) for name in STREAM_STAT_COLUMNS))
+        await apply_stats_delta(db, delta)
+    return changed
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List
+
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+    return value
+
+
+async def stream_export(
+    session_factory: async_sessionmaker,
+    query: Select,
+    columns: List[str],
+    export_format: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """Yield an export document one batch of rows at a time.
+
+    Rows come from a server-side cursor, so memory use is bounded by
+    ``batch_size`` rather than the size of the result.
+    """
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for rows in result.partitions():
+                for row in rows:
+                    writer.writerow([_csv_value(value) for value in row])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps(
+                        dict(zip(columns, row, strict=True)),
+                        default=_json_default,
+                        separators=(",", ":"),
+                    )
+                    + "\n"
+                    for row in rows
+                )
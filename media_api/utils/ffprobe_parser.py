@@ -1,195 +1,269 @@
+import asyncio
 import json
-import subprocess
-from typing import Optional, Dict, Any
-from pathlib import Path
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+from media_api.core.metrics import FFPROBE_DURATION
 from media_api.core.schemas import FFProbeOutput
-from media_api.core.models import MediaFile, MediaStream, MediaChapter, FFProbeError
+from media_api.core.models import (
+    MediaFile,
+    MediaStream,
+    MediaChapter,
+    MediaFileRawProbe,
+    FFProbeError,
+)
+from media_api.utils.parse_pool import parse_pool
+from media_api.utils.probe_cache import probe_cache
+from media_api.utils.probe_pool import probe_pool, ProbeTimeoutError
+from media_api.utils.probe_profiles import get_profile
+from media_api.utils.probe_convert import convert_probe
+from media_api.utils.raw_probe import compress_probe
+from media_api.utils.response_cache import response_cache
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+async def _file_size(filepath: str) -> Optional[int]:
+    try:
+        return await asyncio.to_thread(os.path.getsize, filepath)
+    except OSError:
+        return None
+
+
+@dataclass
+class ParsedMediaFile:
+    """Column values for a media file and its children, ready for insertion."""
+
+    media_file: Dict[str, Any]
+    streams: List[Dict[str, Any]] = field(default_factory=list)
+    chapters: List[Dict[str, Any]] = field(default_factory=list)
+    raw_ffprobe: Optional[Dict[str, Any]] = None
+    # Set by compress_raw_probe, e.g. in a parse pool worker
+    compressed_raw_probe: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    def compress_raw_probe(self) -> None:
+        if self.raw_ffprobe is not None:
+            encoding, data, size = compress_probe(self.raw_ffprobe)
+            self.compressed_raw_probe = {
+                "encoding": encoding,
+                "data": data,
+                "size": size,
+            }
+
+    def raw_probe_row(self) -> Optional[Dict[str, Any]]:
+        """Compressed column values for ``media_file_raw_probes``."""
+        if self.raw_ffprobe is None:
+            return None
+        if self.compressed_raw_probe is None:
+            self.compress_raw_probe()
+        return self.compressed_raw_probe
+
+    def to_model(self) -> MediaFile:
+        media_file = MediaFile(**self.media_file)
+        media_file.streams = [MediaStream(**stream) for stream in self.streams]
+        media_file.chapters = [MediaChapter(**chapter) for chapter in self.chapters]
+        raw_probe_row = self.raw_probe_row()
+        if raw_probe_row is not None:
+            media_file.raw_probe = MediaFileRawProbe(**raw_probe_row)
+        return media_file
+
+
+class FFProbeFailedError(Exception):
+    """Raised when ffprobe exits with a non-zero status."""
+
+    def __init__(self, message: str, returncode: Optional[int] = None):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+class FFProbeTimeoutError(Exception):
+    """Raised when ffprobe does not finish within the probe pool's timeout."""
+
+
+class FFProbeOutputError(Exception):
+    """Raised when ffprobe's output is not valid JSON."""
+
+
+class FFProbeKnownFailureError(FFProbeFailedError):
+    """Raised instead of probing an unchanged file that failed recently.
+
+    See ``probe_failures``.
+    """
+
+
 class FFProbeParser:
     @staticmethod
-    async def run_ffprobe(filepath: str) -> Optional[Dict[str, Any]]:
-        """Run ffprobe on a file and return the JSON output."""
-        cmd = [
-            "ffprobe",
-            "-v",
-            "quiet",
-            "-print_format",
-            "json",
-            "-show_format",
-            "-show_streams",
-            "-show_chapters",
-            filepath,
-        ]
+    async def run_ffprobe_output(
+        filepath: str, profile: Optional[str] = None, size: Optional[int] = None
+    ) -> bytes:
+        """Run ffprobe on a file and return its raw JSON output.
+
+        ``profile`` names one of ``probe_profiles.PROBE_PROFILES``; its timeout
+        is scaled to ``size`` bytes, read from the file when not given.
+        """
+        probe_profile = get_profile(profile)
+        if size is None:
+            size = await _file_size(filepath)
+        cmd = probe_profile.command(filepath)
+
+        started = time.perf_counter()
+
+        def observe(exit_code: str) -> None:
+            FFPROBE_DURATION.labels(probe_profile.name, exit_code).observe(
+                time.perf_counter() - started
+            )
 
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            result = await probe_pool.run(cmd, probe_profile.timeout_for(size))
+        except ProbeTimeoutError:
+            observe("timeout")
+            raise FFProbeTimeoutError(f"FFprobe timeout for file: {filepath}")
+        except OSError as e:
+            observe("error")
+            raise FFProbeFailedError(f"FFprobe failed: {e}")
+        observe(str(result.returncode))
 
-            if result.returncode == 0:
-                return json.loads(result.stdout)
-            else:
-                raise subprocess.CalledProcessError(
-                    result.returncode, cmd, result.stderr
-                )
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", errors="replace")
+            raise FFProbeFailedError(f"FFprobe failed: {stderr}", result.returncode)
+        return result.stdout
+
+    @staticmethod
+    def decode_ffprobe_output(output: bytes) -> Dict[str, Any]:
+        try:
+            return json.loads(output)
+        except ValueError as e:
+            raise FFProbeOutputError(f"Failed to parse ffprobe output: {e}")
 
-        except subprocess.TimeoutExpired:
-            raise Exception(f"FFprobe timeout for file: {filepath}")
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"FFprobe failed: {e.stderr}")
-        except json.JSONDecodeError as e:
-            raise Exception(f"Failed to parse ffprobe output: {e}")
+    @staticmethod
+    async def run_ffprobe(
+        filepath: str, profile: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Run ffprobe on a file and return the JSON output."""
+        output = await FFProbeParser.run_ffprobe_output(filepath, profile)
+        return await parse_pool.run(
+            len(output), FFProbeParser.decode_ffprobe_output, output
+        )
 
     @staticmethod
-    def parse_ffprobe_to_models(
-        filepath: str, ffprobe_data: Dict[str, Any]
-    ) -> MediaFile:
-        """Convert ffprobe JSON data to SQLAlchemy models."""
-        # Parse the data using Pydantic schema
-        parsed_data = FFProbeOutput(**ffprobe_data)
+    def parse_ffprobe_output(filepath: str, output: bytes) -> Optional[ParsedMediaFile]:
+        """Decode, validate and convert raw ffprobe output in one go.
 
-        # Extract file info
-        file_path = Path(filepath)
-        filename = file_path.name
+        Runs in a parse pool worker for large output, so the raw probe is
+        compressed here as well. None when ffprobe reported nothing.
+        """
+        ffprobe_data = FFProbeParser.decode_ffprobe_output(output)
+        if not ffprobe_data:
+            return None
+        parsed = FFProbeParser.parse_ffprobe_to_rows(filepath, ffprobe_data)
+        parsed.compress_raw_probe()
+        return parsed
 
-        # Create MediaFile instance
-        media_file = MediaFile(
-            filename=filename, filepath=filepath, raw_ffprobe=ffprobe_data
+    @staticmethod
+    async def probe(
+        filepath: str, profile: Optional[str] = None, size: Optional[int] = None
+    ) -> Optional[ParsedMediaFile]:
+        """Run ffprobe on a file and parse its output off the event loop."""
+        output = await FFProbeParser.run_ffprobe_output(filepath, profile, size)
+        return await parse_pool.run(
+            len(output), FFProbeParser.parse_ffprobe_output, filepath, output
         )
 
-        # Process format information
-        if parsed_data.format:
-            fmt = parsed_data.format
-            media_file.file_size = int(fmt.size) if fmt.size else None
-            media_file.format_name = fmt.format_name
-            media_file.format_long_name = fmt.format_long_name
-            media_file.duration = float(fmt.duration) if fmt.duration else None
-            media_file.bit_rate = int(fmt.bit_rate) if fmt.bit_rate else None
-            media_file.probe_score = fmt.probe_score
-            media_file.start_time = float(fmt.start_time) if fmt.start_time else None
-            media_file.nb_streams = fmt.nb_streams
-            media_file.nb_programs = fmt.nb_programs
-            media_file.tags = fmt.tags
-
-        # Process streams
-        if parsed_data.streams:
-            for stream_data in parsed_data.streams:
-                stream = MediaStream(
-                    index=stream_data.index,
-                    codec_name=stream_data.codec_name,
-                    codec_long_name=stream_data.codec_long_name,
-                    codec_type=stream_data.codec_type,
-                    codec_tag_string=stream_data.codec_tag_string,
-                    codec_tag=stream_data.codec_tag,
-                    # Video fields
-                    width=stream_data.width,
-                    height=stream_data.height,
-                    coded_width=stream_data.coded_width,
-                    coded_height=stream_data.coded_height,
-                    closed_captions=stream_data.closed_captions,
-                    film_grain=stream_data.film_grain,
-                    has_b_frames=stream_data.has_b_frames,
-                    sample_aspect_ratio=stream_data.sample_aspect_ratio,
-                    display_aspect_ratio=stream_data.display_aspect_ratio,
-                    pix_fmt=stream_data.pix_fmt,
-                    level=stream_data.level,
-                    color_range=stream_data.color_range,
-                    color_space=stream_data.color_space,
-                    color_transfer=stream_data.color_transfer,
-                    color_primaries=stream_data.color_primaries,
-                    chroma_location=stream_data.chroma_location,
-                    field_order=stream_data.field_order,
-                    refs=stream_data.refs,
-                    r_frame_rate=stream_data.r_frame_rate,
-                    avg_frame_rate=stream_data.avg_frame_rate,
-                    time_base=stream_data.time_base,
-                    # Audio fields
-                    sample_fmt=stream_data.sample_fmt,
-                    sample_rate=stream_data.sample_rate,
-                    channels=stream_data.channels,
-                    channel_layout=stream_data.channel_layout,
-                    bits_per_sample=stream_data.bits_per_sample,
-                    # Common fields
-                    start_pts=stream_data.start_pts,
-                    start_time=float(stream_data.start_time)
-                    if stream_data.start_time
-                    else None,
-                    duration_ts=stream_data.duration_ts,
-                    duration=float(stream_data.duration)
-                    if stream_data.duration
-                    else None,
-                    bit_rate=int(stream_data.bit_rate)
-                    if stream_data.bit_rate
-                    else None,
-                    max_bit_rate=int(stream_data.max_bit_rate)
-                    if stream_data.max_bit_rate
-                    else None,
-                    bits_per_raw_sample=stream_data.bits_per_raw_sample,
-                    nb_frames=int(stream_data.nb_frames)
-                    if stream_data.nb_frames
-                    else None,
-                    nb_read_frames=int(stream_data.nb_read_frames)
-                    if stream_data.nb_read_frames
-                    else None,
-                    nb_read_packets=int(stream_data.nb_read_packets)
-                    if stream_data.nb_read_packets
-                    else None,
-                    disposition=stream_data.disposition.model_dump()
-                    if stream_data.disposition
-                    else None,
-                    tags=stream_data.tags,
-                )
-                media_file.streams.append(stream)
-
-        # Process chapters
-        if parsed_data.chapters:
-            for chapter_data in parsed_data.chapters:
-                chapter = MediaChapter(
-                    chapter_id=chapter_data.id,
-                    time_base=chapter_data.time_base,
-                    start=chapter_data.start,
-                    start_time=float(chapter_data.start_time)
-                    if chapter_data.start_time
-                    else None,
-                    end=chapter_data.end,
-                    end_time=float(chapter_data.end_time)
-                    if chapter_data.end_time
-                    else None,
-                    tags=chapter_data.tags,
-                )
-                media_file.chapters.append(chapter)
+    @staticmethod
+    def parse_ffprobe_to_rows(
+        filepath: str, ffprobe_data: Dict[str, Any]
+    ) -> ParsedMediaFile:
+        """Convert ffprobe JSON data to plain column dicts for bulk inserts."""
+        return FFProbeParser.convert_ffprobe_output(
+            filepath, FFProbeOutput(**ffprobe_data), ffprobe_data
+        )
 
-        return media_file
+    @staticmethod
+    def convert_ffprobe_output(
+        filepath: str,
+        ffprobe_output: FFProbeOutput,
+        raw_ffprobe: Optional[Dict[str, Any]] = None,
+    ) -> ParsedMediaFile:
+        """Convert already validated ffprobe output without validating it again."""
+        media_file, streams, chapters = convert_probe(filepath, ffprobe_output)
+        return ParsedMediaFile(
+            media_file=media_file,
+            streams=streams,
+            chapters=chapters,
+            raw_ffprobe=raw_ffprobe,
+        )
+
+    @staticmethod
+    def parse_ffprobe_to_models(
+        filepath: str, ffprobe_data: Dict[str, Any]
+    ) -> MediaFile:
+        """Convert ffprobe JSON data to SQLAlchemy models."""
+        return FFProbeParser.parse_ffprobe_to_rows(filepath, ffprobe_data).to_model()
 
     @staticmethod
     async def process_media_file(
-        db: AsyncSession, filepath: str
+        db: AsyncSession, filepath: str, profile: Optional[str] = None
     ) -> Optional[MediaFile]:
-        """Process a media file with ffprobe and save to database."""
+        """Process a media file with ffprobe and save to database.
+
+        ``profile`` names the probe profile, the default one if not given.
+        """
+        # Imported here; both depend on this module
+        from media_api.utils.bulk_insert import upsert_media_files
+        from media_api.utils import probe_failures
+
+        profile = get_profile(profile).name
+        identity = None
         try:
-            # Run ffprobe
-            ffprobe_data = await FFProbeParser.run_ffprobe(filepath)
-            if not ffprobe_data:
-                return None
+            # Reuse earlier output of the same profile if the file has not
+            # changed
+            cache_key = await probe_cache.key_for(filepath, profile)
+            ffprobe_data = await probe_cache.get(db, cache_key)
+            cached = ffprobe_data is not None
+
+            failure = None
+            if cached:
+                parsed = FFProbeParser.parse_ffprobe_to_rows(filepath, ffprobe_data)
+            else:
+                # Don't spend an ffprobe run on an unchanged file that failed
+                # recently
+                if cache_key is not None:
+                    identity = cache_key.identity
+                else:
+                    identity = await probe_failures.file_identity(filepath)
+                failure = await probe_failures.check_known_failure(
+                    db, filepath, identity, profile
+                )
 
-            # Parse to models
-            media_file = FFProbeParser.parse_ffprobe_to_models(filepath, ffprobe_data)
+                # Run ffprobe and parse to rows
+                size = identity.size if identity is not None else None
+                parsed = await FFProbeParser.probe(filepath, profile, size)
+                if parsed is None:
+                    return None
+                await probe_cache.put(db, cache_key, parsed.raw_ffprobe)
 
-            # Save to database
-            db.add(media_file)
+            # Save to database, overwriting an earlier probe of the same path
+            [media_file_id] = await upsert_media_files(db, [parsed])
+            if failure is not None:
+                await db.delete(failure)
             await db.commit()
-            await db.refresh(media_file)
+            response_cache.invalidate([media_file_id])
+            media_file = await db.get(MediaFile, media_file_id, populate_existing=True)
 
             return media_file
 
+        except FFProbeKnownFailureError:
+            raise
         except Exception as e:
             # Log error to database
+            await db.rollback()
             error_record = FFProbeError(
                 filepath=filepath,
                 error_message=str(e),
                 error_code=getattr(e, "returncode", -1),
             )
             db.add(error_record)
+            await probe_failures.record_failure(db, filepath, identity, e, profile)
             await db.commit()
 
             raise e
@@ -0,0 +1,93 @@
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from media_api.core.models import MediaFile
+from media_api.core.schemas import (
+    MediaChapterResponse,
+    MediaFileResponse,
+    MediaFileSparseResponse,
+    MediaStreamResponse,
+)
+
+MEDIA_FILE_RELATIONSHIPS = {
+    "streams": MediaFile.streams,
+    "chapters": MediaFile.chapters,
+}
+MEDIA_FILE_FIELDS = [
+    name
+    for name in MediaFileResponse.model_fields
+    if name not in MEDIA_FILE_RELATIONSHIPS
+]
+
+
+class MediaFileFieldset:
+    """Which media file columns and relationships a request asked for."""
+
+    def __init__(self, fields: List[str], include: Set[str]):
+        self.fields = fields
+        self.include = include
+
+    @classmethod
+    def parse(
+        cls, fields: Optional[str], include: Optional[str]
+    ) -> Optional["MediaFileFieldset"]:
+        """Parse ``fields=`` and ``include=``; None means the full representation."""
+        if fields is None and include is None:
+            return None
+
+        requested_fields = _split(fields) or list(MEDIA_FILE_FIELDS)
+        unknown = [name for name in requested_fields if name not in MEDIA_FILE_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(unknown)}. "
+                f"Allowed: {', '.join(MEDIA_FILE_FIELDS)}",
+            )
+        if "id" not in requested_fields:
+            requested_fields.insert(0, "id")
+
+        requested_include = set(_split(include))
+        unknown = requested_include - MEDIA_FILE_RELATIONSHIPS.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown include: {', '.join(sorted(unknown))}. "
+                f"Allowed: {', '.join(MEDIA_FILE_RELATIONSHIPS)}",
+            )
+
+        return cls(requested_fields, requested_include)
+
+    def load_options(self, extra_columns: Optional[List[str]] = None) -> list:
+        """Loader options that select only the requested columns and relations."""
+        columns = {*self.fields, *(extra_columns or [])}
+        options = [load_only(*(getattr(MediaFile, name) for name in columns))]
+        options += [
+            selectinload(MEDIA_FILE_RELATIONSHIPS[name])
+            for name in sorted(self.include)
+        ]
+        options.append(raiseload("*"))
+        return options
+
+    def serialize(self, media_file: MediaFile) -> Dict[str, Any]:
+        data = {name: getattr(media_file, name) for name in self.fields}
+        if "streams" in self.include:
+            data["streams"] = [
+                MediaStreamResponse.model_validate(stream)
+                for stream in media_file.streams
+            ]
+        if "chapters" in self.include:
+            data["chapters"] = [
+                MediaChapterResponse.model_validate(chapter)
+                for chapter in media_file.chapters
+            ]
+        return MediaFileSparseResponse(**data).model_dump(
+            mode="json", exclude_unset=True
+        )
+
+
+def _split(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [part.strip() for part in value.split(",") if part.strip()]
@@ -0,0 +1,168 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Boolean, Select, String, bindparam, exists
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from media_api.core.models import MediaFile, MediaStream
+
+
+class MediaFileFilters:
+    """Query-string filters shared by the media file listing endpoints."""
+
+    def __init__(
+        self,
+        format_name: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ):
+        self.format_name = format_name
+        self.created_after = created_after
+        self.created_before = created_before
+
+    def apply(self, query: Select) -> Select:
+        if self.format_name is not None:
+            query = query.where(MediaFile.format_name == self.format_name)
+        if self.created_after is not None:
+            query = query.where(MediaFile.created_at >= self.created_after)
+        if self.created_before is not None:
+            query = query.where(MediaFile.created_at < self.created_before)
+        return query
+
+
+class MediaFileSearch(MediaFileFilters):
+    """Filters of ``/media-files/search``.
+
+    Stream criteria must all hold for the same stream and are checked with a
+    single correlated EXISTS. ``tag`` takes ``key:value`` or a bare ``key``
+    and may be repeated.
+    """
+
+    def __init__(
+        self,
+        format_name: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        min_duration: Optional[float] = None,
+        max_duration: Optional[float] = None,
+        min_file_size: Optional[int] = None,
+        max_file_size: Optional[int] = None,
+        codec_name: Optional[str] = None,
+        codec_type: Optional[str] = None,
+        min_width: Optional[int] = None,
+        max_width: Optional[int] = None,
+        min_height: Optional[int] = None,
+        max_height: Optional[int] = None,
+        tag: List[str] = Query(default=[]),
+    ):
+        super().__init__(format_name, created_after, created_before)
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.min_file_size = min_file_size
+        self.max_file_size = max_file_size
+        self.codec_name = codec_name
+        self.codec_type = codec_type
+        self.min_width = min_width
+        self.max_width = max_width
+        self.min_height = min_height
+        self.max_height = max_height
+        self.tags = [_parse_tag(value) for value in tag]
+
+    def apply(self, query: Select) -> Select:
+        query = super().apply(query)
+
+        file_bounds = [
+            (MediaFile.duration, self.min_duration, self.max_duration),
+            (MediaFile.file_size, self.min_file_size, self.max_file_size),
+        ]
+        query = query.where(*_range_conditions(file_bounds))
+        for key, value in self.tags:
+            query = query.where(tag_matches(MediaFile.tags, key, value))
+
+        stream_conditions = _range_conditions(
+            [
+                (MediaStream.width, self.min_width, self.max_width),
+                (MediaStream.height, self.min_height, self.max_height),
+            ]
+        )
+        if self.codec_name is not None:
+            stream_conditions.append(MediaStream.codec_name == self.codec_name)
+        if self.codec_type is not None:
+            stream_conditions.append(MediaStream.codec_type == self.codec_type)
+        if stream_conditions:
+            query = query.where(
+                exists().where(
+                    MediaStream.media_file_id == MediaFile.id, *stream_conditions
+                )
+            )
+        return query
+
+
+def _range_conditions(bounds) -> list:
+    conditions = []
+    for column, low, high in bounds:
+        if low is not None:
+            conditions.append(column >= low)
+        if high is not None:
+            conditions.append(column <= high)
+    return conditions
+
+
+def _parse_tag(value: str):
+    key, separator, tag_value = value.partition(":")
+    if not key:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid tag filter: {value!r}. Use key:value or key",
+        )
+    return key, tag_value if separator else None
+
+
+class tag_matches(ColumnElement):
+    """``column`` has tag ``key`` (equal to ``value`` when given).
+
+    Rendered as JSONB containment / key existence on PostgreSQL so the GIN
+    index on ``media_files.tags`` applies, and with json_extract on SQLite.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    _traverse_internals = [
+        ("column", InternalTraversal.dp_clauseelement),
+        ("key", InternalTraversal.dp_clauseelement),
+        ("value", InternalTraversal.dp_clauseelement),
+    ]
+
+    def __init__(self, column, key: str, value: Optional[str] = None):
+        self.column = column
+        self.key = bindparam(None, key, type_=String)
+        self.value = None if value is None else bindparam(None, value, type_=String)
+
+
+@compiles(tag_matches)
+def _tag_matches_default(element, compiler, **kw):
+    raise CompileError(f"Tag filters are not supported on {compiler.dialect.name}")
+
+
+@compiles(tag_matches, "postgresql")
+def _tag_matches_postgresql(element, compiler, **kw):
+    column = compiler.process(element.column, **kw)
+    key = compiler.process(element.key, **kw)
+    if element.value is None:
+        return f"({column} ? {key})"
+    value = compiler.process(element.value, **kw)
+    return f"({column} @> jsonb_build_object({key}::text, {value}::text))"
+
+
+@compiles(tag_matches, "sqlite")
+def _tag_matches_sqlite(element, compiler, **kw):
+    column = compiler.process(element.column, **kw)
+    path = f"'$.\"' || {compiler.process(element.key, **kw)} || '\"'"
+    if element.value is None:
+        return f"(json_type({column}, {path}) IS NOT NULL)"
+    value = compiler.process(element.value, **kw)
+    return f"(json_extract({column}, {path}) = {value})"
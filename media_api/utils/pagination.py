@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import DateTime, Select, func, literal, select, tuple_
+
+from media_api.core.models import MediaFile, MediaStream
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset values as an opaque, URL-safe token."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a token produced by ``encode_cursor``; 400 if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, dict):
+            raise ValueError("cursor is not an object")
+        return values
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def media_file_cursor(media_file: Any) -> str:
+    return encode_cursor({"c": media_file.created_at.isoformat(), "i": media_file.id})
+
+
+def media_stream_cursor(media_stream: Any) -> str:
+    return encode_cursor(
+        {"m": media_stream.media_file_id, "x": media_stream.index, "i": media_stream.id}
+    )
+
+
+def apply_media_file_cursor(query: Select, cursor: Optional[str]) -> Select:
+    """Order media files newest first and resume after ``cursor`` if given."""
+    query = query.order_by(MediaFile.created_at.desc(), MediaFile.id.desc())
+    if not cursor:
+        return query
+
+    values = decode_cursor(cursor)
+    try:
+        cursor_id = int(values["i"])
+        cursor_created_at = datetime.fromisoformat(values["c"])
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+    # Compare against the stored timestamp of the anchor row so the keyset is
+    # exact regardless of how the backend renders timestamps; fall back to the
+    # cursor's copy if the anchor row has since been deleted.
+    anchor_created_at = func.coalesce(
+        select(MediaFile.created_at).where(MediaFile.id == cursor_id).scalar_subquery(),
+        literal(cursor_created_at, DateTime(timezone=True)),
+    )
+    return query.where(
+        tuple_(MediaFile.created_at, MediaFile.id)
+        < tuple_(anchor_created_at, cursor_id)
+    )
+
+
+def apply_media_stream_cursor(query: Select, cursor: Optional[str]) -> Select:
+    """Order streams by file and index and resume after ``cursor`` if given."""
+    query = query.order_by(MediaStream.media_file_id, MediaStream.index, MediaStream.id)
+    if not cursor:
+        return query
+
+    values = decode_cursor(cursor)
+    try:
+        keys = (int(values["m"]), int(values["x"]), int(values["i"]))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return query.where(
+        tuple_(MediaStream.media_file_id, MediaStream.index, MediaStream.id)
+        > tuple_(*keys)
+    )
+
+
+def set_next_page_headers(
+    request: Request, response: Response, next_cursor: Optional[str]
+) -> None:
+    """Advertise the next page through ``X-Next-Cursor`` and a ``Link`` header."""
+    if next_cursor is None:
+        return
+    next_url = request.url.remove_query_params("skip").include_query_params(
+        cursor=next_cursor
+    )
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -0,0 +1,103 @@
+"""Process pool for parsing and validating large ffprobe output.
+
+Decoding ffprobe's JSON, validating it as ``FFProbeOutput`` and converting it
+to column dicts is pure CPU work. For rips with hundreds of streams or
+chapters it takes tens of milliseconds, during which the event loop serves
+nothing else. Output of at least ``PARSE_OFFLOAD_MIN_BYTES`` is handed to
+``PARSE_POOL_WORKERS`` processes that send back plain column dicts. Smaller
+output is parsed inline, where the round trip would cost more than it saves.
+``PARSE_POOL_WORKERS=0`` parses everything inline.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+PARSE_OFFLOAD_MIN_BYTES = int(os.getenv("PARSE_OFFLOAD_MIN_BYTES", str(64 * 1024)))
+
+T = TypeVar("T")
+
+
+@dataclass
+class ParsePoolStats:
+    workers: int
+    min_bytes: int
+    inline: int
+    offloaded: int
+    broken: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ParsePool:
+    """Runs CPU-bound parse functions inline or in worker processes by size."""
+
+    def __init__(
+        self,
+        workers: int = PARSE_POOL_WORKERS,
+        min_bytes: int = PARSE_OFFLOAD_MIN_BYTES,
+    ):
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inline = 0
+        self._offloaded = 0
+        self._broken = 0
+
+    def stats(self) -> ParsePoolStats:
+        return ParsePoolStats(
+            workers=self.workers,
+            min_bytes=self.min_bytes,
+            inline=self._inline,
+            offloaded=self._offloaded,
+            broken=self._broken,
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Started on first use. spawn rather than fork: the parent runs an
+        # event loop and driver threads that must not be copied mid-flight.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, size: int, func: Callable[..., T], *args: Any) -> T:
+        """``func(*args)``, in a worker process when ``size`` bytes is large.
+
+        ``func`` and its arguments must be picklable, i.e. module-level.
+        """
+        if self.workers < 1 or size < self.min_bytes:
+            self._inline += 1
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM killer, ...); start a fresh pool next time
+            # and don't fail the caller for it
+            logger.exception("Parse pool broke, parsing inline")
+            self._broken += 1
+            self.shutdown()
+            self._inline += 1
+            return func(*args)
+        self._offloaded += 1
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+parse_pool = ParsePool()
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from media_api.core.models import ProbeCacheEntry
+from media_api.utils.lru import LRUCache
+from media_api.utils.probe_profiles import STANDARD
+
+PROBE_CACHE_ENABLED = os.getenv("PROBE_CACHE_ENABLED", "true").lower() == "true"
+PROBE_CACHE_SIZE = int(os.getenv("PROBE_CACHE_SIZE", "10000"))
+PROBE_CACHE_CONTENT_HASH = (
+    os.getenv("PROBE_CACHE_CONTENT_HASH", "false").lower() == "true"
+)
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class FileIdentity:
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_path(cls, filepath: str) -> "FileIdentity":
+        st = os.stat(filepath)
+        return cls(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+@dataclass
+class ProbeCacheKey:
+    filepath: str
+    identity: FileIdentity
+    # Filled in by the cache the first time it is needed, see _content_hash()
+    content_hash: Optional[str] = None
+    # Output of one probe profile does not stand in for another's
+    profile: str = STANDARD
+
+
+@dataclass
+class ProbeCacheStats:
+    memory_hits: int
+    persistent_hits: int
+    content_hash_hits: int
+    misses: int
+    memory_entries: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def partial_content_hash(
+    filepath: str, size: int, chunk_size: int = HASH_CHUNK_SIZE
+) -> str:
+    """Hash the file size plus its first and last chunk.
+
+    This is cheap to compute and survives moves and renames, which change
+    the inode or device but not the content.
+    """
+    digest = hashlib.sha256(str(size).encode())
+    with open(filepath, "rb") as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+class ProbeCache:
+    """Two-tier cache of ffprobe output keyed on file identity.
+
+    The first tier is an in-process LRU, the second the ``ffprobe_cache``
+    table. A file is considered unchanged while its device, inode, size and
+    mtime are unchanged. Entries are kept per probe profile.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = PROBE_CACHE_SIZE,
+        use_content_hash: bool = PROBE_CACHE_CONTENT_HASH,
+        enabled: bool = PROBE_CACHE_ENABLED,
+    ):
+        self.enabled = enabled
+        self.use_content_hash = use_content_hash
+        self._memory = LRUCache(maxsize)
+        self._memory_hits = 0
+        self._persistent_hits = 0
+        self._content_hash_hits = 0
+        self._misses = 0
+
+    def stats(self) -> ProbeCacheStats:
+        return ProbeCacheStats(
+            memory_hits=self._memory_hits,
+            persistent_hits=self._persistent_hits,
+            content_hash_hits=self._content_hash_hits,
+            misses=self._misses,
+            memory_entries=len(self._memory),
+        )
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    async def key_for(
+        self, filepath: str, profile: str = STANDARD
+    ) -> Optional[ProbeCacheKey]:
+        """Return the cache key for a file, or None if it cannot be read.
+
+        Only the file is stat'ed here; its content is hashed later, and only
+        if the identity lookup misses.
+        """
+        if not self.enabled:
+            return None
+        try:
+            identity = await asyncio.to_thread(FileIdentity.from_path, filepath)
+        except OSError:
+            return None
+        return ProbeCacheKey(filepath=filepath, identity=identity, profile=profile)
+
+    async def _content_hash(self, key: ProbeCacheKey) -> Optional[str]:
+        """Hash the file's content once per key, if content hashing is on."""
+        if self.use_content_hash and key.content_hash is None:
+            try:
+                key.content_hash = await asyncio.to_thread(
+                    partial_content_hash, key.filepath, key.identity.size
+                )
+            except OSError:
+                pass
+        return key.content_hash
+
+    async def get(
+        self, db: AsyncSession, key: Optional[ProbeCacheKey]
+    ) -> Optional[Dict[str, Any]]:
+        """Return cached ffprobe output for a key, or None on a miss."""
+        if key is None:
+            return None
+
+        identity = key.identity
+        ffprobe_data = self._memory.get((identity, key.profile))
+        if ffprobe_data is not None:
+            self._memory_hits += 1
+            return ffprobe_data
+
+        ffprobe_data = await db.scalar(
+            select(ProbeCacheEntry.ffprobe_data).where(
+                ProbeCacheEntry.device == identity.device,
+                ProbeCacheEntry.inode == identity.inode,
+                ProbeCacheEntry.size == identity.size,
+                ProbeCacheEntry.mtime_ns == identity.mtime_ns,
+                ProbeCacheEntry.profile == key.profile,
+            )
+        )
+        if ffprobe_data is not None:
+            self._persistent_hits += 1
+            self._memory.put((identity, key.profile), ffprobe_data)
+            return ffprobe_data
+
+        content_hash = await self._content_hash(key)
+        if content_hash:
+            entry = await db.scalar(
+                select(ProbeCacheEntry)
+                .where(
+                    ProbeCacheEntry.content_hash == content_hash,
+                    ProbeCacheEntry.size == identity.size,
+                    ProbeCacheEntry.profile == key.profile,
+                )
+                .limit(1)
+            )
+            if entry is not None:
+                # Same content under a new identity: remember the new one too.
+                self._content_hash_hits += 1
+                await self.put(db, key, entry.ffprobe_data)
+                return entry.ffprobe_data
+
+        self._misses += 1
+        return None
+
+    async def put(
+        self,
+        db: AsyncSession,
+        key: Optional[ProbeCacheKey],
+        ffprobe_data: Dict[str, Any],
+    ) -> None:
+        """Store ffprobe output in both tiers; the caller commits the session."""
+        if key is None:
+            return
+
+        identity = key.identity
+        self._memory.put((identity, key.profile), ffprobe_data)
+        content_hash = await self._content_hash(key)
+        try:
+            async with db.begin_nested():
+                db.add(
+                    ProbeCacheEntry(
+                        filepath=key.filepath,
+                        device=identity.device,
+                        inode=identity.inode,
+                        size=identity.size,
+                        mtime_ns=identity.mtime_ns,
+                        content_hash=content_hash,
+                        profile=key.profile,
+                        ffprobe_data=ffprobe_data,
+                    )
+                )
+        except IntegrityError:
+            # Another writer cached the same identity first.
+            pass
+
+
+probe_cache = ProbeCache()
@@ -0,0 +1,119 @@
+"""Table-driven conversion of validated ffprobe output into column dicts.
+
+The field tables are computed once at import from the ``FFProbe*`` schemas
+and the ORM models, so converting a probe is a dict comprehension per
+format, stream and chapter with casts only where the column type differs
+from what ffprobe reports (numbers serialized as strings).
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from media_api.core.models import MediaChapter, MediaFile, MediaStream
+from media_api.core.schemas import (
+    FFProbeChapter,
+    FFProbeFormat,
+    FFProbeOutput,
+    FFProbeStream,
+)
+
+FieldTable = List[Tuple[str, str, Optional[Callable[[Any], Any]]]]
+
+
+def _to_float(value):
+    return float(value) if value else None
+
+
+def _to_int(value):
+    return int(value) if value else None
+
+
+def _dump(value):
+    return value.model_dump() if value else None
+
+
+def _field_table(
+    schema: type,
+    model: type,
+    casts: Dict[str, Callable[[Any], Any]],
+    renames: Optional[Dict[str, Optional[str]]] = None,
+) -> FieldTable:
+    """``(schema field, column, cast)`` for every schema field with a column.
+
+    ``renames`` maps a schema field to a differently named column, or to
+    None to skip it.
+    """
+    renames = renames or {}
+    columns = model.__table__.columns
+    table = []
+    for name in schema.model_fields:
+        column = renames.get(name, name)
+        if column is None:
+            continue
+        if column not in columns:
+            raise ValueError(f"{schema.__name__}.{name} has no column on {model}")
+        table.append((name, column, casts.get(name)))
+    return table
+
+
+FORMAT_FIELDS = _field_table(
+    FFProbeFormat,
+    MediaFile,
+    casts={
+        "size": _to_int,
+        "duration": _to_float,
+        "bit_rate": _to_int,
+        "start_time": _to_float,
+    },
+    # The stored filename comes from the path, not from ffprobe's argument
+    renames={"size": "file_size", "filename": None},
+)
+STREAM_FIELDS = _field_table(
+    FFProbeStream,
+    MediaStream,
+    casts={
+        "start_time": _to_float,
+        "duration": _to_float,
+        "bit_rate": _to_int,
+        "max_bit_rate": _to_int,
+        "nb_frames": _to_int,
+        "nb_read_frames": _to_int,
+        "nb_read_packets": _to_int,
+        "disposition": _dump,
+    },
+)
+CHAPTER_FIELDS = _field_table(
+    FFProbeChapter,
+    MediaChapter,
+    casts={"start_time": _to_float, "end_time": _to_float},
+    renames={"id": "chapter_id"},
+)
+EMPTY_FORMAT = {column: None for _, column, _ in FORMAT_FIELDS}
+
+
+def convert_fields(obj: BaseModel, table: FieldTable) -> Dict[str, Any]:
+    # Validated pydantic models keep their field values in __dict__
+    values = obj.__dict__
+    return {
+        column: values[name] if cast is None else cast(values[name])
+        for name, column, cast in table
+    }
+
+
+def convert_probe(
+    filepath: str, probe: FFProbeOutput
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Column dicts for a media file, its streams and its chapters."""
+    media_file = {"filename": Path(filepath).name, "filepath": filepath}
+    if probe.format:
+        media_file.update(convert_fields(probe.format, FORMAT_FIELDS))
+    else:
+        media_file.update(EMPTY_FORMAT)
+
+    streams = [convert_fields(stream, STREAM_FIELDS) for stream in probe.streams or []]
+    chapters = [
+        convert_fields(chapter, CHAPTER_FIELDS) for chapter in probe.chapters or []
+    ]
+    return media_file, streams, chapters
@@ -0,0 +1,334 @@
+"""Failed ffprobe runs grouped by file, with a negative cache and retries.
+
+``ffprobe_failures`` keeps one row per filepath and probe profile: the last
+error, its class, how many runs failed in a row and the identity (device,
+inode, size, mtime) of the file at the time. A file that times out under
+``deep`` may well probe fine with ``fast``, so profiles do not share rows. ``FFProbeParser.process_media_file`` checks it
+before spawning ffprobe and raises ``FFProbeKnownFailureError`` for an
+unchanged file until its ``next_retry_at``, so a broken file costs one
+indexed lookup rather than a process and up to a full timeout. A file whose
+identity changed is probed straight away.
+
+Each failure pushes ``next_retry_at`` out exponentially, from
+``FFPROBE_RETRY_BASE_SECONDS`` up to ``FFPROBE_RETRY_MAX_SECONDS``.
+``ProbeRetryScheduler`` queues a probe job with the failed profile for every
+failure that falls due, in the transaction that claims it, until ``FFPROBE_RETRY_MAX_ATTEMPTS`` runs have failed; after that the file
+is rejected until it changes. Only failures that say something about the
+file are recorded: timeouts, ffprobe errors and unparseable output.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
+
+from media_api.core.database import AsyncSessionLocal
+from media_api.core.models import FFProbeFailure
+from media_api.utils.ffprobe_parser import (
+    FFProbeFailedError,
+    FFProbeKnownFailureError,
+    FFProbeOutputError,
+    FFProbeTimeoutError,
+)
+from media_api.utils.probe_cache import FileIdentity
+from media_api.utils.probe_jobs import (
+    ProbeJobWorker,
+    add_probe_job,
+    probe_job_worker,
+)
+from media_api.utils.probe_profiles import STANDARD
+
+logger = logging.getLogger(__name__)
+
+FFPROBE_RETRY_ENABLED = os.getenv("FFPROBE_RETRY_ENABLED", "true").lower() == "true"
+FFPROBE_RETRY_BASE_SECONDS = float(os.getenv("FFPROBE_RETRY_BASE_SECONDS", "300"))
+FFPROBE_RETRY_MAX_SECONDS = float(os.getenv("FFPROBE_RETRY_MAX_SECONDS", "86400"))
+FFPROBE_RETRY_MAX_ATTEMPTS = int(os.getenv("FFPROBE_RETRY_MAX_ATTEMPTS", "5"))
+FFPROBE_RETRY_INTERVAL = float(os.getenv("FFPROBE_RETRY_INTERVAL", "30"))
+FFPROBE_RETRY_BATCH_SIZE = int(os.getenv("FFPROBE_RETRY_BATCH_SIZE", "100"))
+
+TIMEOUT = "timeout"
+FFPROBE_ERROR = "ffprobe_error"
+INVALID_OUTPUT = "invalid_output"
+ERROR_CLASSES = (TIMEOUT, FFPROBE_ERROR, INVALID_OUTPUT)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands timestamps back without their UTC offset
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def classify_error(error: Exception) -> Optional[str]:
+    """The error class of a failed probe, None if it is not the file's fault.
+
+    ffprobe failing to start (``returncode`` None) or the database rejecting
+    the rows says nothing about the file and is not negatively cached.
+    """
+    if isinstance(error, FFProbeTimeoutError):
+        return TIMEOUT
+    if isinstance(error, FFProbeFailedError):
+        return FFPROBE_ERROR if error.returncode is not None else None
+    # Validation errors from pydantic are ValueErrors as well
+    if isinstance(error, (FFProbeOutputError, ValueError)):
+        return INVALID_OUTPUT
+    return None
+
+
+def retry_delay(
+    attempts: int,
+    base: float = FFPROBE_RETRY_BASE_SECONDS,
+    cap: float = FFPROBE_RETRY_MAX_SECONDS,
+) -> timedelta:
+    """Wait before retrying a file whose last ``attempts`` runs failed."""
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+async def file_identity(filepath: str) -> Optional[FileIdentity]:
+    """Identity of ``filepath``, None if it cannot be read."""
+    try:
+        return await asyncio.to_thread(FileIdentity.from_path, filepath)
+    except OSError:
+        return None
+
+
+def _identity_columns(identity: Optional[FileIdentity]) -> Dict[str, Any]:
+    if identity is None:
+        return {field.name: None for field in fields(FileIdentity)}
+    return asdict(identity)
+
+
+def _same_identity(failure: FFProbeFailure, identity: Optional[FileIdentity]) -> bool:
+    columns = _identity_columns(identity)
+    return all(getattr(failure, name) == value for name, value in columns.items())
+
+
+def is_rejected(
+    failure: FFProbeFailure, identity: Optional[FileIdentity], now: datetime
+) -> bool:
+    """Whether ``failure`` rules out probing the file as it is now."""
+    if not _same_identity(failure, identity):
+        return False
+    if failure.attempts >= FFPROBE_RETRY_MAX_ATTEMPTS:
+        return True
+    # No next_retry_at below the limit means a retry is queued
+    return failure.next_retry_at is not None and now < _aware(failure.next_retry_at)
+
+
+def _failure_of(filepath: str, profile: str):
+    return select(FFProbeFailure).where(
+        FFProbeFailure.filepath == filepath, FFProbeFailure.profile == profile
+    )
+
+
+async def check_known_failure(
+    db: AsyncSession,
+    filepath: str,
+    identity: Optional[FileIdentity],
+    profile: str = STANDARD,
+) -> Optional[FFProbeFailure]:
+    """Raise ``FFProbeKnownFailureError`` if ``filepath`` should not be probed.
+
+    Returns the file's failure row for ``profile``, if any, so a successful
+    probe can delete it.
+    """
+    failure = await db.scalar(_failure_of(filepath, profile))
+    if failure is not None and is_rejected(failure, identity, _now()):
+        retry = failure.next_retry_at.isoformat() if failure.next_retry_at else "never"
+        raise FFProbeKnownFailureError(
+            f"Skipped unchanged file that failed {failure.attempts} time(s) "
+            f"({failure.error_class}: {failure.error_message}); next retry: {retry}",
+            failure.error_code,
+        )
+    return failure
+
+
+async def record_failure(
+    db: AsyncSession,
+    filepath: str,
+    identity: Optional[FileIdentity],
+    error: Exception,
+    profile: str = STANDARD,
+) -> Optional[FFProbeFailure]:
+    """Count a failed ``profile`` probe of ``filepath`` and schedule a retry.
+
+    The caller commits. Returns None for errors that are not recorded, see
+    ``classify_error``.
+    """
+    error_class = classify_error(error)
+    if error_class is None:
+        return None
+
+    now = _now()
+    failure = await db.scalar(_failure_of(filepath, profile))
+    if failure is None or not _same_identity(failure, identity):
+        # A new file as far as retries go
+        attempts = 1
+        first_failed_at = now
+    else:
+        attempts = failure.attempts + 1
+        first_failed_at = _aware(failure.first_failed_at)
+    values = dict(
+        error_class=error_class,
+        error_message=str(error),
+        error_code=getattr(error, "returncode", None),
+        attempts=attempts,
+        first_failed_at=first_failed_at,
+        last_failed_at=now,
+        next_retry_at=(
+            now + retry_delay(attempts)
+            if attempts < FFPROBE_RETRY_MAX_ATTEMPTS
+            else None
+        ),
+        **_identity_columns(identity),
+    )
+
+    if failure is not None:
+        for name, value in values.items():
+            setattr(failure, name, value)
+        return failure
+
+    failure = FFProbeFailure(filepath=filepath, profile=profile, **values)
+    try:
+        async with db.begin_nested():
+            db.add(failure)
+    except IntegrityError:
+        # A concurrent probe of the same file failed first
+        return None
+    return failure
+
+
+async def list_failures(
+    db: AsyncSession,
+    error_class: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[FFProbeFailure]:
+    """Failures newest first, optionally of one error class."""
+    query = select(FFProbeFailure).order_by(FFProbeFailure.id.desc())
+    if error_class is not None:
+        query = query.where(FFProbeFailure.error_class == error_class)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return list(result.scalars())
+
+
+async def count_failures_by_class(db: AsyncSession) -> List[Dict[str, Any]]:
+    """Failures per error class and how many of them will be retried."""
+    result = await db.execute(
+        select(
+            FFProbeFailure.error_class,
+            func.count(FFProbeFailure.id),
+            func.count(FFProbeFailure.next_retry_at),
+        )
+        .group_by(FFProbeFailure.error_class)
+        .order_by(FFProbeFailure.error_class)
+    )
+    return [
+        {"error_class": error_class, "count": count, "scheduled": scheduled}
+        for error_class, count, scheduled in result
+    ]
+
+
+async def claim_due_failures(
+    db: AsyncSession, limit: int = FFPROBE_RETRY_BATCH_SIZE
+) -> List[Tuple[str, str]]:
+    """Mark up to ``limit`` failures whose retry is due as queued.
+
+    Returns their (filepath, profile) pairs. Clearing ``next_retry_at`` lets
+    the retry through the negative cache and keeps other schedulers from
+    taking the same rows. The caller queues the retries and commits, in one
+    transaction: committed on its own, a claim whose jobs were never queued
+    would not be retried again.
+    """
+    # Aliased so the subquery does not correlate with the UPDATE
+    candidate = aliased(FFProbeFailure)
+    due = (
+        select(candidate.id)
+        .where(candidate.next_retry_at <= _now())
+        .order_by(candidate.next_retry_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(FFProbeFailure)
+        .where(FFProbeFailure.id.in_(due.scalar_subquery()))
+        .values(next_retry_at=None)
+        .returning(FFProbeFailure.filepath, FFProbeFailure.profile)
+        .execution_options(synchronize_session=False)
+    )
+    return [(filepath, profile) for filepath, profile in result]
+
+
+@dataclass
+class ProbeRetrySchedulerStats:
+    running: bool
+    queued: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProbeRetryScheduler:
+    """Queues probe jobs for failed files whose next retry is due."""
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        worker: ProbeJobWorker = probe_job_worker,
+        interval: float = FFPROBE_RETRY_INTERVAL,
+        batch_size: int = FFPROBE_RETRY_BATCH_SIZE,
+    ):
+        self.sessionmaker = sessionmaker
+        self.worker = worker
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+        self._queued = 0
+
+    def stats(self) -> ProbeRetrySchedulerStats:
+        return ProbeRetrySchedulerStats(
+            running=self._task is not None, queued=self._queued
+        )
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._loop(), name="probe-retry-scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Probe retry scheduler failed")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """Queue the due retries; returns how many were queued."""
+        async with self.sessionmaker() as db:
+            due = await claim_due_failures(db, self.batch_size)
+            for filepath, profile in due:
+                await add_probe_job(db, filepath, profile=profile)
+            await db.commit()
+        if due:
+            logger.info("Queued %d ffprobe retries", len(due))
+            self._queued += len(due)
+            self.worker.notify()
+        return len(due)
+
+
+probe_retry_scheduler = ProbeRetryScheduler()
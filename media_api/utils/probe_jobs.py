@@ -0,0 +1,362 @@
+"""Persistent queue of ffprobe runs, worked by in-process workers.
+
+``POST /probe-jobs`` only inserts a ``probe_jobs`` row. ``ProbeJobWorker``
+tasks started with the app claim queued jobs, run them through
+``FFProbeParser.process_media_file`` and record the outcome, so no request
+waits on ffprobe and probe throughput (``PROBE_JOB_CONCURRENCY`` per
+process) is sized independently of request handling.
+
+A claim takes a lease of ``PROBE_JOB_LEASE_SECONDS`` that the worker renews
+while the job runs. When a process dies its leases run out and any worker,
+in another process or after a restart, claims those jobs again, up to
+``max_attempts`` attempts in total. On PostgreSQL claims use ``FOR UPDATE
+SKIP LOCKED``, so workers in several processes never take the same job.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Select, and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
+
+from media_api.core.database import AsyncSessionLocal
+from media_api.core.models import ProbeJob
+from media_api.utils.ffprobe_parser import (
+    FFProbeFailedError,
+    FFProbeKnownFailureError,
+    FFProbeParser,
+)
+from media_api.utils.probe_profiles import get_profile
+
+logger = logging.getLogger(__name__)
+
+PROBE_JOBS_ENABLED = os.getenv("PROBE_JOBS_ENABLED", "true").lower() == "true"
+PROBE_JOB_CONCURRENCY = int(os.getenv("PROBE_JOB_CONCURRENCY", "4"))
+PROBE_JOB_LEASE_SECONDS = float(os.getenv("PROBE_JOB_LEASE_SECONDS", "120"))
+PROBE_JOB_POLL_INTERVAL = float(os.getenv("PROBE_JOB_POLL_INTERVAL", "1"))
+PROBE_JOB_MAX_ATTEMPTS = int(os.getenv("PROBE_JOB_MAX_ATTEMPTS", "3"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _is_final(error: Exception) -> bool:
+    """Whether running the job again could not help."""
+    if isinstance(error, FFProbeKnownFailureError):
+        return True
+    # ffprobe ran and rejected the file. Without a returncode it never
+    # started (missing binary, out of processes or file descriptors), which
+    # may well pass.
+    return isinstance(error, FFProbeFailedError) and error.returncode is not None
+
+
+async def add_probe_job(
+    db: AsyncSession,
+    filepath: str,
+    max_attempts: int = PROBE_JOB_MAX_ATTEMPTS,
+    profile: Optional[str] = None,
+) -> ProbeJob:
+    """Add a queued probe of ``filepath`` to the session, or return its queued
+    or running job.
+
+    ``profile`` names the probe profile, the default one if not given; a job
+    is only reused for the same profile. The caller commits.
+    """
+    profile = get_profile(profile).name
+    result = await db.execute(
+        select(ProbeJob)
+        .where(
+            ProbeJob.filepath == filepath,
+            ProbeJob.profile == profile,
+            ProbeJob.status.in_([QUEUED, RUNNING]),
+        )
+        .order_by(ProbeJob.id)
+        .limit(1)
+    )
+    job = result.scalar_one_or_none()
+    if job is not None:
+        return job
+
+    job = ProbeJob(
+        filepath=filepath, profile=profile, status=QUEUED, max_attempts=max_attempts
+    )
+    db.add(job)
+    return job
+
+
+async def enqueue_probe_job(
+    db: AsyncSession,
+    filepath: str,
+    max_attempts: int = PROBE_JOB_MAX_ATTEMPTS,
+    profile: Optional[str] = None,
+) -> ProbeJob:
+    """Queue a probe of ``filepath`` and commit, see ``add_probe_job``."""
+    job = await add_probe_job(db, filepath, max_attempts, profile)
+    await db.commit()
+    return job
+
+
+def next_claimable_job(now: datetime) -> Select:
+    """Id of the oldest job that is queued or whose lease expired by ``now``."""
+    # Aliased so the subquery does not correlate with the claiming UPDATE
+    candidate = aliased(ProbeJob)
+    return (
+        select(candidate.id)
+        .where(
+            or_(
+                candidate.status == QUEUED,
+                and_(candidate.status == RUNNING, candidate.lease_expires_at < now),
+            )
+        )
+        .order_by(candidate.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    filepath: str
+    profile: str
+    attempts: int
+    max_attempts: int
+
+
+async def claim_probe_job(
+    db: AsyncSession, owner: str, lease_seconds: float = PROBE_JOB_LEASE_SECONDS
+) -> Optional[ClaimedJob]:
+    """Lease the oldest queued job, or one whose lease expired, to ``owner``."""
+    now = _now()
+    result = await db.execute(
+        update(ProbeJob)
+        .where(ProbeJob.id == next_claimable_job(now).scalar_subquery())
+        .values(
+            status=RUNNING,
+            lease_owner=owner,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=ProbeJob.attempts + 1,
+            started_at=now,
+        )
+        .returning(
+            ProbeJob.id,
+            ProbeJob.filepath,
+            ProbeJob.profile,
+            ProbeJob.attempts,
+            ProbeJob.max_attempts,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    row = result.one_or_none()
+    await db.commit()
+    return ClaimedJob(*row) if row is not None else None
+
+
+async def _leased_update(
+    db: AsyncSession, job_id: int, owner: str, **values: Any
+) -> bool:
+    """Update a job only while ``owner`` still holds its lease."""
+    result = await db.execute(
+        update(ProbeJob)
+        .where(
+            ProbeJob.id == job_id,
+            ProbeJob.lease_owner == owner,
+            ProbeJob.status == RUNNING,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+@dataclass
+class ProbeJobWorkerStats:
+    concurrency: int
+    running: int
+    succeeded: int
+    failed: int
+    retried: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProbeJobWorker:
+    """``concurrency`` tasks claiming and running probe jobs."""
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        concurrency: int = PROBE_JOB_CONCURRENCY,
+        lease_seconds: float = PROBE_JOB_LEASE_SECONDS,
+        poll_interval: float = PROBE_JOB_POLL_INTERVAL,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.sessionmaker = sessionmaker
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._retried = 0
+
+    def stats(self) -> ProbeJobWorkerStats:
+        return ProbeJobWorkerStats(
+            concurrency=self.concurrency if self._tasks else 0,
+            running=self._running,
+            succeeded=self._succeeded,
+            failed=self._failed,
+            retried=self._retried,
+        )
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._loop(), name=f"probe-job-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers and hand their jobs back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        async with self.sessionmaker() as db:
+            # An interrupted attempt is not the job's fault; don't count it
+            await db.execute(
+                update(ProbeJob)
+                .where(
+                    ProbeJob.lease_owner == self.worker_id, ProbeJob.status == RUNNING
+                )
+                .values(
+                    status=QUEUED,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    attempts=ProbeJob.attempts - 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    def notify(self) -> None:
+        """Wake idle workers, e.g. right after a job was queued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                outcome = await self.run_once()
+            except Exception:
+                logger.exception("Probe job worker %s failed", self.worker_id)
+                outcome = None
+            if outcome is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def run_once(self) -> Optional[str]:
+        """Claim and run one job; returns its new status, None if idle."""
+        async with self.sessionmaker() as db:
+            job = await claim_probe_job(db, self.worker_id, self.lease_seconds)
+        if job is None:
+            return None
+        if job.attempts > 1:
+            logger.info("Probe job %d: attempt %d", job.id, job.attempts)
+        if job.attempts > job.max_attempts:
+            # Every earlier attempt lost its worker (crash, OOM, ...)
+            return await self._finish(
+                job,
+                FAILED,
+                f"Gave up after {job.max_attempts} attempts whose workers stopped",
+            )
+
+        self._running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            async with self.sessionmaker() as db:
+                media_file = await FFProbeParser.process_media_file(
+                    db, job.filepath, job.profile
+                )
+                media_file_id = media_file.id if media_file is not None else None
+        except Exception as e:
+            if not _is_final(e) and job.attempts < job.max_attempts:
+                return await self._finish(job, QUEUED, str(e))
+            return await self._finish(job, FAILED, str(e))
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+
+        if media_file_id is None:
+            return await self._finish(job, FAILED, "ffprobe returned no output")
+        return await self._finish(job, SUCCEEDED, media_file_id=media_file_id)
+
+    async def _finish(
+        self,
+        job: ClaimedJob,
+        status: str,
+        error_message: Optional[str] = None,
+        media_file_id: Optional[int] = None,
+    ) -> str:
+        values: Dict[str, Any] = {
+            "status": status,
+            "error_message": error_message,
+            "lease_owner": None,
+            "lease_expires_at": None,
+        }
+        if status != QUEUED:
+            values.update(finished_at=_now(), media_file_id=media_file_id)
+        async with self.sessionmaker() as db:
+            if not await _leased_update(db, job.id, self.worker_id, **values):
+                logger.warning(
+                    "Probe job %d: lease lost before finishing, outcome %s dropped",
+                    job.id,
+                    status,
+                )
+                return status
+
+        if status == SUCCEEDED:
+            self._succeeded += 1
+        elif status == FAILED:
+            self._failed += 1
+        else:
+            self._retried += 1
+        return status
+
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            async with self.sessionmaker() as db:
+                renewed = await _leased_update(
+                    db,
+                    job_id,
+                    self.worker_id,
+                    lease_expires_at=_now() + timedelta(seconds=self.lease_seconds),
+                )
+            if not renewed:
+                return
+
+
+probe_job_worker = ProbeJobWorker()
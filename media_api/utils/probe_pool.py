@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Dict, Any
+
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("FFPROBE_MAX_CONCURRENCY", os.cpu_count() or 4))
+DEFAULT_TIMEOUT = float(os.getenv("FFPROBE_TIMEOUT", "60"))
+
+
+class ProbeTimeoutError(Exception):
+    """Raised when a probe process does not finish within its timeout."""
+
+    def __init__(self, cmd: List[str], timeout: float):
+        super().__init__(f"Process timed out after {timeout}s: {cmd[0]}")
+        self.cmd = cmd
+        self.timeout = timeout
+
+
+@dataclass
+class ProbeResult:
+    returncode: int
+    stdout: bytes
+    stderr: bytes
+    elapsed: float
+
+
+@dataclass
+class ProbePoolStats:
+    max_concurrency: int
+    queued: int
+    in_flight: int
+    completed: int
+    failed: int
+    timed_out: int
+    cancelled: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ProbePool:
+    """Runs probe subprocesses on the event loop with a bounded concurrency."""
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._cancelled = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they first wait on; rebuild it if the
+        # pool is reused from a different loop (tests, reloads).
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    def stats(self) -> ProbePoolStats:
+        return ProbePoolStats(
+            max_concurrency=self.max_concurrency,
+            queued=self._queued,
+            in_flight=self._in_flight,
+            completed=self._completed,
+            failed=self._failed,
+            timed_out=self._timed_out,
+            cancelled=self._cancelled,
+        )
+
+    async def run(self, cmd: List[str], timeout: Optional[float] = None) -> ProbeResult:
+        """Run a command once a slot is free and return its captured output."""
+        semaphore = self._get_semaphore()
+
+        self._queued += 1
+        try:
+            await semaphore.acquire()
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+        finally:
+            self._queued -= 1
+
+        self._in_flight += 1
+        try:
+            return await self._execute(
+                cmd, self.timeout if timeout is None else timeout
+            )
+        finally:
+            self._in_flight -= 1
+            semaphore.release()
+
+    async def _execute(self, cmd: List[str], timeout: float) -> ProbeResult:
+        started = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except OSError:
+            self._failed += 1
+            raise
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            self._timed_out += 1
+            raise ProbeTimeoutError(cmd, timeout)
+        except asyncio.CancelledError:
+            await self._kill(process)
+            self._cancelled += 1
+            raise
+
+        if process.returncode == 0:
+            self._completed += 1
+        else:
+            self._failed += 1
+
+        return ProbeResult(
+            returncode=process.returncode,
+            stdout=stdout,
+            stderr=stderr,
+            elapsed=time.perf_counter() - started,
+        )
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        """Kill a process and reap it so it does not linger as a zombie."""
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        await process.wait()
+
+
+probe_pool = ProbePool()
@@ -0,0 +1,122 @@
+"""Named ffprobe profiles: what to read from a file and how long to allow.
+
+* ``fast`` reads container and stream headers only. It uses a small
+  ``-probesize``/``-analyzeduration`` and ``-show_entries`` limited to the
+  fields the media_files, media_streams and media_chapters tables store.
+* ``standard`` is ffprobe's ``-show_format -show_streams -show_chapters`` with
+  its default probe sizes.
+* ``deep`` adds ``-count_frames -count_packets``, which read the whole file,
+  to fill ``nb_read_frames`` and ``nb_read_packets``.
+
+A profile's timeout is ``FFPROBE_<PROFILE>_TIMEOUT`` seconds plus
+``FFPROBE_<PROFILE>_TIMEOUT_PER_GIB`` per GiB of file, capped at
+``FFPROBE_<PROFILE>_MAX_TIMEOUT``; ``standard`` defaults to a flat
+``FFPROBE_TIMEOUT``. ``FFPROBE_DEFAULT_PROFILE`` picks the profile used when a
+caller names none.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from media_api.utils.probe_convert import CHAPTER_FIELDS, FORMAT_FIELDS, STREAM_FIELDS
+
+FAST = "fast"
+STANDARD = "standard"
+DEEP = "deep"
+
+FFPROBE_DEFAULT_PROFILE = os.getenv("FFPROBE_DEFAULT_PROFILE", STANDARD)
+FFPROBE_TIMEOUT = os.getenv("FFPROBE_TIMEOUT", "60")
+FFPROBE_FAST_PROBESIZE = int(os.getenv("FFPROBE_FAST_PROBESIZE", "1000000"))
+# Microseconds, like ffprobe's -analyzeduration
+FFPROBE_FAST_ANALYZEDURATION = int(os.getenv("FFPROBE_FAST_ANALYZEDURATION", "1000000"))
+
+GIB = 1024**3
+# ffprobe prints these as sections of their own rather than as entries
+SUBSECTIONS = ("disposition", "tags")
+
+
+def _setting(profile: str, name: str, default: str) -> float:
+    return float(os.getenv(f"FFPROBE_{profile.upper()}_{name}", default))
+
+
+def stored_entries() -> str:
+    """``-show_entries`` value selecting exactly the fields that are stored."""
+    sections = []
+    for section, table in (
+        ("format", FORMAT_FIELDS),
+        ("stream", STREAM_FIELDS),
+        ("chapter", CHAPTER_FIELDS),
+    ):
+        names = [name for name, _, _ in table]
+        entries = [name for name in names if name not in SUBSECTIONS]
+        sections.append(f"{section}={','.join(entries)}")
+        sections.extend(f"{section}_{name}" for name in names if name in SUBSECTIONS)
+    return ":".join(sections)
+
+
+@dataclass(frozen=True)
+class ProbeProfile:
+    name: str
+    args: Tuple[str, ...]
+    timeout: float
+    timeout_per_gib: float
+    max_timeout: float
+
+    def command(self, filepath: str) -> List[str]:
+        return ["ffprobe", "-v", "quiet", "-print_format", "json", *self.args, filepath]
+
+    def timeout_for(self, size: Optional[int]) -> float:
+        """Seconds to allow for a file of ``size`` bytes (None if unknown)."""
+        if size is None:
+            return self.max_timeout
+        return min(self.timeout + self.timeout_per_gib * size / GIB, self.max_timeout)
+
+
+def _profile(name: str, args: Tuple[str, ...], timeouts: Tuple[str, str, str]):
+    timeout, per_gib, max_timeout = timeouts
+    return ProbeProfile(
+        name=name,
+        args=args,
+        timeout=_setting(name, "TIMEOUT", timeout),
+        timeout_per_gib=_setting(name, "TIMEOUT_PER_GIB", per_gib),
+        max_timeout=_setting(name, "MAX_TIMEOUT", max_timeout),
+    )
+
+
+FULL_SECTIONS = ("-show_format", "-show_streams", "-show_chapters")
+
+PROBE_PROFILES: Dict[str, ProbeProfile] = {
+    FAST: _profile(
+        FAST,
+        (
+            "-probesize",
+            str(FFPROBE_FAST_PROBESIZE),
+            "-analyzeduration",
+            str(FFPROBE_FAST_ANALYZEDURATION),
+            "-show_entries",
+            stored_entries(),
+        ),
+        ("10", "0.5", "30"),
+    ),
+    # A flat FFPROBE_TIMEOUT whatever the size, as before there were profiles
+    STANDARD: _profile(
+        STANDARD, FULL_SECTIONS, (FFPROBE_TIMEOUT, "0", FFPROBE_TIMEOUT)
+    ),
+    DEEP: _profile(
+        DEEP,
+        (*FULL_SECTIONS, "-count_frames", "-count_packets"),
+        ("120", "60", "3600"),
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> ProbeProfile:
+    """The named profile, or the default one; ValueError if unknown."""
+    name = name or FFPROBE_DEFAULT_PROFILE
+    try:
+        return PROBE_PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown probe profile {name!r}, expected one of {sorted(PROBE_PROFILES)}"
+        )
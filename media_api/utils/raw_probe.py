@@ -0,0 +1,55 @@
+import gzip
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterator, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always available
+    zstandard = None
+
+RAW_PROBE_COMPRESSION = os.getenv("RAW_PROBE_COMPRESSION", "gzip").lower()
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+CHUNK_SIZE = 64 * 1024
+
+
+def compress_probe(ffprobe_data: Dict[str, Any]) -> Tuple[str, bytes, int]:
+    """Serialize ffprobe output compactly and compress it.
+
+    Returns ``(encoding, payload, uncompressed_size)``. zstd is used when
+    requested and the ``zstandard`` package is installed, gzip otherwise.
+    """
+    raw = json.dumps(ffprobe_data, separators=(",", ":")).encode()
+    if RAW_PROBE_COMPRESSION == "zstd" and zstandard is not None:
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+        return "zstd", payload, len(raw)
+    return "gzip", gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0), len(raw)
+
+
+def iter_decompressed(
+    encoding: str, payload: bytes, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Yield the decompressed JSON document in chunks."""
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(wbits=31)
+        for start in range(0, len(payload), chunk_size):
+            chunk = decompressor.decompress(payload[start : start + chunk_size])
+            if chunk:
+                yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+    elif encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd raw probes")
+        reader = zstandard.ZstdDecompressor().stream_reader(payload)
+        while chunk := reader.read(chunk_size):
+            yield chunk
+    else:
+        raise ValueError(f"Unknown raw probe encoding: {encoding}")
+
+
+def decompress_probe(encoding: str, payload: bytes) -> Dict[str, Any]:
+    return json.loads(b"".join(iter_decompressed(encoding, payload)))
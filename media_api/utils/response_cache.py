@@ -0,0 +1,91 @@
+import hashlib
+import os
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from media_api.utils.lru import LRUCache
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+
+
+def media_file_etag(
+    media_file_id: int,
+    created_at: Optional[datetime],
+    updated_at: Optional[datetime],
+    variant: str = "",
+) -> str:
+    """Strong ETag for one representation of a media file.
+
+    Every write to a media file or its streams bumps ``updated_at``;
+    ``variant`` distinguishes sparse representations of the same row.
+    """
+    stamps = ":".join(
+        stamp.isoformat() if stamp else "" for stamp in (created_at, updated_at)
+    )
+    digest = hashlib.sha256(f"{media_file_id}:{stamps}:{variant}".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header covers ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+@dataclass
+class ResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    entries: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ResponseCache:
+    """Serialized media file detail responses, keyed by id.
+
+    Entries carry the ETag they were built for and are only served when it
+    still matches the row, so a write that skipped ``invalidate`` (another
+    process, a replica catching up) can never serve stale bytes.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._entries = LRUCache(maxsize)
+        self._stats = ResponseCacheStats()
+
+    def get(self, media_file_id: int, etag: str) -> Optional[bytes]:
+        if not RESPONSE_CACHE_ENABLED:
+            return None
+        entry = self._entries.get(media_file_id)
+        if entry is None or entry[0] != etag:
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return entry[1]
+
+    def put(self, media_file_id: int, etag: str, body: bytes) -> None:
+        if RESPONSE_CACHE_ENABLED:
+            self._entries.put(media_file_id, (etag, body))
+
+    def invalidate(self, media_file_ids: Iterable[int]) -> None:
+        for media_file_id in media_file_ids:
+            if self._entries.pop(media_file_id) is not None:
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> ResponseCacheStats:
+        self._stats.entries = len(self._entries)
+        return self._stats
+
+
+response_cache = ResponseCache()
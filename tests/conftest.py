@@ -1,9 +1,20 @@
 import pytest
 import pytest_asyncio
 import os
+
+# Routes over their @query_budget fail the test instead of logging
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
-from media_api.core.database import Base, get_db
+from media_api.core.database import (
+    Base,
+    get_db,
+    get_read_db,
+    get_read_sessionmaker,
+    get_sessionmaker,
+    enable_sqlite_foreign_keys,
+)
 
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
@@ -15,11 +26,13 @@ def anyio_backend():
 
 @pytest_asyncio.fixture
 async def test_db_engine():
-    engine = create_async_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=False,
+    engine = enable_sqlite_foreign_keys(
+        create_async_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=False,
+        )
     )
 
     async with engine.begin() as conn:
@@ -46,3 +59,25 @@ async def override_get_db(db_session):
         yield db_session
 
     return _override_get_db
+
+
+@pytest_asyncio.fixture
+async def client(override_get_db, test_db_engine):
+    from httpx import ASGITransport, AsyncClient
+    from main import app
+    from media_api.utils.response_cache import response_cache
+
+    response_cache.clear()
+
+    test_sessionmaker = async_sessionmaker(
+        test_db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_sessionmaker] = lambda: test_sessionmaker
+    app.dependency_overrides[get_read_sessionmaker] = lambda: test_sessionmaker
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as async_client:
+        yield async_client
+    app.dependency_overrides.clear()
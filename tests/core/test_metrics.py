@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from media_api.core.metrics import TimedAsyncQueuePool
+from media_api.utils.ffprobe_parser import (
+    FFProbeParser,
+    FFProbeFailedError,
+    FFProbeTimeoutError,
+)
+from media_api.utils.probe_pool import ProbeResult, ProbeTimeoutError, probe_pool
+from tests.routers.test_media_files import _payload
+
+DETAIL_ROUTE = "/media-files/{media_file_id}"
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+class TestRequestMetrics:
+    async def test_route_latency_and_queries(self, client):
+        response = await client.post("/media-files/", json=_payload("/m/a.mp4"))
+        media_file_id = response.json()["id"]
+        labels = {"method": "GET", "route": DETAIL_ROUTE}
+        requests_before = _sample(
+            "media_api_http_request_duration_seconds_count", status="200", **labels
+        )
+        queries_before = _sample("media_api_db_queries_per_request_sum", **labels)
+
+        await client.get(f"/media-files/{media_file_id}")
+
+        assert (
+            _sample(
+                "media_api_http_request_duration_seconds_count", status="200", **labels
+            )
+            == requests_before + 1
+        )
+        assert (
+            _sample("media_api_db_queries_per_request_sum", **labels) > queries_before
+        )
+        assert _sample("media_api_http_requests_in_progress", **labels) == 0
+
+    async def test_unmatched_paths_share_one_label(self, client):
+        labels = {"method": "GET", "route": "<unmatched>", "status": "404"}
+        before = _sample("media_api_http_request_duration_seconds_count", **labels)
+
+        await client.get("/no/such/path")
+        await client.get("/another/missing/path")
+
+        assert (
+            _sample("media_api_http_request_duration_seconds_count", **labels)
+            == before + 2
+        )
+
+    async def test_metrics_endpoint(self, client):
+        await client.get("/health")
+
+        response = await client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/health"' in response.text
+        assert "media_api_db_query_duration_seconds_bucket" in response.text
+
+
+@pytest.mark.asyncio
+class TestProbeMetrics:
+    async def test_ffprobe_duration_by_exit_code(self):
+        before = _sample(
+            "media_api_ffprobe_duration_seconds_count",
+            profile="standard",
+            exit_code="1",
+        )
+
+        with patch.object(
+            probe_pool, "run", return_value=ProbeResult(1, b"", b"bad", 0.1)
+        ):
+            with pytest.raises(FFProbeFailedError):
+                await FFProbeParser.run_ffprobe("/m/a.mp4")
+
+        assert (
+            _sample(
+                "media_api_ffprobe_duration_seconds_count",
+                profile="standard",
+                exit_code="1",
+            )
+            == before + 1
+        )
+
+    async def test_ffprobe_timeout(self):
+        before = _sample(
+            "media_api_ffprobe_duration_seconds_count",
+            profile="standard",
+            exit_code="timeout",
+        )
+
+        with patch.object(
+            probe_pool, "run", side_effect=ProbeTimeoutError(["ffprobe"], 60)
+        ):
+            with pytest.raises(FFProbeTimeoutError):
+                await FFProbeParser.run_ffprobe("/m/a.mp4")
+
+        assert (
+            _sample(
+                "media_api_ffprobe_duration_seconds_count",
+                profile="standard",
+                exit_code="timeout",
+            )
+            == before + 1
+        )
+
+
+@pytest.mark.asyncio
+async def test_pool_checkout_wait(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedAsyncQueuePool,
+        pool_logging_name="metrics-test",
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        await engine.dispose()
+
+    assert (
+        _sample("media_api_db_pool_checkout_wait_seconds_count", pool="metrics-test")
+        == 1
+    )
@@ -0,0 +1,173 @@
+import cProfile
+import pstats
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from media_api.core import profiling
+from media_api.core.middleware import ProfilingMiddleware
+from media_api.core.profiling import (
+    ProfileStore,
+    ProfileSummary,
+    new_profile_id,
+    profile_store,
+    profile_token,
+    verify_profile_token,
+)
+
+SECRET = "s3cret"
+
+
+class TestProfileToken:
+    def test_round_trip(self):
+        assert verify_profile_token(SECRET, profile_token(SECRET))
+
+    def test_rejected(self):
+        token = profile_token(SECRET)
+        expired = profile_token(SECRET, ttl=-1)
+
+        assert not verify_profile_token("other", token)
+        assert not verify_profile_token(SECRET, expired)
+        assert not verify_profile_token(SECRET, "garbage")
+        assert not verify_profile_token(SECRET, None)
+        assert not verify_profile_token("", token)
+
+
+def _summary(profile_id):
+    return ProfileSummary(
+        id=profile_id,
+        created_at=time.time(),
+        method="GET",
+        path="/",
+        route="/",
+        status=200,
+        trigger="token",
+        duration_ms=1.0,
+        query_count=0,
+        query_ms=0.0,
+    )
+
+
+def test_store_keeps_the_newest(tmp_path):
+    store = ProfileStore(str(tmp_path), max_profiles=2)
+    ids = [new_profile_id() for _ in range(3)]
+    for profile_id in ids:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        profiler.disable()
+        store.save(_summary(profile_id), pstats.Stats(profiler))
+
+    assert store.ids() == ids[:0:-1]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{profile_id}{suffix}"
+        for profile_id in ids[1:]
+        for suffix in (".json", ".prof")
+    )
+    with pytest.raises(KeyError):
+        store.summary(ids[0])
+    with pytest.raises(KeyError):
+        store.summary("../etc/passwd")
+
+
+def _app(db_session, store, sample_rate=0.0):
+    async def item(request):
+        await db_session.execute(text("SELECT 1"))
+        return JSONResponse({"id": request.path_params["item_id"]})
+
+    app = Starlette(routes=[Route("/items/{item_id}", item)])
+    return ProfilingMiddleware(
+        app, app.router, secret=SECRET, sample_rate=sample_rate, store=store
+    )
+
+
+def _client(app):
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+class TestProfilingMiddleware:
+    async def test_token_profiles_the_request(self, db_session, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        async with _client(_app(db_session, store)) as client:
+            response = await client.get(
+                "/items/7", headers={"X-Profile-Token": profile_token(SECRET)}
+            )
+
+        summary = store.summary(response.headers["x-profile-id"])
+        assert summary.route == "/items/{item_id}"
+        assert (summary.status, summary.trigger) == (200, "token")
+        assert summary.query_count == 1
+        assert summary.slowest_queries[0]["statement"] == "SELECT 1"
+        assert store.top_functions(summary.id, limit=5)
+
+    async def test_unsigned_requests_are_not_profiled(self, db_session, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        async with _client(_app(db_session, store)) as client:
+            plain = await client.get("/items/1")
+            forged = await client.get(
+                "/items/1", headers={"X-Profile-Token": profile_token("guess")}
+            )
+
+        assert "x-profile-id" not in plain.headers
+        assert "x-profile-id" not in forged.headers
+        assert store.ids() == []
+
+    async def test_sampling(self, db_session, tmp_path):
+        store = ProfileStore(str(tmp_path))
+        async with _client(_app(db_session, store, sample_rate=1.0)) as client:
+            response = await client.get("/items/1")
+
+        assert store.summary(response.headers["x-profile-id"]).trigger == "sample"
+
+
+@pytest.mark.asyncio
+class TestProfileEndpoints:
+    @pytest.fixture(autouse=True)
+    def _configure(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(profiling, "PROFILING_SECRET", SECRET)
+        monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+
+    async def test_list_detail_and_download(self, client, db_session):
+        headers = {"X-Profile-Token": profile_token(SECRET)}
+        async with _client(_app(db_session, profile_store)) as profiled:
+            profile_id = (await profiled.get("/items/1", headers=headers)).headers[
+                "x-profile-id"
+            ]
+
+        listing = await client.get("/admin/profiles", headers=headers)
+        detail = await client.get(
+            f"/admin/profiles/{profile_id}?sort=tottime&limit=5", headers=headers
+        )
+        download = await client.get(
+            f"/admin/profiles/{profile_id}/pstats", headers=headers
+        )
+
+        assert [item["id"] for item in listing.json()] == [profile_id]
+        assert detail.json()["route"] == "/items/{item_id}"
+        assert 0 < len(detail.json()["functions"]) <= 5
+        assert download.status_code == 200
+        assert download.content
+
+    async def test_requires_a_token(self, client):
+        response = await client.get("/admin/profiles")
+
+        assert response.status_code == 403
+
+    async def test_unknown_profile(self, client):
+        headers = {"X-Profile-Token": profile_token(SECRET)}
+
+        response = await client.get("/admin/profiles/nope", headers=headers)
+
+        assert response.status_code == 404
+
+    async def test_disabled_without_secret(self, client, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILING_SECRET", "")
+
+        response = await client.get("/admin/profiles")
+
+        assert response.status_code == 404
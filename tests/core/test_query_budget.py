@@ -0,0 +1,91 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+
+from media_api.core import query_budget as query_budget_module
+from media_api.core.metrics import count_queries
+from media_api.core.query_budget import QueryBudgetExceeded, query_budget, unbudgeted
+
+
+async def _run(db_session, statements, unbudgeted_statements=0):
+    for _ in range(statements):
+        await db_session.execute(text("SELECT 1"))
+    with unbudgeted():
+        for _ in range(unbudgeted_statements):
+            await db_session.execute(text("SELECT 1"))
+    return "done"
+
+
+@pytest.mark.asyncio
+class TestQueryBudget:
+    async def test_within_budget(self, db_session):
+        handler = query_budget(2)(_run)
+
+        assert await handler(db_session, 2) == "done"
+        assert handler.query_budget == 2
+
+    async def test_over_budget_raises(self, db_session, monkeypatch):
+        monkeypatch.setattr(query_budget_module, "QUERY_BUDGET_MODE", "raise")
+        handler = query_budget(2)(_run)
+
+        with pytest.raises(QueryBudgetExceeded) as exc_info:
+            await handler(db_session, 3)
+
+        assert (exc_info.value.budget, exc_info.value.count) == (2, 3)
+
+    async def test_over_budget_after_commit_logs_even_in_raise_mode(
+        self, db_session, monkeypatch, caplog
+    ):
+        monkeypatch.setattr(query_budget_module, "QUERY_BUDGET_MODE", "raise")
+
+        async def write(db_session):
+            await _run(db_session, 3)
+            await db_session.commit()
+            return "done"
+
+        handler = query_budget(2)(write)
+        labels = {"endpoint": f"{write.__module__}.{write.__qualname__}"}
+        before = (
+            REGISTRY.get_sample_value("media_api_query_budget_exceeded_total", labels)
+            or 0
+        )
+
+        assert await handler(db_session) == "done"
+
+        assert (
+            REGISTRY.get_sample_value("media_api_query_budget_exceeded_total", labels)
+            == before + 1
+        )
+        assert "budget is 2" in caplog.text
+
+    async def test_over_budget_logs(self, db_session, monkeypatch, caplog):
+        monkeypatch.setattr(query_budget_module, "QUERY_BUDGET_MODE", "log")
+        handler = query_budget(1)(_run)
+        labels = {"endpoint": f"{_run.__module__}._run"}
+        before = (
+            REGISTRY.get_sample_value("media_api_query_budget_exceeded_total", labels)
+            or 0
+        )
+
+        assert await handler(db_session, 2) == "done"
+
+        assert (
+            REGISTRY.get_sample_value("media_api_query_budget_exceeded_total", labels)
+            == before + 1
+        )
+        assert "budget is 1" in caplog.text
+
+    async def test_unbudgeted_statements_are_left_out(self, db_session):
+        handler = query_budget(1)(_run)
+
+        with count_queries() as stats:
+            await handler(db_session, 1, unbudgeted_statements=5)
+
+        assert stats.count == 6
+        assert stats.budgeted_count == 1
+
+    async def test_off(self, db_session, monkeypatch):
+        monkeypatch.setattr(query_budget_module, "QUERY_BUDGET_MODE", "off")
+        handler = query_budget(0)(_run)
+
+        assert await handler(db_session, 3) == "done"
@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from media_api.core import database
+from media_api.core.database import (
+    engine_options,
+    get_read_sessionmaker,
+    read_from_primary,
+)
+from media_api.core.metrics import TimedAsyncQueuePool
+from media_api.core.middleware import STICKY_COOKIE, ReadYourWritesMiddleware
+
+
+class TestEngineOptions:
+    def test_pool_settings_from_env(self, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "20")
+        monkeypatch.setenv("DB_REPLICA_POOL_SIZE", "40")
+        monkeypatch.setenv("DB_STATEMENT_CACHE_SIZE", "0")
+
+        primary = engine_options("postgresql+asyncpg://db/media_api", "PRIMARY")
+        replica = engine_options("postgresql+asyncpg://replica/media_api", "REPLICA")
+
+        assert primary["pool_size"] == 20
+        assert replica["pool_size"] == 40
+        assert primary["pool_pre_ping"] is True
+        assert primary["echo"] is False
+        assert primary["connect_args"] == {"prepared_statement_cache_size": 0}
+        assert primary["poolclass"] is TimedAsyncQueuePool
+        assert replica["pool_logging_name"] == "replica"
+
+    def test_sqlite_gets_no_pool_sizing(self):
+        options = engine_options("sqlite+aiosqlite:///media.db", "PRIMARY")
+
+        assert "pool_size" not in options
+        assert "connect_args" not in options
+
+
+class TestReadSessionmaker:
+    def test_primary_without_replicas(self, monkeypatch):
+        monkeypatch.setattr(database, "ReplicaSessionLocals", [])
+
+        assert get_read_sessionmaker() is database.AsyncSessionLocal
+
+    def test_round_robin_and_sticky(self, monkeypatch):
+        replicas = [object(), object()]
+        monkeypatch.setattr(database, "ReplicaSessionLocals", replicas)
+        monkeypatch.setattr(database, "_replica_cycle", iter(replicas * 2))
+
+        assert [get_read_sessionmaker() for _ in range(2)] == replicas
+
+        token = read_from_primary.set(True)
+        try:
+            assert get_read_sessionmaker() is database.AsyncSessionLocal
+        finally:
+            read_from_primary.reset(token)
+
+
+def _app():
+    async def endpoint(request):
+        return JSONResponse({"primary": read_from_primary.get()})
+
+    async def failing(request):
+        return JSONResponse({}, status_code=400)
+
+    app = Starlette(
+        routes=[
+            Route("/", endpoint, methods=["GET", "POST"]),
+            Route("/fail", failing, methods=["POST"]),
+        ]
+    )
+    return ReadYourWritesMiddleware(app, window=5)
+
+
+@pytest.mark.asyncio
+class TestReadYourWritesMiddleware:
+    async def test_write_pins_following_reads(self):
+        async with AsyncClient(
+            transport=ASGITransport(app=_app()), base_url="http://test"
+        ) as client:
+            assert (await client.get("/")).json() == {"primary": False}
+
+            response = await client.post("/")
+            assert STICKY_COOKIE in response.cookies
+
+            assert (await client.get("/")).json() == {"primary": True}
+
+    async def test_failed_write_does_not_pin(self):
+        async with AsyncClient(
+            transport=ASGITransport(app=_app()), base_url="http://test"
+        ) as client:
+            response = await client.post("/fail")
+
+            assert STICKY_COOKIE not in response.cookies
+
+    async def test_expired_cookie_reads_replica(self):
+        async with AsyncClient(
+            transport=ASGITransport(app=_app()),
+            base_url="http://test",
+            cookies={STICKY_COOKIE: str(time.time() - 1)},
+        ) as client:
+            assert (await client.get("/")).json() == {"primary": False}
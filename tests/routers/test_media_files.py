@@ -0,0 +1,689 @@
+import csv
+import io
+import json
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func
+from media_api.core.models import (
+    MediaFile,
+    MediaStream,
+    MediaChapter,
+    MediaFileRawProbe,
+)
+
+
+def _payload(filepath, streams=1, chapters=1):
+    return {
+        "filepath": filepath,
+        "ffprobe_data": {
+            "format": {
+                "filename": filepath,
+                "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+                "duration": "120.5",
+                "size": "1048576",
+            },
+            "streams": [
+                {"index": i, "codec_type": "video" if i == 0 else "audio"}
+                for i in range(streams)
+            ],
+            "chapters": [
+                {"id": i, "start_time": str(i * 10.0), "end_time": str(i * 10.0 + 10)}
+                for i in range(chapters)
+            ],
+        },
+    }
+
+
+@pytest.mark.asyncio
+class TestCreateMediaFilesBatch:
+    async def test_batch_inserts_files_and_children(self, client, db_session):
+        items = [_payload(f"/media/{i}.mp4", streams=2, chapters=3) for i in range(5)]
+
+        response = await client.post("/media-files/batch", json=items)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["created"] == 5
+        assert body["failed"] == 0
+        ids = [result["id"] for result in body["results"]]
+        assert all(result["media_file"] is None for result in body["results"])
+
+        result = await db_session.execute(
+            select(MediaFile.id, MediaFile.filepath).order_by(MediaFile.id)
+        )
+        assert [(row.id, row.filepath) for row in result] == [
+            (media_file_id, f"/media/{i}.mp4") for i, media_file_id in enumerate(ids)
+        ]
+        assert await db_session.scalar(select(func.count(MediaStream.id))) == 10
+        assert await db_session.scalar(select(func.count(MediaChapter.id))) == 15
+
+    async def test_batch_reports_invalid_items(self, client):
+        items = [
+            _payload("/media/ok.mp4"),
+            {"filepath": "/media/broken.mp4"},
+            _payload("/media/ok2.mp4"),
+        ]
+
+        response = await client.post("/media-files/batch", json=items)
+
+        body = response.json()
+        assert body["created"] == 2
+        assert body["failed"] == 1
+        assert body["results"][1]["id"] is None
+        assert "ffprobe_data" in body["results"][1]["error"]
+        assert body["results"][0]["id"] is not None
+        assert body["results"][2]["id"] is not None
+
+    async def test_batch_full_returns_bodies(self, client):
+        response = await client.post(
+            "/media-files/batch?full=true", json=[_payload("/media/a.mp4", streams=2)]
+        )
+
+        media_file = response.json()["results"][0]["media_file"]
+        assert media_file["filename"] == "a.mp4"
+        assert [stream["index"] for stream in media_file["streams"]] == [0, 1]
+        assert len(media_file["chapters"]) == 1
+
+    async def test_batch_rejects_oversized_payload(self, client, monkeypatch):
+        from media_api.routers import media_files
+
+        monkeypatch.setattr(media_files, "MAX_BATCH_SIZE", 2)
+
+        response = await client.post(
+            "/media-files/batch", json=[_payload(f"/media/{i}.mp4") for i in range(3)]
+        )
+
+        assert response.status_code == 413
+
+    async def test_batch_reports_existing_filepaths(self, client):
+        await client.post("/media-files/", json=_payload("/media/dup.mp4"))
+
+        response = await client.post(
+            "/media-files/batch",
+            json=[_payload("/media/new.mp4"), _payload("/media/dup.mp4")],
+        )
+
+        body = response.json()
+        assert body["created"] == 1
+        assert body["results"][0]["id"] is not None
+        assert body["results"][1]["id"] is None
+        assert "UNIQUE" in body["results"][1]["error"]
+
+    async def test_batch_upsert_overwrites_existing_files(self, client, db_session):
+        existing = (
+            await client.post("/media-files/", json=_payload("/media/a.mp4", streams=3))
+        ).json()
+
+        response = await client.post(
+            "/media-files/batch?upsert=true",
+            json=[
+                _payload("/media/a.mp4", streams=1),
+                _payload("/media/b.mp4"),
+                _payload("/media/b.mp4", streams=2),
+            ],
+        )
+
+        body = response.json()
+        assert body["failed"] == 0
+        ids = [result["id"] for result in body["results"]]
+        assert ids[0] == existing["id"]
+        assert ids[1] == ids[2]
+        assert await db_session.scalar(select(func.count(MediaFile.id))) == 2
+        result = await db_session.execute(
+            select(MediaStream.media_file_id, func.count(MediaStream.id)).group_by(
+                MediaStream.media_file_id
+            )
+        )
+        assert dict(result.all()) == {ids[0]: 1, ids[1]: 2}
+
+
+@pytest.mark.asyncio
+class TestUpsertMediaFile:
+    async def test_duplicate_filepath_is_a_conflict(self, client):
+        await client.post("/media-files/", json=_payload("/media/a.mp4"))
+
+        response = await client.post("/media-files/", json=_payload("/media/a.mp4"))
+
+        assert response.status_code == 409
+
+    async def test_upsert_overwrites_file_and_children(self, client, db_session):
+        created = (
+            await client.post(
+                "/media-files/", json=_payload("/media/a.mp4", streams=2, chapters=2)
+            )
+        ).json()
+        payload = _payload("/media/a.mp4", streams=3, chapters=0)
+        payload["ffprobe_data"]["format"]["duration"] = "60.0"
+
+        response = await client.post("/media-files/?upsert=true", json=payload)
+
+        assert response.status_code == 201
+        body = response.json()
+        assert body["id"] == created["id"]
+        assert body["duration"] == 60.0
+        assert body["updated_at"] is not None
+        assert [stream["index"] for stream in body["streams"]] == [0, 1, 2]
+        assert body["chapters"] == []
+        assert await db_session.scalar(select(func.count(MediaFile.id))) == 1
+        assert (
+            await db_session.scalar(select(func.count(MediaFileRawProbe.media_file_id)))
+            == 1
+        )
+
+    async def test_upsert_creates_missing_file(self, client):
+        response = await client.post(
+            "/media-files/?upsert=true", json=_payload("/media/new.mp4")
+        )
+
+        assert response.status_code == 201
+        assert response.json()["updated_at"] is None
+
+
+@pytest.mark.asyncio
+class TestListMediaFiles:
+    async def test_cursor_pagination_walks_every_file_once(self, client):
+        await client.post(
+            "/media-files/batch", json=[_payload(f"/media/{i}.mp4") for i in range(7)]
+        )
+
+        seen = []
+        response = await client.get("/media-files/", params={"limit": 3})
+        while True:
+            seen.extend(media_file["id"] for media_file in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            assert 'rel="next"' in response.headers["Link"]
+            response = await client.get(
+                "/media-files/", params={"limit": 3, "cursor": cursor}
+            )
+
+        assert sorted(seen) == sorted(set(seen))
+        assert len(seen) == 7
+        assert seen == sorted(seen, reverse=True)
+
+    async def test_skip_limit_still_supported(self, client):
+        await client.post(
+            "/media-files/batch", json=[_payload(f"/media/{i}.mp4") for i in range(5)]
+        )
+
+        first = await client.get("/media-files/", params={"limit": 2})
+        second = await client.get("/media-files/", params={"skip": 2, "limit": 2})
+
+        assert len(first.json()) == 2
+        assert len(second.json()) == 2
+        assert {m["id"] for m in first.json()}.isdisjoint(
+            m["id"] for m in second.json()
+        )
+
+    async def test_invalid_cursor_is_rejected(self, client):
+        response = await client.get("/media-files/", params={"cursor": "garbage"})
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+class TestSparseFieldsets:
+    async def _create(self, client):
+        response = await client.post(
+            "/media-files/batch", json=[_payload("/media/a.mp4", streams=2, chapters=2)]
+        )
+        return response.json()["results"][0]["id"]
+
+    async def test_fields_limit_the_response(self, client):
+        media_file_id = await self._create(client)
+
+        response = await client.get(
+            f"/media-files/{media_file_id}", params={"fields": "filename,duration"}
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "id": media_file_id,
+            "filename": "a.mp4",
+            "duration": 120.5,
+        }
+
+    async def test_include_loads_only_requested_relations(self, client):
+        media_file_id = await self._create(client)
+
+        response = await client.get(
+            f"/media-files/{media_file_id}",
+            params={"fields": "filename", "include": "streams"},
+        )
+
+        body = response.json()
+        assert [stream["index"] for stream in body["streams"]] == [0, 1]
+        assert "chapters" not in body
+
+    async def test_include_alone_returns_all_columns(self, client):
+        await self._create(client)
+
+        response = await client.get("/media-files/", params={"include": "chapters"})
+
+        [body] = response.json()
+        assert body["filepath"] == "/media/a.mp4"
+        assert len(body["chapters"]) == 2
+        assert "streams" not in body
+
+    async def test_sparse_list_keeps_cursor_pagination(self, client):
+        await client.post(
+            "/media-files/batch", json=[_payload(f"/media/{i}.mp4") for i in range(3)]
+        )
+
+        first = await client.get("/media-files/", params={"fields": "id", "limit": 2})
+        second = await client.get(
+            "/media-files/",
+            params={
+                "fields": "id",
+                "limit": 2,
+                "cursor": first.headers["X-Next-Cursor"],
+            },
+        )
+
+        assert all(set(item) == {"id"} for item in first.json())
+        assert len(first.json()) + len(second.json()) == 3
+
+    async def test_unknown_field_is_rejected(self, client):
+        media_file_id = await self._create(client)
+
+        response = await client.get(
+            f"/media-files/{media_file_id}", params={"fields": "raw_ffprobe"}
+        )
+
+        assert response.status_code == 400
+        assert "raw_ffprobe" in response.json()["detail"]
+
+    async def test_default_representation_is_unchanged(self, client):
+        media_file_id = await self._create(client)
+
+        body = (await client.get(f"/media-files/{media_file_id}")).json()
+
+        assert len(body["streams"]) == 2
+        assert len(body["chapters"]) == 2
+        assert body["filepath"] == "/media/a.mp4"
+
+
+@pytest.mark.asyncio
+class TestMediaFileStreams:
+    async def test_lists_streams(self, client):
+        response = await client.post("/media-files/", json=_payload("/m/a.mp4", 3))
+        media_file_id = response.json()["id"]
+
+        response = await client.get(f"/media-files/{media_file_id}/streams")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [stream["index"] for stream in body] == [0, 1, 2]
+        assert body[0]["codec_type"] == "video"
+
+    async def test_missing_media_file(self, client):
+        response = await client.get("/media-files/999/streams")
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestRawProbe:
+    async def test_raw_probe_is_stored_compressed(self, client, db_session):
+        response = await client.post("/media-files/batch", json=[_payload("/m/a.mp4")])
+        media_file_id = response.json()["results"][0]["id"]
+
+        raw_probe = await db_session.get(MediaFileRawProbe, media_file_id)
+
+        assert raw_probe.encoding == "gzip"
+        assert raw_probe.size > 0
+
+    async def test_raw_probe_endpoint_streams_json(self, client):
+        payload = _payload("/m/a.mp4", streams=3)
+        response = await client.post("/media-files/", json=payload)
+        media_file_id = response.json()["id"]
+
+        response = await client.get(
+            f"/media-files/{media_file_id}/raw-probe",
+            headers={"Accept-Encoding": "identity"},
+        )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert len(response.json()["streams"]) == 3
+
+    async def test_raw_probe_endpoint_passes_gzip_through(self, client):
+        response = await client.post("/media-files/", json=_payload("/m/a.mp4"))
+        media_file_id = response.json()["id"]
+
+        response = await client.get(
+            f"/media-files/{media_file_id}/raw-probe",
+            headers={"Accept-Encoding": "gzip"},
+        )
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["format"]["filename"] == "/m/a.mp4"
+
+    async def test_raw_probe_missing(self, client):
+        response = await client.get("/media-files/999/raw-probe")
+        assert response.status_code == 404
+
+    async def test_delete_removes_raw_probe(self, client, db_session):
+        response = await client.post("/media-files/", json=_payload("/m/a.mp4"))
+        media_file_id = response.json()["id"]
+
+        response = await client.delete(f"/media-files/{media_file_id}")
+
+        assert response.status_code == 204
+        assert (
+            await db_session.scalar(select(func.count(MediaFileRawProbe.media_file_id)))
+            == 0
+        )
+
+
+@pytest.mark.asyncio
+class TestBulkDeleteMediaFiles:
+    async def _seed(self, client):
+        items = [_payload(f"/media/{i}.mp4", streams=2) for i in range(4)]
+        items[0]["ffprobe_data"]["format"]["format_name"] = "matroska,webm"
+        response = await client.post("/media-files/batch", json=items)
+        return [result["id"] for result in response.json()["results"]]
+
+    async def test_by_ids(self, client, db_session):
+        ids = await self._seed(client)
+
+        response = await client.delete(
+            "/media-files/", params={"ids": [ids[1], ids[2], 999]}
+        )
+
+        assert response.json() == {"deleted": 2, "batches": 1}
+        remaining = await db_session.scalars(select(MediaFile.id))
+        assert sorted(remaining) == [ids[0], ids[3]]
+        assert await db_session.scalar(select(func.count(MediaStream.id))) == 4
+
+    async def test_by_filter(self, client):
+        ids = await self._seed(client)
+
+        response = await client.delete(
+            "/media-files/", params={"format_name": "matroska,webm"}
+        )
+        listing = await client.get("/media-files/")
+
+        assert response.json()["deleted"] == 1
+        assert ids[0] not in [item["id"] for item in listing.json()]
+
+    async def test_requires_ids_or_a_filter(self, client):
+        await self._seed(client)
+
+        response = await client.delete("/media-files/")
+
+        assert response.status_code == 400
+        assert len((await client.get("/media-files/")).json()) == 4
+
+
+@pytest.mark.asyncio
+class TestExportMediaFiles:
+    async def _seed(self, client):
+        items = [_payload(f"/media/{i}.mp4") for i in range(5)]
+        items[0]["ffprobe_data"]["format"]["format_name"] = "matroska,webm"
+        await client.post("/media-files/batch", json=items)
+
+    async def test_export_ndjson(self, client, monkeypatch):
+        from media_api.utils import export
+
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+        await self._seed(client)
+
+        response = await client.get("/media-files/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["filepath"] for row in rows] == [
+            f"/media/{i}.mp4" for i in range(5)
+        ]
+        assert rows[0]["created_at"] is not None
+
+    async def test_export_csv_with_fields(self, client):
+        await self._seed(client)
+
+        response = await client.get(
+            "/media-files/export", params={"format": "csv", "fields": "filename,tags"}
+        )
+
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["id", "filename", "tags"]
+        assert len(rows) == 6
+
+    async def test_export_applies_filters(self, client):
+        await self._seed(client)
+
+        response = await client.get(
+            "/media-files/export", params={"format_name": "matroska,webm"}
+        )
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["filepath"] for row in rows] == ["/media/0.mp4"]
+
+    async def test_export_empty_csv_has_header(self, client):
+        response = await client.get(
+            "/media-files/export", params={"format": "csv", "fields": "filename"}
+        )
+
+        assert response.text.strip() == "id,filename"
+
+
+@pytest.mark.asyncio
+class TestUpdateMediaFile:
+    async def _create(self, client, payload):
+        response = await client.post("/media-files/", json=payload)
+        return response.json()
+
+    async def test_update_keeps_unchanged_rows(self, client):
+        created = await self._create(
+            client, _payload("/m/a.mp4", streams=3, chapters=2)
+        )
+        payload = _payload("/m/a.mp4", streams=3, chapters=2)
+        payload["ffprobe_data"]["streams"][1]["tags"] = {"language": "fra"}
+
+        response = await client.put(f"/media-files/{created['id']}", json=payload)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["updated_at"] is not None
+        assert [s["id"] for s in body["streams"]] == [
+            s["id"] for s in created["streams"]
+        ]
+        assert [c["id"] for c in body["chapters"]] == [
+            c["id"] for c in created["chapters"]
+        ]
+        assert body["streams"][1]["tags"] == {"language": "fra"}
+
+    async def test_update_inserts_and_deletes_children(self, client, db_session):
+        created = await self._create(
+            client, _payload("/m/a.mp4", streams=3, chapters=2)
+        )
+        payload = _payload("/m/a.mp4", streams=2, chapters=3)
+
+        response = await client.put(f"/media-files/{created['id']}", json=payload)
+
+        body = response.json()
+        assert [s["index"] for s in body["streams"]] == [0, 1]
+        assert [s["id"] for s in body["streams"]] == [
+            s["id"] for s in created["streams"][:2]
+        ]
+        assert sorted(c["chapter_id"] for c in body["chapters"]) == [0, 1, 2]
+        assert await db_session.scalar(select(func.count(MediaStream.id))) == 2
+        assert await db_session.scalar(select(func.count(MediaChapter.id))) == 3
+
+    async def test_update_updates_file_columns(self, client):
+        created = await self._create(client, _payload("/m/a.mp4"))
+        payload = _payload("/m/b.mp4")
+        payload["ffprobe_data"]["format"]["duration"] = "99.0"
+
+        body = (await client.put(f"/media-files/{created['id']}", json=payload)).json()
+
+        assert body["id"] == created["id"]
+        assert body["filename"] == "b.mp4"
+        assert body["duration"] == 99.0
+
+    async def test_identical_update_is_a_no_op(self, client):
+        created = await self._create(client, _payload("/m/a.mp4"))
+
+        response = await client.put(
+            f"/media-files/{created['id']}", json=_payload("/m/a.mp4")
+        )
+
+        assert response.json()["updated_at"] is None
+
+    async def test_update_missing_file(self, client):
+        response = await client.put("/media-files/999", json=_payload("/m/a.mp4"))
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestConditionalGet:
+    async def _create(self, client):
+        response = await client.post("/media-files/", json=_payload("/m/a.mp4"))
+        return response.json()["id"]
+
+    async def test_matching_etag_returns_304(self, client):
+        media_file_id = await self._create(client)
+        response = await client.get(f"/media-files/{media_file_id}")
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            f"/media-files/{media_file_id}", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+    async def test_repeat_get_is_served_from_cache(self, client):
+        from media_api.utils.response_cache import response_cache
+
+        media_file_id = await self._create(client)
+        first = await client.get(f"/media-files/{media_file_id}")
+        hits = response_cache.stats().hits
+
+        second = await client.get(f"/media-files/{media_file_id}")
+
+        assert second.json() == first.json()
+        assert response_cache.stats().hits == hits + 1
+
+    async def test_update_changes_etag(self, client):
+        media_file_id = await self._create(client)
+        etag = (await client.get(f"/media-files/{media_file_id}")).headers["etag"]
+        payload = _payload("/m/a.mp4")
+        payload["ffprobe_data"]["format"]["duration"] = "1.0"
+        await client.put(f"/media-files/{media_file_id}", json=payload)
+
+        response = await client.get(
+            f"/media-files/{media_file_id}", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["duration"] == 1.0
+
+    async def test_stream_change_changes_etag(self, client):
+        media_file_id = await self._create(client)
+        etag = (await client.get(f"/media-files/{media_file_id}")).headers["etag"]
+        await client.post(
+            "/media-streams/",
+            json={"media_file_id": media_file_id, "index": 5, "codec_type": "data"},
+        )
+
+        response = await client.get(
+            f"/media-files/{media_file_id}", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert [stream["index"] for stream in response.json()["streams"]] == [0, 5]
+
+    async def test_sparse_representation_has_its_own_etag(self, client):
+        media_file_id = await self._create(client)
+        full = await client.get(f"/media-files/{media_file_id}")
+
+        sparse = await client.get(f"/media-files/{media_file_id}?fields=filename")
+
+        assert sparse.headers["etag"] != full.headers["etag"]
+        assert sparse.json() == {"id": media_file_id, "filename": "a.mp4"}
+
+    async def test_deleted_file_is_not_served_from_cache(self, client):
+        media_file_id = await self._create(client)
+        await client.get(f"/media-files/{media_file_id}")
+        await client.delete(f"/media-files/{media_file_id}")
+
+        response = await client.get(f"/media-files/{media_file_id}")
+
+        assert response.status_code == 404
+
+
+def _search_payload(filepath, duration, codec_name, height, tags=None):
+    payload = _payload(filepath)
+    payload["ffprobe_data"]["format"]["duration"] = str(duration)
+    payload["ffprobe_data"]["format"]["tags"] = tags
+    payload["ffprobe_data"]["streams"] = [
+        {
+            "index": 0,
+            "codec_type": "video",
+            "codec_name": codec_name,
+            "width": height * 16 // 9,
+            "height": height,
+        },
+        {"index": 1, "codec_type": "audio", "codec_name": "aac"},
+    ]
+    return payload
+
+
+@pytest.mark.asyncio
+class TestSearchMediaFiles:
+    @pytest_asyncio.fixture
+    async def catalog(self, client):
+        items = [
+            _search_payload("/m/uhd-long.mkv", 7200, "hevc", 2160, {"genre": "doc"}),
+            _search_payload("/m/uhd-short.mkv", 600, "hevc", 2160),
+            _search_payload("/m/hd-long.mkv", 5400, "h264", 1080, {"genre": "drama"}),
+            _search_payload("/m/uhd-avc.mkv", 7200, "h264", 2160),
+        ]
+        await client.post("/media-files/batch", json=items)
+
+    async def _search(self, client, params):
+        response = await client.get("/media-files/search", params=params)
+        assert response.status_code == 200
+        return sorted(media_file["filepath"] for media_file in response.json())
+
+    async def test_4k_hevc_over_an_hour(self, client, catalog):
+        found = await self._search(
+            client, {"codec_name": "hevc", "min_height": 2160, "min_duration": 3600}
+        )
+
+        assert found == ["/m/uhd-long.mkv"]
+
+    async def test_stream_criteria_match_the_same_stream(self, client, catalog):
+        # aac streams have no height, so no single stream is aac and 2160p
+        found = await self._search(client, {"codec_name": "aac", "min_height": 2160})
+
+        assert found == []
+
+    async def test_tag_filters(self, client, catalog):
+        assert await self._search(client, {"tag": "genre:drama"}) == ["/m/hd-long.mkv"]
+        assert await self._search(client, {"tag": "genre"}) == [
+            "/m/hd-long.mkv",
+            "/m/uhd-long.mkv",
+        ]
+        assert await self._search(client, {"tag": ["genre", "genre:doc"]}) == [
+            "/m/uhd-long.mkv"
+        ]
+
+    async def test_ranges_and_sparse_fields(self, client, catalog):
+        response = await client.get(
+            "/media-files/search",
+            params={"max_duration": 1000, "fields": "filepath"},
+        )
+
+        assert [
+            {k: v for k, v in media_file.items() if k != "id"}
+            for media_file in response.json()
+        ] == [{"filepath": "/m/uhd-short.mkv"}]
+
+    async def test_invalid_tag_is_rejected(self, client):
+        response = await client.get("/media-files/search", params={"tag": ":x"})
+
+        assert response.status_code == 400
@@ -0,0 +1,60 @@
+import pytest
+
+
+def _payload(filepath, codec_types):
+    return {
+        "filepath": filepath,
+        "ffprobe_data": {
+            "format": {"filename": filepath},
+            "streams": [
+                {"index": i, "codec_type": codec_type, "codec_name": "h264"}
+                for i, codec_type in enumerate(codec_types)
+            ],
+        },
+    }
+
+
+@pytest.mark.asyncio
+class TestListMediaStreams:
+    async def _seed(self, client):
+        await client.post(
+            "/media-files/batch",
+            json=[
+                _payload(f"/media/{i}.mp4", ["video", "audio", "audio"])
+                for i in range(3)
+            ],
+        )
+
+    async def _walk(self, client, url, params):
+        seen = []
+        response = await client.get(url, params=params)
+        while True:
+            seen.extend((s["id"], s["index"]) for s in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return seen
+            response = await client.get(url, params={**params, "cursor": cursor})
+
+    async def test_cursor_pagination_over_streams(self, client):
+        await self._seed(client)
+
+        seen = await self._walk(client, "/media-streams/", {"limit": 4})
+
+        assert len(seen) == 9
+        assert len({stream_id for stream_id, _ in seen}) == 9
+
+    async def test_cursor_pagination_with_codec_filter(self, client):
+        await self._seed(client)
+
+        seen = await self._walk(client, "/media-streams/by-type/audio", {"limit": 2})
+
+        assert len(seen) == 6
+        assert all(index in (1, 2) for _, index in seen)
+
+    async def test_skip_limit_still_supported(self, client):
+        await self._seed(client)
+
+        response = await client.get("/media-streams/", params={"skip": 8, "limit": 5})
+
+        assert len(response.json()) == 1
+        assert "X-Next-Cursor" not in response.headers
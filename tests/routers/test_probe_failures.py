@@ -0,0 +1,55 @@
+import pytest
+
+from media_api.utils.ffprobe_parser import (
+    FFProbeFailedError,
+    FFProbeOutputError,
+    FFProbeTimeoutError,
+)
+from media_api.utils.probe_failures import record_failure
+
+
+async def _seed(db_session):
+    errors = {
+        "/m/slow.mp4": FFProbeTimeoutError("timeout"),
+        "/m/bad.mp4": FFProbeFailedError("bad", 1),
+        "/m/worse.mp4": FFProbeFailedError("worse", 1),
+        "/m/junk.mp4": FFProbeOutputError("junk"),
+    }
+    for filepath, error in errors.items():
+        await record_failure(db_session, filepath, None, error)
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+class TestProbeFailures:
+    async def test_list_by_error_class(self, client, db_session):
+        await _seed(db_session)
+
+        everything = await client.get("/probe-failures")
+        ffprobe_errors = await client.get(
+            "/probe-failures", params={"error_class": "ffprobe_error"}
+        )
+
+        assert len(everything.json()) == 4
+        assert [item["filepath"] for item in ffprobe_errors.json()] == [
+            "/m/worse.mp4",
+            "/m/bad.mp4",
+        ]
+        assert ffprobe_errors.json()[0]["attempts"] == 1
+        assert ffprobe_errors.json()[0]["next_retry_at"] is not None
+
+    async def test_unknown_error_class(self, client):
+        response = await client.get("/probe-failures", params={"error_class": "x"})
+
+        assert response.status_code == 422
+
+    async def test_classes(self, client, db_session):
+        await _seed(db_session)
+
+        response = await client.get("/probe-failures/classes")
+
+        assert response.json() == [
+            {"error_class": "ffprobe_error", "count": 2, "scheduled": 2},
+            {"error_class": "invalid_output", "count": 1, "scheduled": 1},
+            {"error_class": "timeout", "count": 1, "scheduled": 1},
+        ]
@@ -0,0 +1,60 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.probe_jobs import ProbeJobWorker
+
+PROBE = json.dumps({"format": {"filename": "/m/a.mp4", "duration": "12.5"}}).encode()
+
+
+@pytest.mark.asyncio
+class TestProbeJobs:
+    async def test_accepted_then_succeeded(self, client, test_db_engine):
+        response = await client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert response.headers["location"] == f"/probe-jobs/{job['id']}"
+
+        worker = ProbeJobWorker(
+            async_sessionmaker(
+                test_db_engine, class_=AsyncSession, expire_on_commit=False
+            )
+        )
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            await worker.run_once()
+
+        job = (await client.get(response.headers["location"])).json()
+        assert (job["status"], job["attempts"]) == ("succeeded", 1)
+        media_file = await client.get(f"/media-files/{job['media_file_id']}")
+        assert media_file.json()["duration"] == 12.5
+
+    async def test_active_job_is_returned_again(self, client):
+        first = await client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+        second = await client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+
+        assert second.status_code == 202
+        assert second.json()["id"] == first.json()["id"]
+
+    async def test_profile(self, client):
+        default = await client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+        fast = await client.post(
+            "/probe-jobs", json={"filepath": "/m/a.mp4", "profile": "fast"}
+        )
+        unknown = await client.post(
+            "/probe-jobs", json={"filepath": "/m/a.mp4", "profile": "thorough"}
+        )
+
+        assert default.json()["profile"] == "standard"
+        assert fast.json()["profile"] == "fast"
+        assert fast.json()["id"] != default.json()["id"]
+        assert unknown.status_code == 422
+
+    async def test_not_found(self, client):
+        response = await client.get("/probe-jobs/999")
+
+        assert response.status_code == 404
@@ -0,0 +1,324 @@
+"""Pinned SQL statement counts per endpoint.
+
+A count going up means a query was added to a hot path or a relationship
+started loading row by row; update the number here only when that is
+intended (and the route's ``@query_budget`` with it).
+"""
+
+import pytest
+import pytest_asyncio
+
+from main import app
+from media_api.core.metrics import count_queries
+from tests.routers.test_probe_failures import _seed as _seed_probe_failures
+from tests.routers.test_media_files import _payload, _search_payload
+
+
+async def _count(request):
+    with count_queries() as stats:
+        response = await request
+    return response, stats.count
+
+
+@pytest_asyncio.fixture
+async def media_file_id(client):
+    response = await client.post(
+        "/media-files/", json=_payload("/m/a.mp4", streams=3, chapters=2)
+    )
+    return response.json()["id"]
+
+
+def test_every_route_declares_a_budget():
+    missing = [
+        f"{sorted(route.methods)[0]} {route.path}"
+        for route in app.routes
+        if route.path.startswith(
+            ("/media-files", "/media-streams", "/probe-jobs", "/probe-failures")
+        )
+        and not hasattr(route.endpoint, "query_budget")
+    ]
+
+    assert missing == []
+
+
+@pytest.mark.asyncio
+class TestMediaFileQueryCounts:
+    async def test_create(self, client):
+        response, count = await _count(
+            client.post("/media-files/", json=_payload("/m/a.mp4", streams=3))
+        )
+
+        assert response.status_code == 201
+        assert count == 8
+
+    async def test_create_duplicate(self, client, media_file_id):
+        response, count = await _count(
+            client.post("/media-files/", json=_payload("/m/a.mp4"))
+        )
+
+        assert response.status_code == 409
+        assert count == 1
+
+    async def test_batch_does_not_grow_with_the_batch(self, client):
+        _, one = await _count(
+            client.post("/media-files/batch", json=[_payload("/m/0.mp4", streams=3)])
+        )
+        response, many = await _count(
+            client.post(
+                "/media-files/batch",
+                json=[_payload(f"/m/{i}.mp4", streams=3) for i in range(1, 20)],
+            )
+        )
+
+        assert response.json()["created"] == 19
+        assert one == many == 5
+
+    async def test_batch_full(self, client):
+        response, count = await _count(
+            client.post(
+                "/media-files/batch?full=true",
+                json=[_payload(f"/m/{i}.mp4", streams=2) for i in range(3)],
+            )
+        )
+
+        assert response.json()["created"] == 3
+        assert count == 8
+
+    async def test_list_does_not_grow_with_the_page(self, client):
+        await client.post("/media-files/batch", json=[_payload("/m/0.mp4")])
+        _, one = await _count(client.get("/media-files/"))
+        await client.post(
+            "/media-files/batch",
+            json=[_payload(f"/m/{i}.mp4", streams=4) for i in range(1, 20)],
+        )
+        response, many = await _count(client.get("/media-files/"))
+
+        assert len(response.json()) == 20
+        assert one == many == 3
+
+    async def test_sparse_list(self, client, media_file_id):
+        _, count = await _count(client.get("/media-files/?fields=id,filepath"))
+
+        assert count == 1
+
+    async def test_search_does_not_grow_with_the_page(self, client):
+        await client.post(
+            "/media-files/batch",
+            json=[_search_payload("/m/0.mkv", 600, "hevc", 2160)],
+        )
+        _, one = await _count(client.get("/media-files/search?codec_name=hevc"))
+        await client.post(
+            "/media-files/batch",
+            json=[
+                _search_payload(f"/m/{i}.mkv", 600, "hevc", 2160) for i in range(1, 10)
+            ],
+        )
+        response, many = await _count(client.get("/media-files/search?codec_name=hevc"))
+
+        assert len(response.json()) == 10
+        assert one == many == 3
+
+    async def test_export(self, client, media_file_id):
+        response, count = await _count(client.get("/media-files/export"))
+
+        assert response.status_code == 200
+        assert count == 1
+
+    async def test_detail(self, client, media_file_id):
+        response, cold = await _count(client.get(f"/media-files/{media_file_id}"))
+        _, warm = await _count(client.get(f"/media-files/{media_file_id}"))
+        _, not_modified = await _count(
+            client.get(
+                f"/media-files/{media_file_id}",
+                headers={"If-None-Match": response.headers["etag"]},
+            )
+        )
+
+        assert (cold, warm, not_modified) == (4, 1, 1)
+
+    async def test_streams(self, client, media_file_id):
+        _, count = await _count(client.get(f"/media-files/{media_file_id}/streams"))
+
+        assert count == 2
+
+    async def test_raw_probe(self, client, media_file_id):
+        _, count = await _count(client.get(f"/media-files/{media_file_id}/raw-probe"))
+
+        assert count == 1
+
+    async def test_update_unchanged(self, client, media_file_id):
+        _, count = await _count(
+            client.put(
+                f"/media-files/{media_file_id}",
+                json=_payload("/m/a.mp4", streams=3, chapters=2),
+            )
+        )
+
+        assert count == 4
+
+    async def test_update_does_not_grow_with_changed_streams(self, client):
+        created = []
+        for streams in (2, 12):
+            payload = _payload(f"/m/{streams}.mp4", streams=streams, chapters=2)
+            response = await client.post("/media-files/", json=payload)
+            # Different columns change on different streams
+            for stream in payload["ffprobe_data"]["streams"]:
+                if stream["index"] % 3 != 1:
+                    stream["codec_name"] = "hevc"
+                if stream["index"] % 3 != 0:
+                    stream["bit_rate"] = "1000"
+            created.append((response.json()["id"], payload))
+
+        counts = []
+        for media_file_id, payload in created:
+            _, count = await _count(
+                client.put(f"/media-files/{media_file_id}", json=payload)
+            )
+            counts.append(count)
+
+        # Includes the catalog_stats upsert for the h264 -> hevc change
+        assert counts == [9, 9]
+
+    async def test_update_does_not_grow_with_added_children(self, client):
+        counts = []
+        for n in (3, 33):
+            response = await client.post("/media-files/", json=_payload(f"/m/{n}.mp4"))
+            payload = _payload(f"/m/{n}.mp4", streams=n, chapters=n)
+            response, count = await _count(
+                client.put(f"/media-files/{response.json()['id']}", json=payload)
+            )
+            assert len(response.json()["streams"]) == n
+            assert len(response.json()["chapters"]) == n
+            counts.append(count)
+
+        assert counts == [10, 10]
+
+    async def test_update_does_not_grow_with_removed_children(self, client):
+        counts = []
+        for n in (3, 33):
+            payload = _payload(f"/m/{n}.mp4", streams=n, chapters=n)
+            response = await client.post("/media-files/", json=payload)
+            response, count = await _count(
+                client.put(
+                    f"/media-files/{response.json()['id']}",
+                    json=_payload(f"/m/{n}.mp4"),
+                )
+            )
+            assert len(response.json()["streams"]) == 1
+            assert len(response.json()["chapters"]) == 1
+            counts.append(count)
+
+        assert counts == [10, 10]
+
+    async def test_update_worst_case(self, client):
+        counts = []
+        for n in (3, 30):
+            payload = _payload(f"/m/{n}.mp4", streams=n, chapters=n)
+            response = await client.post("/media-files/", json=payload)
+            # Change the file and every child, drop index 1 and add two more
+            ffprobe_data = payload["ffprobe_data"]
+            ffprobe_data["format"]["duration"] = "99.0"
+            streams = [s for s in ffprobe_data["streams"] if s["index"] != 1]
+            for stream in streams:
+                stream["codec_name"] = "hevc"
+            streams += [{"index": i, "codec_type": "audio"} for i in range(n, n + 2)]
+            chapters = [c for c in ffprobe_data["chapters"] if c["id"] != 1]
+            for chapter in chapters:
+                chapter["end_time"] = "999.0"
+            chapters += [
+                {"id": i, "start_time": "0.0", "end_time": "1.0"}
+                for i in range(n, n + 2)
+            ]
+            ffprobe_data.update(streams=streams, chapters=chapters)
+
+            response, count = await _count(
+                client.put(f"/media-files/{response.json()['id']}", json=payload)
+            )
+            assert len(response.json()["streams"]) == n + 1
+            counts.append(count)
+
+        assert counts[0] == counts[1]
+        assert counts[0] == 15
+
+    async def test_delete(self, client, media_file_id):
+        response, count = await _count(client.delete(f"/media-files/{media_file_id}"))
+
+        assert response.status_code == 204
+        assert count == 3
+
+    async def test_bulk_delete_batch_does_not_grow_with_the_batch(self, client):
+        counts = []
+        for n in (1, 12):
+            for i in range(n):
+                await client.post(
+                    "/media-files/", json=_payload(f"/m/{n}-{i}.mp4", streams=2)
+                )
+            response, count = await _count(
+                client.delete(
+                    "/media-files/", params={"format_name": "mov,mp4,m4a,3gp,3g2,mj2"}
+                )
+            )
+            assert response.json() == {"deleted": n, "batches": 1}
+            counts.append(count)
+
+        assert counts == [5, 5]
+
+
+@pytest.mark.asyncio
+class TestMediaStreamQueryCounts:
+    async def test_create(self, client, media_file_id):
+        _, count = await _count(
+            client.post(
+                "/media-streams/",
+                json={"media_file_id": media_file_id, "index": 9, "codec_type": "data"},
+            )
+        )
+
+        assert count == 5
+
+    async def test_list_does_not_grow_with_the_page(self, client, media_file_id):
+        _, count = await _count(client.get("/media-streams/"))
+        _, by_type = await _count(client.get("/media-streams/by-type/audio"))
+
+        assert (count, by_type) == (1, 1)
+
+    async def test_get_update_delete(self, client, media_file_id):
+        streams = (await client.get(f"/media-files/{media_file_id}/streams")).json()
+        stream_id = streams[1]["id"]
+
+        _, get = await _count(client.get(f"/media-streams/{stream_id}"))
+        _, update = await _count(
+            client.put(
+                f"/media-streams/{stream_id}",
+                json={"media_file_id": media_file_id, "index": 1, "codec_name": "opus"},
+            )
+        )
+        _, delete = await _count(client.delete(f"/media-streams/{stream_id}"))
+
+        assert (get, update, delete) == (1, 5, 4)
+
+
+@pytest.mark.asyncio
+class TestProbeJobQueryCounts:
+    async def test_create_and_get(self, client):
+        response, create = await _count(
+            client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+        )
+        _, again = await _count(
+            client.post("/probe-jobs", json={"filepath": "/m/a.mp4"})
+        )
+        _, get = await _count(client.get(response.headers["location"]))
+
+        assert (create, again, get) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+class TestProbeFailureQueryCounts:
+    async def test_list_and_classes(self, client, db_session):
+        await _seed_probe_failures(db_session)
+
+        _, listing = await _count(client.get("/probe-failures"))
+        _, by_class = await _count(client.get("/probe-failures?error_class=timeout"))
+        _, classes = await _count(client.get("/probe-failures/classes"))
+
+        assert (listing, by_class, classes) == (1, 1, 1)
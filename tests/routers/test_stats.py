@@ -0,0 +1,61 @@
+import pytest
+from tests.routers.test_media_files import _payload
+
+
+@pytest.mark.asyncio
+class TestCatalogStats:
+    async def test_empty_catalog(self, client):
+        response = await client.get("/stats")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "files": 0,
+            "total_duration": 0.0,
+            "total_bytes": 0,
+            "formats": [],
+            "codecs": [],
+            "resolutions": [],
+        }
+
+    async def test_stats_follow_writes(self, client):
+        first = (
+            await client.post("/media-files/", json=_payload("/m/a.mp4", streams=3))
+        ).json()
+        await client.post(
+            "/media-files/batch", json=[_payload(f"/m/{i}.mp4") for i in range(3)]
+        )
+        await client.delete(f"/media-files/{first['id']}")
+        await client.post(
+            "/media-streams/",
+            json={
+                "media_file_id": first["id"] + 1,
+                "index": 9,
+                "codec_type": "video",
+                "codec_name": "hevc",
+                "height": 2160,
+            },
+        )
+
+        stats = (await client.get("/stats")).json()
+
+        assert stats["files"] == 3
+        assert stats["total_duration"] == pytest.approx(361.5)
+        assert stats["total_bytes"] == 3 * 1048576
+        assert stats["formats"] == [
+            {
+                "format_name": "mov,mp4,m4a,3gp,3g2,mj2",
+                "count": 3,
+                "total_duration": pytest.approx(361.5),
+                "total_bytes": 3 * 1048576,
+            }
+        ]
+        assert {
+            (c["codec_type"], c["codec_name"], c["count"]) for c in stats["codecs"]
+        } == {
+            ("video", None, 3),
+            ("video", "hevc", 1),
+        }
+        assert {r["bucket"]: r["count"] for r in stats["resolutions"]} == {
+            "unknown": 3,
+            "2160p": 1,
+        }
@@ -0,0 +1,125 @@
+import pytest
+
+from benchmarks.generator import CatalogGenerator, CatalogProfile
+from benchmarks.load_catalog import build_batch
+from benchmarks.loadtest import DEFAULT_MIX, LoadTest, parse_mix, percentile
+from benchmarks.runner import (
+    Benchmark,
+    BenchmarkResult,
+    compare_results,
+    load_results,
+    regressions,
+    run_benchmarks,
+    save_results,
+)
+from media_api.utils.ffprobe_parser import FFProbeParser
+
+
+def _result(name, median_us):
+    return BenchmarkResult(name, median_us, median_us, median_us, 1, 1)
+
+
+def test_results_round_trip(tmp_path):
+    path = tmp_path / "results.json"
+    save_results(str(path), [_result("a", 10.0)])
+
+    assert load_results(str(path))["a"]["median_us"] == 10.0
+
+
+def test_regressions_use_threshold():
+    baseline = {"fast": {"median_us": 10.0}, "slow": {"median_us": 10.0}}
+    comparisons = compare_results(
+        baseline, [_result("fast", 11.0), _result("slow", 15.0), _result("new", 1.0)]
+    )
+
+    assert [c.change is None for c in comparisons] == [False, False, True]
+    assert [c.name for c in regressions(comparisons, 0.25)] == ["slow"]
+
+
+def test_run_benchmarks_times_sync_and_async():
+    async def async_setup():
+        async def call():
+            pass
+
+        return call
+
+    results = run_benchmarks(
+        [
+            Benchmark("sync", lambda: lambda: None),
+            Benchmark("async", async_setup, is_async=True),
+        ],
+        rounds=2,
+        min_time=0.001,
+        report=lambda result: None,
+    )
+
+    assert [result.name for result in results] == ["sync", "async"]
+    assert all(result.rounds == 2 and result.median_us > 0 for result in results)
+
+
+def test_generator_is_deterministic_and_valid():
+    generator = CatalogGenerator(seed=3)
+
+    filepath, probe = generator.probe(7)
+
+    assert generator.probe(7) == (filepath, probe)
+    assert generator.probe(8)[0] != filepath
+    parsed = FFProbeParser.parse_ffprobe_to_rows(filepath, probe)
+    assert parsed.media_file["filepath"] == filepath
+    assert parsed.streams[0]["codec_type"] == "video"
+    assert len(parsed.streams) == probe["format"]["nb_streams"]
+
+
+def test_build_batch_compresses_raw_probes():
+    generator = CatalogGenerator(seed=3)
+
+    [with_raw] = build_batch(generator, 0, 1, raw_probes=True)
+    [without_raw] = build_batch(generator, 0, 1, raw_probes=False)
+
+    assert with_raw.compressed_raw_probe is not None
+    assert with_raw.raw_probe_row() is with_raw.compressed_raw_probe
+    assert without_raw.raw_probe_row() is None
+
+
+def test_profile_overrides_distributions():
+    profile = CatalogProfile.from_dict(
+        {"audio_tracks": {"2": 1}, "subtitle_tracks": {"0": 1}, "chapters": {"3": 1}}
+    )
+
+    _, probe = CatalogGenerator(profile).probe(0)
+
+    assert profile.mean_streams == 3
+    assert [s["codec_type"] for s in probe["streams"]] == ["video", "audio", "audio"]
+    assert len(probe["chapters"]) == 3
+    with pytest.raises(ValueError):
+        CatalogProfile.from_dict({"codecs": {}})
+
+
+def test_percentile_and_mix():
+    values = [float(v) for v in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0
+    assert parse_mix("detail=1,create=0")["create"] == 0
+    with pytest.raises(ValueError):
+        parse_mix("scan=1")
+
+
+@pytest.mark.asyncio
+async def test_load_test_replays_mixed_traffic(client):
+    for index in range(3):
+        filepath, probe = CatalogGenerator().probe(index)
+        await client.post(
+            "/media-files/", json={"filepath": filepath, "ffprobe_data": probe}
+        )
+    load_test = LoadTest(client, DEFAULT_MIX, seed=1)
+
+    assert await load_test.discover(10) == 3
+    # The test client shares one session, so requests must not overlap
+    elapsed = await load_test.run(concurrency=1, duration=30, requests=40)
+    summary = load_test.summary(elapsed)
+
+    assert summary["total"]["requests"] == 40
+    assert summary["total"]["errors"] == 0
+    assert summary["GET /media-files/{id}"]["p50_ms"] > 0
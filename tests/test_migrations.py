@@ -0,0 +1,49 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.util.exc import AutogenerateDiffsDetected
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def alembic_config(tmp_path, monkeypatch):
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'migrations.db'}"
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    # No ini file, so env.py leaves the test run's logging configuration alone.
+    config = Config()
+    config.set_main_option("script_location", str(ROOT / "database"))
+    config.set_main_option("sqlalchemy.url", database_url)
+    return config
+
+
+class TestMigrations:
+    def test_upgrade_head_matches_models(self, alembic_config):
+        command.upgrade(alembic_config, "head")
+
+        try:
+            command.check(alembic_config)
+        except AutogenerateDiffsDetected as e:
+            pytest.fail(f"Models and migrations disagree: {e}")
+
+    def test_downgrade_to_base(self, alembic_config):
+        command.upgrade(alembic_config, "head")
+        command.downgrade(alembic_config, "base")
+
+    def test_unique_filepath_stops_on_duplicates(self, alembic_config, tmp_path):
+        command.upgrade(alembic_config, "c4e6a8b0d2f3")
+        with sqlite3.connect(tmp_path / "migrations.db") as conn:
+            conn.executemany(
+                "INSERT INTO media_files (filename, filepath) VALUES (?, ?)",
+                [("a.mp4", "/m/a.mp4"), ("a.mp4", "/m/a.mp4"), ("b.mp4", "/m/b.mp4")],
+            )
+
+        with pytest.raises(RuntimeError, match=r"/m/a\.mp4 \(2 rows\)"):
+            command.upgrade(alembic_config, "d5f7a9c1e3b4")
+
+        with sqlite3.connect(tmp_path / "migrations.db") as conn:
+            count = conn.execute("SELECT count(*) FROM media_files").fetchone()[0]
+        assert count == 3
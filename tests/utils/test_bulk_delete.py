@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import func, select
+
+from media_api.core.models import (
+    MediaChapter,
+    MediaFile,
+    MediaFileRawProbe,
+    MediaStream,
+)
+from media_api.utils.bulk_delete import (
+    delete_media_files,
+    delete_media_files_in_batches,
+)
+from media_api.utils.bulk_insert import insert_media_files
+from tests.utils.test_catalog_stats import _assert_matches_rebuild, _parsed
+
+
+async def _count(db_session, column):
+    return await db_session.scalar(select(func.count(column)))
+
+
+@pytest.mark.asyncio
+class TestDeleteMediaFiles:
+    async def test_cascades_to_children_and_keeps_stats(self, db_session):
+        parsed = [_parsed("/a.mp4", heights=(2160, 720)), _parsed("/b.mkv")]
+        parsed[0].chapters = [{"chapter_id": 0, "start_time": 0.0, "end_time": 1.0}]
+        parsed[0].raw_ffprobe = {"format": {"filename": "/a.mp4"}}
+        a, b = await insert_media_files(db_session, parsed)
+
+        deleted = await delete_media_files(db_session, [a, 999])
+        await db_session.commit()
+
+        assert deleted == [a]
+        assert await _count(db_session, MediaStream.id) == 2
+        assert await _count(db_session, MediaChapter.id) == 0
+        assert await _count(db_session, MediaFileRawProbe.media_file_id) == 0
+        stats = await _assert_matches_rebuild(db_session)
+        assert ("total", "", 1, 10.0, 100) in stats
+        assert ("codec", "video/h264", 1, 0.0, 0) in stats
+
+    async def test_nothing_to_delete(self, db_session):
+        assert await delete_media_files(db_session, []) == []
+        assert await delete_media_files(db_session, [1]) == []
+
+    async def test_batches_are_committed_one_by_one(self, db_session):
+        ids = await insert_media_files(
+            db_session, [_parsed(f"/{i}.mp4") for i in range(5)]
+        )
+        await insert_media_files(
+            db_session, [_parsed("/keep.mkv", format_name="matroska")]
+        )
+        await db_session.commit()
+
+        query = select(MediaFile.id).where(MediaFile.format_name == "mp4")
+        batches = []
+        async for batch in delete_media_files_in_batches(db_session, query, 2):
+            # Earlier batches are already committed
+            assert not db_session.in_transaction()
+            batches.append(batch)
+
+        assert batches == [ids[:2], ids[2:4], ids[4:]]
+        assert await db_session.scalar(select(MediaFile.filepath)) == "/keep.mkv"
+        assert ("total", "", 1, 10.0, 100) in await _assert_matches_rebuild(db_session)
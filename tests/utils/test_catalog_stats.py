@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from media_api.core.models import CatalogStat, MediaFile, MediaStream
+from media_api.utils.bulk_insert import insert_media_files, upsert_media_files
+from media_api.utils.bulk_delete import delete_media_files
+from media_api.utils.catalog_stats import (
+    StatsDelta,
+    rebuild_catalog_stats,
+    resolution_bucket,
+)
+from media_api.utils.diff_update import apply_media_file_update
+from media_api.utils.ffprobe_parser import ParsedMediaFile
+
+
+def _parsed(filepath, format_name="mp4", duration=10.0, size=100, heights=(1080,)):
+    return ParsedMediaFile(
+        media_file={
+            "filename": filepath.rsplit("/", 1)[-1],
+            "filepath": filepath,
+            "format_name": format_name,
+            "duration": duration,
+            "file_size": size,
+        },
+        streams=[
+            {"index": i, "codec_type": "video", "codec_name": "h264", "height": h}
+            for i, h in enumerate(heights)
+        ]
+        + [{"index": len(heights), "codec_type": "audio", "codec_name": "aac"}],
+    )
+
+
+async def _snapshot(db_session):
+    result = await db_session.execute(
+        select(
+            CatalogStat.dimension,
+            CatalogStat.key,
+            CatalogStat.count,
+            CatalogStat.total_duration,
+            CatalogStat.total_bytes,
+        ).where(CatalogStat.count != 0)
+    )
+    return sorted(tuple(row) for row in result)
+
+
+async def _assert_matches_rebuild(db_session):
+    incremental = await _snapshot(db_session)
+    await rebuild_catalog_stats(db_session)
+    assert incremental == await _snapshot(db_session)
+    return incremental
+
+
+class TestStatsDelta:
+    def test_resolution_buckets(self):
+        assert resolution_bucket(2160) == "2160p"
+        assert resolution_bucket(1080) == "1080p"
+        assert resolution_bucket(576) == "480p"
+        assert resolution_bucket(240) == "sd"
+        assert resolution_bucket(None) == "unknown"
+
+    def test_opposite_changes_cancel_out(self):
+        delta = StatsDelta()
+        delta.add_file("mp4", 10.0, 100)
+        delta.add_file("mp4", 10.0, 100, sign=-1)
+
+        assert not delta
+        assert delta.rows() == []
+
+
+@pytest.mark.asyncio
+class TestCatalogStatsMaintenance:
+    async def test_bulk_insert_and_upsert(self, db_session):
+        await insert_media_files(
+            db_session,
+            [_parsed("/a.mp4"), _parsed("/b.mkv", format_name="matroska")],
+        )
+        await upsert_media_files(
+            db_session, [_parsed("/a.mp4", duration=30.0, heights=(2160, 720))]
+        )
+
+        stats = await _assert_matches_rebuild(db_session)
+
+        assert ("total", "", 2, 40.0, 200) in stats
+        assert ("format", "mp4", 1, 30.0, 100) in stats
+        assert ("resolution", "1080p", 1, 0.0, 0) in stats
+        assert ("resolution", "2160p", 1, 0.0, 0) in stats
+        assert ("codec", "video/h264", 3, 0.0, 0) in stats
+
+    async def test_orm_insert_update_delete(self, db_session):
+        media_file = _parsed("/a.mp4").to_model()
+        db_session.add(media_file)
+        await db_session.commit()
+        await _assert_matches_rebuild(db_session)
+
+        media_file.format_name = "mov"
+        media_file.streams[0].height = 480
+        await db_session.commit()
+        stats = await _assert_matches_rebuild(db_session)
+        assert ("format", "mov", 1, 10.0, 100) in stats
+        assert ("resolution", "480p", 1, 0.0, 0) in stats
+
+        await db_session.delete(media_file)
+        await db_session.commit()
+        assert await _assert_matches_rebuild(db_session) == []
+
+    async def test_reprobed_stream_moves_its_counts(self, db_session):
+        # PUT /media-files/{id} path: the changed stream is rewritten in full
+        await insert_media_files(db_session, [_parsed("/a.mp4")])
+        media_file = await db_session.scalar(
+            select(MediaFile).options(
+                selectinload(MediaFile.streams),
+                selectinload(MediaFile.chapters),
+                selectinload(MediaFile.raw_probe),
+            )
+        )
+        parsed = _parsed("/a.mp4", heights=(720,))
+        parsed.streams[0]["codec_name"] = "hevc"
+
+        assert await apply_media_file_update(db_session, media_file, parsed)
+        await db_session.commit()
+
+        stats = await _assert_matches_rebuild(db_session)
+        keys = {(dimension, key): count for dimension, key, count, _, _ in stats}
+        assert keys[("codec", "video/hevc")] == 1
+        assert keys[("resolution", "720p")] == 1
+        assert ("codec", "video/h264") not in keys
+        assert ("resolution", "1080p") not in keys
+
+        await delete_media_files(db_session, [media_file.id])
+        await db_session.commit()
+        result = await db_session.execute(
+            select(CatalogStat).where(CatalogStat.count < 0)
+        )
+        assert result.first() is None
+        assert await _assert_matches_rebuild(db_session) == []
+
+    async def test_reprobe_adding_streams_counts_them(self, db_session):
+        await insert_media_files(db_session, [_parsed("/a.mp4")])
+        media_file = await db_session.scalar(
+            select(MediaFile).options(
+                selectinload(MediaFile.streams),
+                selectinload(MediaFile.chapters),
+                selectinload(MediaFile.raw_probe),
+            )
+        )
+
+        parsed = _parsed("/a.mp4", heights=(1080, 720, 2160))
+        assert await apply_media_file_update(db_session, media_file, parsed)
+        await db_session.commit()
+
+        assert [stream.index for stream in media_file.streams] == [0, 1, 2, 3]
+        stats = await _assert_matches_rebuild(db_session)
+        assert ("codec", "video/h264", 3, 0.0, 0) in stats
+        assert ("codec", "audio/aac", 1, 0.0, 0) in stats
+
+    async def test_rolled_back_flush_is_not_counted(self, db_session):
+        db_session.add(_parsed("/a.mp4").to_model())
+        await db_session.flush()
+        await db_session.rollback()
+
+        assert await _snapshot(db_session) == []
+        assert (await db_session.execute(select(MediaFile))).first() is None
+        assert (await db_session.execute(select(MediaStream))).first() is None
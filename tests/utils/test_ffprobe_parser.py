@@ -1,19 +1,26 @@
 import pytest
 import json
-import subprocess
 from unittest.mock import patch, MagicMock, AsyncMock
-from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.ffprobe_parser import FFProbeParser, FFProbeFailedError
+from media_api.utils.probe_pool import probe_pool, ProbeTimeoutError
+from media_api.utils.probe_profiles import get_profile
 from media_api.core.models import MediaFile, MediaStream, MediaChapter, FFProbeError
 
 
+def _mock_process(returncode, stdout=b"", stderr=b""):
+    process = MagicMock()
+    process.returncode = returncode
+    process.communicate = AsyncMock(return_value=(stdout, stderr))
+    process.wait = AsyncMock(return_value=returncode)
+    return process
+
+
 class TestFFProbeParser:
     @pytest.mark.asyncio
     async def test_run_ffprobe_success(self):
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = '{"format": {"filename": "test.mp4"}}'
+        mock_process = _mock_process(0, b'{"format": {"filename": "test.mp4"}}')
 
-        with patch("subprocess.run", return_value=mock_result):
+        with patch("asyncio.create_subprocess_exec", return_value=mock_process):
             result = await FFProbeParser.run_ffprobe("/path/to/test.mp4")
 
             assert result is not None
@@ -21,33 +28,36 @@ class TestFFProbeParser:
 
     @pytest.mark.asyncio
     async def test_run_ffprobe_command_error(self):
-        mock_result = MagicMock()
-        mock_result.returncode = 1
-        mock_result.stderr = "No such file or directory"
+        mock_process = _mock_process(1, b"", b"No such file or directory")
 
-        with patch("subprocess.run", return_value=mock_result):
-            with pytest.raises(Exception) as exc_info:
+        with patch("asyncio.create_subprocess_exec", return_value=mock_process):
+            with pytest.raises(FFProbeFailedError) as exc_info:
                 await FFProbeParser.run_ffprobe("/invalid/path.mp4")
 
             assert "FFprobe failed" in str(exc_info.value)
+            assert exc_info.value.returncode == 1
 
     @pytest.mark.asyncio
     async def test_run_ffprobe_timeout(self):
-        with patch(
-            "subprocess.run", side_effect=subprocess.TimeoutExpired("ffprobe", 60)
+        with patch.object(
+            probe_pool, "run", side_effect=ProbeTimeoutError(["ffprobe"], 60)
         ):
             with pytest.raises(Exception) as exc_info:
                 await FFProbeParser.run_ffprobe("/path/to/test.mp4")
 
             assert "FFprobe timeout" in str(exc_info.value)
 
+    @pytest.mark.asyncio
+    async def test_run_ffprobe_missing_binary(self):
+        with patch("asyncio.create_subprocess_exec", side_effect=FileNotFoundError()):
+            with pytest.raises(FFProbeFailedError):
+                await FFProbeParser.run_ffprobe("/path/to/test.mp4")
+
     @pytest.mark.asyncio
     async def test_run_ffprobe_json_decode_error(self):
-        mock_result = MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "invalid json"
+        mock_process = _mock_process(0, b"invalid json")
 
-        with patch("subprocess.run", return_value=mock_result):
+        with patch("asyncio.create_subprocess_exec", return_value=mock_process):
             with pytest.raises(Exception) as exc_info:
                 await FFProbeParser.run_ffprobe("/path/to/test.mp4")
 
@@ -162,7 +172,11 @@ class TestFFProbeParser:
             "format": {"filename": "/path/to/test.mp4", "duration": "120.0"}
         }
 
-        with patch.object(FFProbeParser, "run_ffprobe", return_value=ffprobe_data):
+        with patch.object(
+            FFProbeParser,
+            "run_ffprobe_output",
+            return_value=json.dumps(ffprobe_data).encode(),
+        ):
             media_file = await FFProbeParser.process_media_file(
                 db_session, "/path/to/test.mp4"
             )
@@ -175,7 +189,7 @@ class TestFFProbeParser:
     @pytest.mark.asyncio
     async def test_process_media_file_ffprobe_failure(self, db_session):
         with patch.object(
-            FFProbeParser, "run_ffprobe", side_effect=Exception("FFprobe failed")
+            FFProbeParser, "run_ffprobe_output", side_effect=Exception("FFprobe failed")
         ):
             with pytest.raises(Exception):
                 await FFProbeParser.process_media_file(db_session, "/path/to/test.mp4")
@@ -194,8 +208,19 @@ class TestFFProbeParser:
 
     @pytest.mark.asyncio
     async def test_process_media_file_no_data(self, db_session):
-        with patch.object(FFProbeParser, "run_ffprobe", return_value=None):
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=b"{}"):
             result = await FFProbeParser.process_media_file(
                 db_session, "/path/to/test.mp4"
             )
             assert result is None
+
+
+@pytest.mark.asyncio
+async def test_run_ffprobe_output_uses_profile_command_and_timeout():
+    result = MagicMock(returncode=0, stdout=b"{}", stderr=b"")
+    with patch.object(probe_pool, "run", AsyncMock(return_value=result)) as run:
+        await FFProbeParser.run_ffprobe_output("/m/a.mkv", "fast", size=0)
+
+    cmd, timeout = run.call_args.args
+    assert "-show_entries" in cmd
+    assert timeout == get_profile("fast").timeout
@@ -0,0 +1,19 @@
+import pytest
+from fastapi import HTTPException
+from media_api.utils.pagination import encode_cursor, decode_cursor
+
+
+class TestCursorEncoding:
+    def test_round_trip(self):
+        values = {"c": "2025-01-01T00:00:00+00:00", "i": 42}
+        assert decode_cursor(encode_cursor(values)) == values
+
+    def test_cursor_is_url_safe(self):
+        cursor = encode_cursor({"m": 1, "x": 2, "i": 3})
+        assert all(c.isalnum() or c in "-_" for c in cursor)
+
+    @pytest.mark.parametrize("cursor", ["not-base64!", "bnVsbA", "W10"])
+    def test_invalid_cursor_raises_400(self, cursor):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_cursor(cursor)
+        assert exc_info.value.status_code == 400
@@ -0,0 +1,64 @@
+import json
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from benchmarks.generator import CatalogGenerator
+from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.parse_pool import ParsePool
+
+
+def _output():
+    filepath, probe = CatalogGenerator(seed=3).probe(0)
+    return filepath, json.dumps(probe).encode()
+
+
+@pytest.mark.asyncio
+class TestParsePool:
+    async def test_small_output_is_parsed_inline(self):
+        pool = ParsePool(workers=1, min_bytes=10**9)
+        filepath, output = _output()
+
+        with patch.object(pool, "_get_executor") as get_executor:
+            parsed = await pool.run(
+                len(output), FFProbeParser.parse_ffprobe_output, filepath, output
+            )
+
+        get_executor.assert_not_called()
+        assert parsed.media_file["filepath"] == filepath
+        assert pool.stats().inline == 1
+
+    async def test_large_output_is_parsed_in_a_worker(self):
+        pool = ParsePool(workers=1, min_bytes=0)
+        filepath, output = _output()
+        try:
+            parsed = await pool.run(
+                len(output), FFProbeParser.parse_ffprobe_output, filepath, output
+            )
+        finally:
+            pool.shutdown()
+
+        inline = FFProbeParser.parse_ffprobe_output(filepath, output)
+        assert parsed.media_file == inline.media_file
+        assert parsed.streams == inline.streams
+        assert parsed.chapters == inline.chapters
+        assert parsed.compressed_raw_probe == inline.raw_probe_row()
+        assert (pool.stats().offloaded, pool.stats().inline) == (1, 0)
+
+    async def test_disabled(self):
+        pool = ParsePool(workers=0, min_bytes=0)
+
+        assert await pool.run(10, json.loads, b"[1]") == [1]
+        assert pool.stats().inline == 1
+
+    async def test_broken_pool_falls_back_inline(self):
+        pool = ParsePool(workers=1, min_bytes=0)
+        executor = MagicMock()
+        executor.submit.side_effect = BrokenProcessPool()
+        pool._executor = executor
+
+        assert await pool.run(10, json.loads, b"[1]") == [1]
+
+        assert pool.stats().broken == 1
+        executor.shutdown.assert_called_once()
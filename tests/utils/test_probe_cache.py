@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+from media_api.core.models import ProbeCacheEntry, MediaFile
+from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.lru import LRUCache
+from media_api.utils.probe_cache import ProbeCache, partial_content_hash
+
+FFPROBE_DATA = {"format": {"filename": "clip.mp4", "duration": "12.5"}}
+
+
+@pytest.fixture
+def media_path(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"\x00" * 200_000)
+    return str(path)
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+
+
+class TestPartialContentHash:
+    def test_hash_changes_with_content(self, tmp_path):
+        first = tmp_path / "first.bin"
+        second = tmp_path / "second.bin"
+        first.write_bytes(b"a" * 300_000)
+        second.write_bytes(b"a" * 299_999 + b"b")
+
+        assert partial_content_hash(str(first), 300_000) != partial_content_hash(
+            str(second), 300_000
+        )
+
+
+@pytest.mark.asyncio
+class TestProbeCache:
+    async def test_miss_then_memory_hit(self, db_session, media_path):
+        cache = ProbeCache(maxsize=10)
+        key = await cache.key_for(media_path)
+
+        assert await cache.get(db_session, key) is None
+        await cache.put(db_session, key, FFPROBE_DATA)
+
+        assert await cache.get(db_session, key) == FFPROBE_DATA
+        stats = cache.stats()
+        assert stats.misses == 1
+        assert stats.memory_hits == 1
+
+    async def test_persistent_hit_after_memory_cleared(self, db_session, media_path):
+        cache = ProbeCache(maxsize=10)
+        key = await cache.key_for(media_path)
+        await cache.put(db_session, key, FFPROBE_DATA)
+        await db_session.commit()
+        cache.clear()
+
+        assert await cache.get(db_session, key) == FFPROBE_DATA
+        assert cache.stats().persistent_hits == 1
+
+    async def test_modified_file_misses(self, db_session, media_path):
+        cache = ProbeCache(maxsize=10)
+        await cache.put(db_session, await cache.key_for(media_path), FFPROBE_DATA)
+
+        with open(media_path, "ab") as f:
+            f.write(b"more")
+
+        assert await cache.get(db_session, await cache.key_for(media_path)) is None
+
+    async def test_content_hash_hit_for_moved_file(
+        self, db_session, media_path, tmp_path
+    ):
+        cache = ProbeCache(maxsize=10, use_content_hash=True)
+        await cache.put(db_session, await cache.key_for(media_path), FFPROBE_DATA)
+        await db_session.commit()
+
+        moved_path = str(tmp_path / "moved.mp4")
+        shutil.copy2(media_path, moved_path)
+        os.remove(media_path)
+        cache.clear()
+
+        assert (
+            await cache.get(db_session, await cache.key_for(moved_path)) == FFPROBE_DATA
+        )
+        assert cache.stats().content_hash_hits == 1
+        result = await db_session.execute(select(ProbeCacheEntry.filepath))
+        assert moved_path in result.scalars().all()
+
+    async def test_identity_hit_does_not_hash_content(self, db_session, media_path):
+        cache = ProbeCache(maxsize=10, use_content_hash=True)
+        await cache.put(db_session, await cache.key_for(media_path), FFPROBE_DATA)
+        await db_session.commit()
+        cache.clear()
+
+        with patch("media_api.utils.probe_cache.partial_content_hash") as hash_file:
+            key = await cache.key_for(media_path)
+            assert await cache.get(db_session, key) == FFPROBE_DATA
+            assert await cache.get(db_session, key) == FFPROBE_DATA
+
+        hash_file.assert_not_called()
+        assert key.content_hash is None
+
+    async def test_entries_are_kept_per_profile(self, db_session, media_path):
+        cache = ProbeCache(maxsize=10)
+        await cache.put(db_session, await cache.key_for(media_path), FFPROBE_DATA)
+        await db_session.commit()
+
+        fast_key = await cache.key_for(media_path, "fast")
+        assert await cache.get(db_session, fast_key) is None
+        await cache.put(db_session, fast_key, {"format": {}})
+        await db_session.commit()
+        cache.clear()
+
+        assert await cache.get(db_session, fast_key) == {"format": {}}
+        assert (
+            await cache.get(db_session, await cache.key_for(media_path)) == FFPROBE_DATA
+        )
+
+    async def test_unreadable_file_has_no_key(self):
+        cache = ProbeCache(maxsize=10)
+        assert await cache.key_for("/does/not/exist.mp4") is None
+
+    async def test_process_media_file_skips_ffprobe_on_hit(
+        self, db_session, media_path
+    ):
+        cache = ProbeCache(maxsize=10)
+
+        with (
+            patch("media_api.utils.ffprobe_parser.probe_cache", cache),
+            patch.object(
+                FFProbeParser,
+                "run_ffprobe_output",
+                return_value=json.dumps(FFPROBE_DATA).encode(),
+            ) as run_ffprobe,
+        ):
+            await FFProbeParser.process_media_file(db_session, media_path)
+            await FFProbeParser.process_media_file(db_session, media_path)
+
+        assert run_ffprobe.call_count == 1
+        result = await db_session.execute(select(MediaFile))
+        assert len(result.scalars().all()) == 1
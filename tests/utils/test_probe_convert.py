@@ -0,0 +1,77 @@
+import pytest
+from media_api.core.models import MediaStream
+from media_api.core.schemas import FFProbeOutput, FFProbeStream
+from media_api.utils.ffprobe_parser import FFProbeParser
+from media_api.utils.probe_convert import (
+    STREAM_FIELDS,
+    _field_table,
+    convert_probe,
+)
+
+FFPROBE_DATA = {
+    "format": {
+        "filename": "ignored.mp4",
+        "size": "8123456789",
+        "duration": "61.5",
+        "bit_rate": "1000",
+        "format_name": "mp4",
+    },
+    "streams": [
+        {
+            "index": 0,
+            "codec_type": "video",
+            "height": 1080,
+            "nb_frames": "1475",
+            "duration": 61.5,
+            "disposition": {"default": 1},
+        }
+    ],
+    "chapters": [{"id": 3, "start_time": "0.0", "end_time": "10.5"}],
+}
+
+
+class TestConvertProbe:
+    def test_casts_and_renames(self):
+        media_file, streams, chapters = convert_probe(
+            "/media/clip.mp4", FFProbeOutput(**FFPROBE_DATA)
+        )
+
+        assert media_file["filename"] == "clip.mp4"
+        assert media_file["file_size"] == 8123456789
+        assert media_file["duration"] == 61.5
+        assert "size" not in media_file
+        assert streams[0]["nb_frames"] == 1475
+        assert streams[0]["disposition"]["default"] == 1
+        assert chapters[0]["chapter_id"] == 3
+        assert chapters[0]["end_time"] == 10.5
+
+    def test_every_stream_column_is_mapped(self):
+        mapped = {column for _, column, _ in STREAM_FIELDS}
+        unmapped = set(MediaStream.__table__.columns.keys()) - mapped
+
+        assert unmapped == {"id", "media_file_id", "created_at"}
+
+    def test_missing_format_gives_empty_columns(self):
+        media_file, streams, _ = convert_probe(
+            "/media/clip.mp4", FFProbeOutput(streams=[{"index": 0}])
+        )
+
+        assert media_file["format_name"] is None
+        assert media_file["file_size"] is None
+        assert streams[0]["index"] == 0
+
+    def test_unknown_column_is_rejected(self):
+        with pytest.raises(ValueError):
+            _field_table(FFProbeStream, MediaStream, {}, renames={"index": "idx"})
+
+    def test_matches_revalidating_parser(self):
+        probe = FFProbeOutput(**FFPROBE_DATA)
+
+        fast = FFProbeParser.convert_ffprobe_output("/media/clip.mp4", probe)
+        slow = FFProbeParser.parse_ffprobe_to_rows(
+            "/media/clip.mp4", probe.model_dump()
+        )
+
+        assert fast.media_file == slow.media_file
+        assert fast.streams == slow.streams
+        assert fast.chapters == slow.chapters
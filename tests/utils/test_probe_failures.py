@@ -0,0 +1,215 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from media_api.core.models import FFProbeFailure, ProbeJob
+from media_api.utils import probe_failures
+from media_api.utils.ffprobe_parser import (
+    FFProbeFailedError,
+    FFProbeKnownFailureError,
+    FFProbeOutputError,
+    FFProbeParser,
+    FFProbeTimeoutError,
+)
+from media_api.utils.probe_failures import (
+    FFPROBE_ERROR,
+    INVALID_OUTPUT,
+    TIMEOUT,
+    ProbeRetryScheduler,
+    _now,
+    classify_error,
+    retry_delay,
+)
+from media_api.utils.probe_jobs import QUEUED, ProbeJobWorker
+
+PROBE = json.dumps({"format": {"filename": "a.mp4", "duration": "12.5"}}).encode()
+
+
+class TestClassifyError:
+    def test_file_errors(self):
+        assert classify_error(FFProbeTimeoutError("slow")) == TIMEOUT
+        assert classify_error(FFProbeFailedError("bad", 1)) == FFPROBE_ERROR
+        assert classify_error(FFProbeOutputError("junk")) == INVALID_OUTPUT
+        with pytest.raises(ValidationError) as exc_info:
+            FFProbeParser.parse_ffprobe_to_rows("/a.mp4", {"streams": "nope"})
+        assert classify_error(exc_info.value) == INVALID_OUTPUT
+
+    def test_other_errors_are_not_the_files_fault(self):
+        assert classify_error(FFProbeFailedError("no ffprobe binary")) is None
+        assert classify_error(RuntimeError("database is locked")) is None
+
+
+def test_retry_delay_doubles_up_to_the_cap():
+    delays = [retry_delay(n, base=60, cap=300).total_seconds() for n in range(1, 5)]
+
+    assert delays == [60, 120, 240, 300]
+
+
+@pytest.fixture
+def media_path(tmp_path):
+    path = tmp_path / "a.mp4"
+    path.write_bytes(b"broken")
+    return str(path)
+
+
+async def _failure(db_session, filepath, profile="standard"):
+    return await db_session.scalar(
+        select(FFProbeFailure)
+        .where(FFProbeFailure.filepath == filepath, FFProbeFailure.profile == profile)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def _fail_probe(db_session, filepath, error=None, profile=None):
+    error = error or FFProbeTimeoutError("timeout")
+    with patch.object(
+        FFProbeParser, "run_ffprobe_output", side_effect=error
+    ) as run_ffprobe_output:
+        with pytest.raises(Exception) as exc_info:
+            await FFProbeParser.process_media_file(db_session, filepath, profile)
+    return exc_info.value, run_ffprobe_output
+
+
+@pytest.mark.asyncio
+class TestNegativeCache:
+    async def test_unchanged_file_is_rejected_without_probing(
+        self, db_session, media_path
+    ):
+        await _fail_probe(db_session, media_path)
+
+        error, run_ffprobe_output = await _fail_probe(db_session, media_path)
+
+        assert isinstance(error, FFProbeKnownFailureError)
+        run_ffprobe_output.assert_not_called()
+        failure = await _failure(db_session, media_path)
+        assert (failure.error_class, failure.attempts) == (TIMEOUT, 1)
+
+    async def test_changed_file_is_probed_again(self, db_session, media_path):
+        await _fail_probe(db_session, media_path)
+        with open(media_path, "ab") as f:
+            f.write(b"more")
+
+        error, run_ffprobe_output = await _fail_probe(
+            db_session, media_path, FFProbeFailedError("bad", 1)
+        )
+
+        assert not isinstance(error, FFProbeKnownFailureError)
+        run_ffprobe_output.assert_called_once()
+        failure = await _failure(db_session, media_path)
+        assert (failure.error_class, failure.attempts) == (FFPROBE_ERROR, 1)
+
+    async def test_backoff_grows_until_retries_give_up(
+        self, db_session, media_path, monkeypatch
+    ):
+        monkeypatch.setattr(probe_failures, "FFPROBE_RETRY_MAX_ATTEMPTS", 3)
+        delays = []
+        for _ in range(3):
+            await _fail_probe(db_session, media_path)
+            failure = await _failure(db_session, media_path)
+            if failure.next_retry_at is not None:
+                delays.append(failure.next_retry_at - failure.last_failed_at)
+            # Let the next run through as if its retry were due
+            await db_session.execute(
+                update(FFProbeFailure).values(next_retry_at=_now())
+            )
+            await db_session.commit()
+
+        assert delays == [retry_delay(1), retry_delay(2)]
+        assert failure.attempts == 3
+        error, _ = await _fail_probe(db_session, media_path)
+        assert isinstance(error, FFProbeKnownFailureError)
+
+    async def test_success_clears_the_failure(self, db_session, media_path):
+        await _fail_probe(db_session, media_path)
+        await db_session.execute(update(FFProbeFailure).values(next_retry_at=None))
+        await db_session.commit()
+
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            media_file = await FFProbeParser.process_media_file(db_session, media_path)
+
+        assert media_file is not None
+        assert await _failure(db_session, media_path) is None
+
+    async def test_failures_are_kept_per_profile(self, db_session, media_path):
+        await _fail_probe(db_session, media_path, profile="deep")
+
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            media_file = await FFProbeParser.process_media_file(
+                db_session, media_path, "fast"
+            )
+
+        assert media_file is not None
+        assert await _failure(db_session, media_path, "deep") is not None
+        error, _ = await _fail_probe(db_session, media_path, profile="deep")
+        assert isinstance(error, FFProbeKnownFailureError)
+
+    async def test_unrelated_errors_are_not_cached(self, db_session, media_path):
+        await _fail_probe(db_session, media_path, Exception("database is gone"))
+
+        assert await _failure(db_session, media_path) is None
+
+
+@pytest.mark.asyncio
+class TestProbeRetryScheduler:
+    async def test_queues_due_retries_once(
+        self, db_session, test_db_engine, media_path
+    ):
+        sessionmaker = async_sessionmaker(test_db_engine, expire_on_commit=False)
+        scheduler = ProbeRetryScheduler(sessionmaker, ProbeJobWorker(sessionmaker))
+        await _fail_probe(db_session, media_path)
+        assert await scheduler.run_once() == 0
+
+        await db_session.execute(
+            update(FFProbeFailure).values(next_retry_at=_now() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        queued = await scheduler.run_once()
+        again = await scheduler.run_once()
+
+        assert (queued, again) == (1, 0)
+        job = await db_session.scalar(select(ProbeJob))
+        assert (job.filepath, job.status) == (media_path, QUEUED)
+        # The queued retry gets past the negative cache
+        failure = await _failure(db_session, media_path)
+        assert failure.next_retry_at is None
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            assert await FFProbeParser.process_media_file(db_session, media_path)
+
+    async def test_retries_with_the_failed_profile(
+        self, db_session, test_db_engine, media_path
+    ):
+        sessionmaker = async_sessionmaker(test_db_engine, expire_on_commit=False)
+        scheduler = ProbeRetryScheduler(sessionmaker, ProbeJobWorker(sessionmaker))
+        await _fail_probe(db_session, media_path, profile="deep")
+        await db_session.execute(update(FFProbeFailure).values(next_retry_at=_now()))
+        await db_session.commit()
+
+        assert await scheduler.run_once() == 1
+
+        job = await db_session.scalar(select(ProbeJob))
+        assert job.profile == "deep"
+
+    async def test_claim_is_undone_if_queueing_fails(
+        self, db_session, test_db_engine, media_path
+    ):
+        sessionmaker = async_sessionmaker(test_db_engine, expire_on_commit=False)
+        scheduler = ProbeRetryScheduler(sessionmaker, ProbeJobWorker(sessionmaker))
+        await _fail_probe(db_session, media_path)
+        due = _now() - timedelta(seconds=1)
+        await db_session.execute(update(FFProbeFailure).values(next_retry_at=due))
+        await db_session.commit()
+
+        with patch.object(
+            probe_failures, "add_probe_job", side_effect=RuntimeError("crash")
+        ):
+            with pytest.raises(RuntimeError):
+                await scheduler.run_once()
+
+        failure = await _failure(db_session, media_path)
+        assert failure.next_retry_at is not None
+        assert await scheduler.run_once() == 1
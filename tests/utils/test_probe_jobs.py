@@ -0,0 +1,230 @@
+import asyncio
+import errno
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from media_api.core.models import Base, MediaFile, ProbeJob
+from media_api.utils.ffprobe_parser import FFProbeFailedError, FFProbeParser
+from media_api.utils.probe_pool import probe_pool
+from media_api.utils.probe_jobs import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    ProbeJobWorker,
+    _now,
+    claim_probe_job,
+    enqueue_probe_job,
+)
+
+PROBE = json.dumps({"format": {"filename": "/m/a.mp4", "duration": "12.5"}}).encode()
+
+
+@pytest_asyncio.fixture
+async def sessionmaker(test_db_engine):
+    return async_sessionmaker(
+        test_db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+
+@pytest_asyncio.fixture
+async def worker(sessionmaker):
+    return ProbeJobWorker(sessionmaker, concurrency=1)
+
+
+async def _job(sessionmaker, job_id):
+    async with sessionmaker() as db:
+        return await db.get(ProbeJob, job_id)
+
+
+@pytest.mark.asyncio
+class TestEnqueue:
+    async def test_active_job_is_reused(self, db_session):
+        first = await enqueue_probe_job(db_session, "/m/a.mp4")
+        again = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        assert again.id == first.id
+        assert first.status == QUEUED
+        assert first.created_at is not None
+
+    async def test_active_job_is_reused_only_for_the_same_profile(self, db_session):
+        first = await enqueue_probe_job(db_session, "/m/a.mp4")
+        deep = await enqueue_probe_job(db_session, "/m/a.mp4", profile="deep")
+
+        assert deep.id != first.id
+        assert (first.profile, deep.profile) == ("standard", "deep")
+
+    async def test_finished_job_is_not_reused(self, db_session):
+        first = await enqueue_probe_job(db_session, "/m/a.mp4")
+        first.status = SUCCEEDED
+        await db_session.commit()
+
+        again = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        assert again.id != first.id
+
+
+@pytest.mark.asyncio
+class TestClaim:
+    async def test_claims_in_order_and_only_once(self, db_session):
+        first = await enqueue_probe_job(db_session, "/m/a.mp4")
+        second = await enqueue_probe_job(db_session, "/m/b.mp4")
+
+        claims = [await claim_probe_job(db_session, "w") for _ in range(3)]
+
+        assert [claim.id for claim in claims[:2]] == [first.id, second.id]
+        assert claims[2] is None
+        assert claims[0].attempts == 1
+
+    async def test_expired_lease_is_reclaimed(self, db_session):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+        await claim_probe_job(db_session, "crashed", lease_seconds=60)
+        assert await claim_probe_job(db_session, "w") is None
+
+        await db_session.execute(
+            update(ProbeJob).values(lease_expires_at=_now() - timedelta(seconds=1))
+        )
+        claim = await claim_probe_job(db_session, "w")
+
+        assert (claim.id, claim.attempts) == (job.id, 2)
+
+
+@pytest.mark.asyncio
+class TestWorker:
+    async def test_idle(self, worker):
+        assert await worker.run_once() is None
+
+    async def test_success(self, worker, sessionmaker, db_session):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            assert await worker.run_once() == SUCCEEDED
+
+        job = await _job(sessionmaker, job.id)
+        media_file = await db_session.scalar(select(MediaFile))
+        assert job.media_file_id == media_file.id
+        assert (job.lease_owner, job.error_message) == (None, None)
+        assert job.finished_at is not None
+        assert worker.stats().succeeded == 1
+
+    async def test_probes_with_the_job_profile(self, worker, db_session):
+        await enqueue_probe_job(db_session, "/m/a.mp4", profile="fast")
+
+        with patch.object(
+            FFProbeParser, "run_ffprobe_output", return_value=PROBE
+        ) as run_ffprobe_output:
+            assert await worker.run_once() == SUCCEEDED
+
+        assert run_ffprobe_output.call_args.args[1] == "fast"
+
+    async def test_ffprobe_failure_is_final(self, worker, sessionmaker, db_session):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        with patch.object(
+            FFProbeParser,
+            "run_ffprobe_output",
+            side_effect=FFProbeFailedError("bad", 1),
+        ):
+            assert await worker.run_once() == FAILED
+
+        job = await _job(sessionmaker, job.id)
+        assert (job.status, job.attempts, job.error_message) == (FAILED, 1, "bad")
+
+    async def test_ffprobe_failing_to_start_is_retried(
+        self, worker, sessionmaker, db_session
+    ):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        with patch.object(
+            probe_pool, "run", side_effect=OSError(errno.EAGAIN, "fork failed")
+        ):
+            assert await worker.run_once() == QUEUED
+
+        job = await _job(sessionmaker, job.id)
+        assert (job.status, job.attempts) == (QUEUED, 1)
+        assert "fork failed" in job.error_message
+
+    async def test_transient_errors_retry_until_max_attempts(
+        self, worker, sessionmaker, db_session
+    ):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4", max_attempts=2)
+
+        with patch.object(
+            FFProbeParser, "run_ffprobe_output", side_effect=Exception("timeout")
+        ):
+            outcomes = [await worker.run_once() for _ in range(3)]
+
+        assert outcomes == [QUEUED, FAILED, None]
+        job = await _job(sessionmaker, job.id)
+        assert (job.status, job.attempts) == (FAILED, 2)
+
+    async def test_abandoned_job_fails_after_max_attempts(
+        self, worker, sessionmaker, db_session
+    ):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4", max_attempts=1)
+        await claim_probe_job(db_session, "crashed", lease_seconds=-1)
+
+        with patch.object(FFProbeParser, "run_ffprobe_output") as run_ffprobe_output:
+            assert await worker.run_once() == FAILED
+
+        run_ffprobe_output.assert_not_called()
+        assert "Gave up" in (await _job(sessionmaker, job.id)).error_message
+
+    async def test_lost_lease_does_not_overwrite(
+        self, worker, sessionmaker, db_session
+    ):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+
+        async def steal(filepath, *args):
+            async with sessionmaker() as db:
+                await db.execute(update(ProbeJob).values(lease_owner="other"))
+                await db.commit()
+            return PROBE
+
+        with patch.object(FFProbeParser, "run_ffprobe_output", side_effect=steal):
+            await worker.run_once()
+
+        job = await _job(sessionmaker, job.id)
+        assert (job.status, job.lease_owner) == (RUNNING, "other")
+
+    async def test_stop_requeues_running_jobs(self, worker, sessionmaker, db_session):
+        job = await enqueue_probe_job(db_session, "/m/a.mp4")
+        await claim_probe_job(db_session, worker.worker_id)
+
+        await worker.stop()
+
+        job = await _job(sessionmaker, job.id)
+        assert (job.status, job.attempts, job.lease_owner) == (QUEUED, 0, None)
+
+
+@pytest.mark.asyncio
+async def test_started_workers_pick_up_notified_jobs(tmp_path):
+    # Workers run concurrently, so they need real connections rather than
+    # the single shared in-memory one
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    worker = ProbeJobWorker(sessionmaker, concurrency=2, poll_interval=60)
+    try:
+        async with sessionmaker() as db:
+            job = await enqueue_probe_job(db, "/m/a.mp4")
+
+        with patch.object(FFProbeParser, "run_ffprobe_output", return_value=PROBE):
+            worker.start()
+            worker.notify()
+            for _ in range(200):
+                if worker.stats().succeeded:
+                    break
+                await asyncio.sleep(0.01)
+            await worker.stop()
+
+        assert (await _job(sessionmaker, job.id)).status == SUCCEEDED
+    finally:
+        await engine.dispose()
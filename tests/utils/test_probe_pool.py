@@ -0,0 +1,76 @@
+import asyncio
+import sys
+import pytest
+from media_api.utils.probe_pool import ProbePool, ProbeTimeoutError
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+@pytest.mark.asyncio
+class TestProbePool:
+    async def test_run_captures_output(self):
+        pool = ProbePool(max_concurrency=2, timeout=10)
+
+        result = await pool.run(
+            _python("import sys; print('ok'); sys.stderr.write('warn')")
+        )
+
+        assert result.returncode == 0
+        assert result.stdout.strip() == b"ok"
+        assert result.stderr == b"warn"
+        assert pool.stats().completed == 1
+
+    async def test_run_reports_failure(self):
+        pool = ProbePool(max_concurrency=1, timeout=10)
+
+        result = await pool.run(_python("import sys; sys.exit(3)"))
+
+        assert result.returncode == 3
+        assert pool.stats().failed == 1
+
+    async def test_timeout_kills_process(self):
+        pool = ProbePool(max_concurrency=1, timeout=0.2)
+
+        with pytest.raises(ProbeTimeoutError):
+            await pool.run(_python("import time; time.sleep(30)"))
+
+        stats = pool.stats()
+        assert stats.timed_out == 1
+        assert stats.in_flight == 0
+
+    async def test_cancellation_kills_process(self):
+        pool = ProbePool(max_concurrency=1, timeout=30)
+        task = asyncio.create_task(pool.run(_python("import time; time.sleep(30)")))
+        await asyncio.sleep(0.2)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        stats = pool.stats()
+        assert stats.cancelled == 1
+        assert stats.in_flight == 0
+
+    async def test_concurrency_limit_queues_excess_probes(self):
+        pool = ProbePool(max_concurrency=2, timeout=10)
+        tasks = [
+            asyncio.create_task(pool.run(_python("import time; time.sleep(0.5)")))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0.2)
+
+        stats = pool.stats()
+        assert stats.in_flight == 2
+        assert stats.queued == 3
+
+        await asyncio.gather(*tasks)
+        stats = pool.stats()
+        assert stats.completed == 5
+        assert stats.queued == 0
+        assert stats.in_flight == 0
+
+    async def test_rejects_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            ProbePool(max_concurrency=0)
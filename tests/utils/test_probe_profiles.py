@@ -0,0 +1,58 @@
+import pytest
+from media_api.utils.probe_profiles import (
+    DEEP,
+    FAST,
+    GIB,
+    STANDARD,
+    ProbeProfile,
+    get_profile,
+    stored_entries,
+)
+
+
+class TestProbeProfiles:
+    def test_fast_reads_only_stored_entries_with_small_probesize(self):
+        command = get_profile(FAST).command("/m/a.mkv")
+
+        assert command[-1] == "/m/a.mkv"
+        assert "-probesize" in command
+        assert "-show_streams" not in command
+        entries = command[command.index("-show_entries") + 1]
+        assert entries == stored_entries()
+        sections = entries.split(":")
+        assert "stream_tags" in sections
+        stream = next(s for s in sections if s.startswith("stream="))
+        assert "codec_name" in stream.split("=")[1].split(",")
+        assert "tags" not in stream.split("=")[1].split(",")
+
+    def test_deep_counts_frames_and_packets(self):
+        command = get_profile(DEEP).command("/m/a.mkv")
+
+        assert "-count_frames" in command
+        assert "-count_packets" in command
+        assert "-show_streams" in command
+
+    def test_default_profile(self):
+        assert get_profile().name == STANDARD
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError, match="Unknown probe profile"):
+            get_profile("thorough")
+
+    def test_standard_timeout_is_flat(self):
+        profile = get_profile(STANDARD)
+
+        assert profile.timeout_for(0) == profile.timeout
+        assert profile.timeout_for(100 * GIB) == profile.timeout
+        assert profile.timeout_for(None) == profile.timeout
+
+    def test_timeout_scales_with_size_up_to_cap(self):
+        profile = ProbeProfile(
+            "test", (), timeout=10, timeout_per_gib=5, max_timeout=30
+        )
+
+        assert profile.timeout_for(0) == 10
+        assert profile.timeout_for(2 * GIB) == 20
+        assert profile.timeout_for(100 * GIB) == 30
+        # Unknown size gets the most time
+        assert profile.timeout_for(None) == 30
@@ -0,0 +1,39 @@
+import gzip
+import json
+import pytest
+from media_api.utils.raw_probe import (
+    compress_probe,
+    decompress_probe,
+    iter_decompressed,
+)
+
+FFPROBE_DATA = {
+    "format": {"filename": "clip.mkv", "tags": {"title": "x" * 10_000}},
+    "streams": [{"index": i, "codec_type": "audio"} for i in range(50)],
+}
+
+
+class TestRawProbeCompression:
+    def test_round_trip(self):
+        encoding, payload, size = compress_probe(FFPROBE_DATA)
+
+        assert encoding == "gzip"
+        assert size == len(json.dumps(FFPROBE_DATA, separators=(",", ":")))
+        assert len(payload) < size
+        assert decompress_probe(encoding, payload) == FFPROBE_DATA
+
+    def test_payload_is_plain_gzip(self):
+        _, payload, _ = compress_probe(FFPROBE_DATA)
+        assert json.loads(gzip.decompress(payload)) == FFPROBE_DATA
+
+    def test_iter_decompressed_yields_chunks(self):
+        encoding, payload, size = compress_probe(FFPROBE_DATA)
+
+        chunks = list(iter_decompressed(encoding, payload, chunk_size=64))
+
+        assert len(chunks) > 1
+        assert sum(len(chunk) for chunk in chunks) == size
+
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            list(iter_decompressed("brotli", b""))